@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: búsqueda de tickers por escaneo lineal vs índice por símbolo
+
+Uso (desde backend/):
+    python -m benchmarks.ticker_lookup
+"""
+
+import random
+import string
+import timeit
+from typing import Dict, List
+
+from services.symbol_registry import SymbolRegistry, index_tickers
+
+TICKER_COUNT = 2000
+REQUESTED = ["BTC/USDT", "ETH/USDT", "ADA/USDT", "DOT/USDT", "MATIC/USDT", "AVAX/USDT"]
+
+
+def build_fixture(count: int = TICKER_COUNT) -> List[Dict]:
+    """Generar un payload de /ticker/24hr con `count` tickers"""
+    rng = random.Random(42)
+    tickers = []
+    seen = set()
+
+    # Los símbolos solicitados quedan al final: peor caso para el escaneo lineal
+    while len(tickers) < count - len(REQUESTED):
+        base = ''.join(rng.choices(string.ascii_uppercase, k=rng.randint(3, 6)))
+        symbol = f"{base}USDT"
+        if symbol in seen or f"{base}/USDT" in REQUESTED:
+            continue
+        seen.add(symbol)
+        tickers.append(_ticker(symbol, rng))
+
+    for symbol in REQUESTED:
+        tickers.append(_ticker(symbol.replace('/', ''), rng))
+
+    return tickers
+
+
+def _ticker(symbol: str, rng: random.Random) -> Dict:
+    return {
+        "symbol": symbol,
+        "lastPrice": f"{rng.uniform(0.01, 50000):.4f}",
+        "priceChangePercent": f"{rng.uniform(-10, 10):.2f}",
+        "volume": f"{rng.uniform(1000, 1e9):.0f}"
+    }
+
+
+def nested_scan(symbols: List[str], tickers: List[Dict]) -> List[Dict]:
+    """Implementación anterior: O(símbolos × tickers)"""
+    result = []
+    for symbol in symbols:
+        zaffex_symbol = symbol.replace('/', '')
+        for ticker in tickers:
+            if ticker['symbol'] == zaffex_symbol:
+                result.append(ticker)
+                break
+    return result
+
+
+def indexed_lookup(symbols: List[str], tickers: Dict[str, Dict], registry: SymbolRegistry) -> List[Dict]:
+    """Implementación actual: O(símbolos) sobre el índice precalculado"""
+    result = []
+    for _, zaffex_symbol in registry.resolve(symbols):
+        ticker = tickers.get(zaffex_symbol)
+        if ticker is not None:
+            result.append(ticker)
+    return result
+
+
+def main(number: int = 2000):
+    tickers = build_fixture()
+    indexed = index_tickers(tickers)
+    registry = SymbolRegistry()
+
+    assert nested_scan(REQUESTED, tickers) == indexed_lookup(REQUESTED, indexed, registry)
+
+    scan_time = timeit.timeit(lambda: nested_scan(REQUESTED, tickers), number=number)
+    index_time = timeit.timeit(lambda: indexed_lookup(REQUESTED, indexed, registry), number=number)
+    build_time = timeit.timeit(lambda: index_tickers(tickers), number=100) / 100
+
+    print(f"Fixture: {len(tickers)} tickers, {len(REQUESTED)} símbolos por request")
+    print(f"Escaneo lineal: {scan_time / number * 1e6:10.2f} µs/request")
+    print(f"Índice:         {index_time / number * 1e6:10.2f} µs/request")
+    print(f"Construir índice (una vez por snapshot): {build_time * 1e6:.2f} µs")
+    print(f"Speedup: {scan_time / index_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
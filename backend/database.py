@@ -0,0 +1,57 @@
+"""
+Conexión única a MongoDB
+Un solo AsyncIOMotorClient por proceso, configurado desde el entorno
+"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+_client: Optional[AsyncIOMotorClient] = None
+
+
+def _client_options() -> dict:
+    """Opciones del pool de conexiones, con valores por defecto para producción"""
+    return {
+        "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '50')),
+        "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+        "maxIdleTimeMS": int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '60000')),
+        "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '10000')),
+        "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+        "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+        "socketTimeoutMS": int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '30000')),
+        "readPreference": os.environ.get('MONGO_READ_PREFERENCE', 'primary'),
+        "retryWrites": True
+    }
+
+
+def get_client() -> AsyncIOMotorClient:
+    """Cliente compartido del proceso; se crea en el primer uso (después del fork de uvicorn)"""
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(os.environ['MONGO_URL'], **_client_options())
+    return _client
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    """Base de datos de la aplicación, para código fuera de una request (bucles, startup)"""
+    return get_client()[os.environ['DB_NAME']]
+
+
+def get_db() -> AsyncIOMotorDatabase:
+    """Dependencia de FastAPI que inyecta la base de datos compartida"""
+    return get_database()
+
+
+def close_client():
+    """Cerrar el cliente compartido (shutdown de FastAPI)"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
@@ -0,0 +1,156 @@
+"""
+Comandos de mantenimiento de GPTading Pro
+
+Uso (desde backend/):
+    python manage.py rebuild-positions [--user-id USER_ID]
+    python manage.py backfill-rollups [--user-id USER_ID]
+    python manage.py backfill-candles --symbol BTC/USDT [--interval 1m] [--days 30]
+    python manage.py dedupe-demo-order-ids
+    python manage.py optimize --symbol BTC/USDT (--strategy momentum_trading | --bot-id BOT_ID)
+        [--interval 1h] [--days 90] [--samples 200] [--objective profit] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import time
+
+from database import close_client, get_database
+from models.bot import Strategy
+from services.candle_store import candle_store
+from services.optimizer import BOT_KEYS, SEARCH_SPACES, best_config, parameter_grid, random_samples, search_space
+from services.order_sync import dedupe_demo_order_ids
+from services.positions import rebuild_positions
+from services.production_zaffex_service import production_zaffex_service
+from services.trade_rollups import backfill_rollups
+
+
+async def _rebuild_positions(args):
+    count = await rebuild_positions(get_database(), args.user_id)
+    print(f"Posiciones recalculadas: {count}")
+
+
+async def _backfill_rollups(args):
+    count = await backfill_rollups(get_database(), args.user_id)
+    print(f"Rollups recalculados: {count}")
+
+
+async def _backfill_candles(args):
+    start_ms = int((time.time() - args.days * 86400) * 1000)
+    try:
+        added = await candle_store.backfill(production_zaffex_service, args.symbol, args.interval, start_ms)
+    finally:
+        await production_zaffex_service.close()
+
+    series = candle_store.series(args.symbol, args.interval)
+    gaps = series.gaps(start_ms, series.last_timestamp)
+    print(f"Velas nuevas: {added}; almacenadas: {len(series)}; huecos: {len(gaps)}")
+
+
+async def _dedupe_demo_order_ids(args):
+    count = await dedupe_demo_order_ids(get_database())
+    print(f"Órdenes demo renombradas: {count}")
+
+
+async def _optimize(args):
+    base = {}
+    strategy = Strategy[args.strategy.upper()] if args.strategy else None
+    if args.bot_id:
+        bot = await get_database().bots.find_one({"id": args.bot_id})
+        if not bot:
+            print(f"Bot no encontrado: {args.bot_id}")
+            return
+        strategy = Strategy(bot["strategy"])
+        base = {key: bot[key] for key in BOT_KEYS if bot.get(key) is not None}
+
+    series = candle_store.series(args.symbol, args.interval)
+    start_ms = int((time.time() - args.days * 86400) * 1000)
+    candles = series.range(start_ms)
+    if len(candles["close"]) == 0:
+        print(f"No hay velas de {args.symbol} en {args.interval}; ejecuta backfill-candles")
+        return
+    gaps = series.gaps(start_ms, int(candles["timestamp"][-1]) + series.step)
+    if gaps:
+        print(f"Aviso: {len(gaps)} huecos en las velas; ejecuta backfill-candles --days {args.days:g}")
+
+    try:
+        space = search_space(strategy)
+    except ValueError as e:
+        print(e)
+        return
+    configs = random_samples(space, args.samples, seed=args.seed) if args.samples else parameter_grid(space)
+
+    winner = await best_config(
+        candles, strategy, configs,
+        base=base, objective=args.objective, max_workers=args.workers, patience=args.patience
+    )
+
+    if winner is None:
+        print("Sin resultados")
+        return
+    result = winner["result"]
+    print(f"Estrategia: {strategy.value}; velas: {result['bars']}")
+    print(f"Mejor configuración: {winner['config']}")
+    print(
+        f"{args.objective}: {result[args.objective]:.4f}; trades: {result['total_trades']}; "
+        f"accuracy: {result['accuracy']:.1f}%; roi: {result['roi']:.2f}%"
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Comandos de mantenimiento de GPTading Pro")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-positions", help="Recalcular la colección positions desde trades")
+    rebuild.add_argument("--user-id", help="Solo las posiciones de este usuario")
+    rebuild.set_defaults(handler=_rebuild_positions)
+
+    backfill = commands.add_parser("backfill-rollups", help="Recalcular los rollups horarios y diarios desde trades")
+    backfill.add_argument("--user-id", help="Solo los rollups de este usuario")
+    backfill.set_defaults(handler=_backfill_rollups)
+
+    candles = commands.add_parser("backfill-candles", help="Descargar velas de Zaffex al almacén local")
+    candles.add_argument("--symbol", required=True, help="Par, p. ej. BTC/USDT")
+    candles.add_argument("--interval", default="1m", help="1m, 5m, 15m, 1h, 4h o 1d")
+    candles.add_argument("--days", type=float, default=30, help="Días de histórico desde hoy")
+    candles.set_defaults(handler=_backfill_candles)
+
+    dedupe = commands.add_parser(
+        "dedupe-demo-order-ids",
+        help="Renombrar los zaffex_order_id demo repetidos antes de crear el índice único"
+    )
+    dedupe.set_defaults(handler=_dedupe_demo_order_ids)
+
+    optimize = commands.add_parser("optimize", help="Buscar la mejor configuración de una estrategia sobre las velas locales")
+    optimize.add_argument("--symbol", required=True, help="Par, p. ej. BTC/USDT")
+    optimize.add_argument("--interval", default="1h", help="1m, 5m, 15m, 1h, 4h o 1d")
+    optimize.add_argument("--days", type=float, default=90, help="Días de histórico desde hoy")
+    target = optimize.add_mutually_exclusive_group(required=True)
+    target.add_argument(
+        "--strategy", choices=[strategy.name.lower() for strategy in SEARCH_SPACES],
+        help="Estrategia a optimizar"
+    )
+    target.add_argument("--bot-id", help="Partir de la configuración y estrategia de este bot")
+    optimize.add_argument("--samples", type=int, default=0, help="Configuraciones aleatorias (0 = rejilla completa)")
+    optimize.add_argument("--seed", type=int, help="Semilla del muestreo aleatorio")
+    optimize.add_argument("--objective", default="profit", choices=["profit", "roi", "accuracy"])
+    optimize.add_argument("--workers", type=int, help="Procesos del pool (por defecto, uno por CPU)")
+    optimize.add_argument("--patience", type=int, help="Parar tras N resultados sin mejora")
+    optimize.set_defaults(handler=_optimize)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    async def run():
+        try:
+            await args.handler(args)
+        finally:
+            close_client()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,22 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import asyncio
 import random
+import time
 import os
-from pathlib import Path
-from dotenv import load_dotenv
 
 from models.bot import TradingBot, BotCreate, BotUpdate, BotResponse, BotStatus
 from models.trade import Trade, TradeType, TradeStatus
 from services.production_zaffex_service import production_zaffex_service as zaffex_service
-from motor.motor_asyncio import AsyncIOMotorClient
-
-# Load environment variables
-ROOT_DIR = Path(__file__).parent.parent
-load_dotenv(ROOT_DIR / '.env')
-
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+from services.bot_scheduler import BotScheduler
+from services.bot_registry import bot_state_registry
+from services import bot_statistics
+from services.trade_journal import trade_journal
+from services.backtest import run_backtest
+from services.candle_store import INTERVAL_MS, candle_store
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db, get_database
 
 router = APIRouter(prefix="/api/bots", tags=["bots"])
 
@@ -28,7 +25,7 @@ def get_current_user_id():
     return "user_123"  # En producción, esto vendría del JWT token
 
 @router.post("/", response_model=BotResponse)
-async def create_bot(bot_data: BotCreate, user_id: str = Depends(get_current_user_id)):
+async def create_bot(bot_data: BotCreate, user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Crear un nuevo bot de trading"""
     
     bot = TradingBot(
@@ -51,7 +48,7 @@ async def create_bot(bot_data: BotCreate, user_id: str = Depends(get_current_use
         raise HTTPException(status_code=500, detail="Error al crear el bot")
 
 @router.get("/", response_model=List[BotResponse])
-async def get_user_bots(user_id: str = Depends(get_current_user_id)):
+async def get_user_bots(user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Obtener todos los bots del usuario"""
     
     bots_cursor = db.bots.find({"user_id": user_id})
@@ -60,7 +57,7 @@ async def get_user_bots(user_id: str = Depends(get_current_user_id)):
     return [BotResponse(**bot) for bot in bots]
 
 @router.get("/{bot_id}", response_model=BotResponse)
-async def get_bot(bot_id: str, user_id: str = Depends(get_current_user_id)):
+async def get_bot(bot_id: str, user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Obtener un bot específico"""
     
     bot = await db.bots.find_one({"id": bot_id, "user_id": user_id})
@@ -71,7 +68,7 @@ async def get_bot(bot_id: str, user_id: str = Depends(get_current_user_id)):
     return BotResponse(**bot)
 
 @router.put("/{bot_id}", response_model=BotResponse)
-async def update_bot(bot_id: str, bot_update: BotUpdate, user_id: str = Depends(get_current_user_id)):
+async def update_bot(bot_id: str, bot_update: BotUpdate, user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Actualizar configuración de un bot"""
     
     update_data = {k: v for k, v in bot_update.dict().items() if v is not None}
@@ -86,10 +83,11 @@ async def update_bot(bot_id: str, bot_update: BotUpdate, user_id: str = Depends(
         raise HTTPException(status_code=404, detail="Bot no encontrado")
     
     updated_bot = await db.bots.find_one({"id": bot_id, "user_id": user_id})
+    bot_state_registry.update(bot_id, updated_bot)
     return BotResponse(**updated_bot)
 
 @router.post("/{bot_id}/activate")
-async def activate_bot(bot_id: str, user_id: str = Depends(get_current_user_id)):
+async def activate_bot(bot_id: str, user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Activar un bot de trading"""
     
     bot = await db.bots.find_one({"id": bot_id, "user_id": user_id})
@@ -104,41 +102,51 @@ async def activate_bot(bot_id: str, user_id: str = Depends(get_current_user_id))
         )
     
     # Activar bot
+    activation = {
+        "is_active": True,
+        "status": BotStatus.ACTIVE.value,
+        "updated_at": datetime.utcnow()
+    }
     await db.bots.update_one(
         {"id": bot_id, "user_id": user_id},
-        {"$set": {
-            "is_active": True,
-            "status": BotStatus.ACTIVE.value,
-            "updated_at": datetime.utcnow()
-        }}
+        {"$set": activation}
     )
     
-    # Iniciar trading en background (simulado)
-    asyncio.create_task(start_trading_loop(bot_id, user_id))
+    # Iniciar trading en background (simulado) si este worker obtiene el lease;
+    # si ya lo tiene otro worker, el bot sigue planificado allí
+    if await bot_state_registry.claim(db.bots, bot_id):
+        bot_scheduler.schedule(bot_id, user_id)
     
     return {"message": "Bot activado exitosamente"}
 
 @router.post("/{bot_id}/deactivate")
-async def deactivate_bot(bot_id: str, user_id: str = Depends(get_current_user_id)):
+async def deactivate_bot(bot_id: str, user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Desactivar un bot de trading"""
     
     await db.bots.update_one(
         {"id": bot_id, "user_id": user_id},
-        {"$set": {
-            "is_active": False,
-            "status": BotStatus.INACTIVE.value,
-            "updated_at": datetime.utcnow()
-        }}
+        {
+            "$set": {
+                "is_active": False,
+                "status": BotStatus.INACTIVE.value,
+                "updated_at": datetime.utcnow()
+            },
+            # Liberar el lease del worker que lo planificaba
+            "$unset": {"scheduler_owner": "", "scheduler_lease_until": ""}
+        }
     )
     
+    bot_state_registry.remove(bot_id)
+    bot_scheduler.cancel(bot_id)
+    
     return {"message": "Bot desactivado exitosamente"}
 
 @router.delete("/{bot_id}")
-async def delete_bot(bot_id: str, user_id: str = Depends(get_current_user_id)):
+async def delete_bot(bot_id: str, user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Eliminar un bot"""
     
     # Primero desactivar si está activo
-    await deactivate_bot(bot_id, user_id)
+    await deactivate_bot(bot_id, user_id, db)
     
     result = await db.bots.delete_one({"id": bot_id, "user_id": user_id})
     
@@ -147,60 +155,168 @@ async def delete_bot(bot_id: str, user_id: str = Depends(get_current_user_id)):
     
     return {"message": "Bot eliminado exitosamente"}
 
+# Ventanas admitidas por /performance
+PERFORMANCE_WINDOWS = {
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+    "7d": timedelta(days=7),
+    "30d": timedelta(days=30),
+    "1y": timedelta(days=365)
+}
+
 @router.get("/{bot_id}/performance")
-async def get_bot_performance(bot_id: str, user_id: str = Depends(get_current_user_id)):
+async def get_bot_performance(
+    bot_id: str,
+    window: Optional[str] = None,  # 1h, 1d, 7d, 30d, 1y; sin ventana = desde la creación
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
     """Obtener métricas de rendimiento de un bot"""
     
+    if window is not None and window not in PERFORMANCE_WINDOWS:
+        raise HTTPException(status_code=400, detail=f"Ventana no válida: {window}")
+    
     bot = await db.bots.find_one({"id": bot_id, "user_id": user_id})
     if not bot:
         raise HTTPException(status_code=404, detail="Bot no encontrado")
     
-    # Obtener trades del bot
-    trades_cursor = db.trades.find({"bot_id": bot_id}).sort("created_at", -1)
-    trades = await trades_cursor.to_list(length=50)
+    if window is None:
+        # Contadores acumulados del bot, mantenidos por el diario de trades
+        totals = {
+            "total_trades": bot.get("total_trades", 0),
+            "successful_trades": bot.get("successful_trades", 0),
+            "profit": bot.get("profit", 0.0)
+        }
+    else:
+        since = datetime.utcnow() - PERFORMANCE_WINDOWS[window]
+        totals = await bot_statistics.window_statistics(db.trades, user_id, bot_id, since)
+    
+    total_trades = totals["total_trades"]
+    successful_trades = totals["successful_trades"]
+    total_profit = totals["profit"]
     
-    # Calcular métricas
-    total_trades = len(trades)
-    successful_trades = len([t for t in trades if t.get("profit_loss", 0) > 0])
-    total_profit = sum([t.get("profit_loss", 0) for t in trades])
+    # Últimos trades del bot
+    trades_cursor = db.trades.find(
+        {"user_id": user_id, "bot_id": bot_id, "executed_at": {"$type": "date"}},
+        {"_id": 0}
+    ).sort([("executed_at", -1), ("id", -1)]).limit(10)
+    trades = await trades_cursor.to_list(length=10)
     
     return {
         "bot_id": bot_id,
+        "window": window,
         "total_trades": total_trades,
         "successful_trades": successful_trades,
         "accuracy": (successful_trades / total_trades * 100) if total_trades > 0 else 0,
         "total_profit": total_profit,
         "roi": (total_profit / bot["initial_investment"] * 100) if bot["initial_investment"] > 0 else 0,
-        "recent_trades": trades[:10]
+        "recent_trades": trades
     }
 
-async def start_trading_loop(bot_id: str, user_id: str):
-    """Bucle de trading simulado para un bot activo"""
-    
-    while True:
-        try:
-            # Verificar si el bot sigue activo
-            bot = await db.bots.find_one({"id": bot_id, "user_id": user_id})
-            if not bot or not bot.get("is_active", False):
-                break
-            
-            # Simular análisis de mercado y decisión de trading
-            should_trade = random.random() < 0.3  # 30% probabilidad de hacer trade
-            
-            if should_trade:
-                await simulate_trade(bot_id, user_id, bot)
-            
-            # Esperar antes del próximo ciclo (entre 30 segundos y 5 minutos)
-            await asyncio.sleep(random.randint(30, 300))
-            
-        except Exception as e:
-            print(f"Error en trading loop para bot {bot_id}: {e}")
-            # En caso de error, pausar el bot
-            await db.bots.update_one(
-                {"id": bot_id},
-                {"$set": {"status": BotStatus.ERROR.value}}
+@router.post("/{bot_id}/backtest")
+async def backtest_bot(
+    bot_id: str,
+    symbol: str = "BTC/USDT",
+    interval: str = "1h",
+    days: float = 30,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Simular la configuración del bot sobre las velas del almacén local"""
+    
+    if interval not in INTERVAL_MS:
+        raise HTTPException(status_code=400, detail=f"Intervalo no soportado: {interval}")
+    
+    bot = await db.bots.find_one({"id": bot_id, "user_id": user_id})
+    if not bot:
+        raise HTTPException(status_code=404, detail="Bot no encontrado")
+    
+    series = candle_store.series(symbol, interval)
+    start_ms = int((time.time() - days * 86400) * 1000)
+    candles = series.range(start_ms)
+    if len(candles["close"]) == 0:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No hay velas almacenadas de {symbol} en {interval}; ejecuta manage.py backfill-candles"
+        )
+    
+    # Un hueco al inicio acortaría la ventana sin avisar: se rechaza en lugar de simular menos días
+    gaps = series.gaps(start_ms, int(candles["timestamp"][-1]) + series.step)
+    if gaps and gaps[0][0] == start_ms:
+        raise HTTPException(
+            status_code=409,
+            detail=(
+                f"Faltan velas de {symbol} en {interval} entre "
+                f"{datetime.utcfromtimestamp(start_ms / 1000):%Y-%m-%d %H:%M} y "
+                f"{datetime.utcfromtimestamp(gaps[0][1] / 1000):%Y-%m-%d %H:%M}; "
+                f"ejecuta manage.py backfill-candles --days {days:g}"
             )
-            break
+        )
+    
+    try:
+        # Cálculo NumPy fuera del event loop
+        result = await asyncio.to_thread(
+            run_backtest,
+            candles,
+            bot["strategy"],
+            stop_loss_percentage=bot.get("stop_loss_percentage", 5.0),
+            take_profit_percentage=bot.get("take_profit_percentage", 10.0),
+            max_investment_per_trade=bot.get("max_investment_per_trade", 100.0),
+            initial_investment=bot["initial_investment"]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "bot_id": bot_id,
+        "symbol": symbol,
+        "interval": interval,
+        "from": datetime.utcfromtimestamp(int(candles["timestamp"][0]) / 1000),
+        "to": datetime.utcfromtimestamp(int(candles["timestamp"][-1]) / 1000),
+        "gaps": len(gaps),
+        **result
+    }
+
+async def run_trading_cycle(bot_id: str, user_id: str) -> Optional[float]:
+    """Un ciclo de trading simulado; devuelve los segundos hasta el próximo ciclo o None para detener el bot"""
+    
+    try:
+        # Verificar si el bot sigue activo y su lease es de este worker (estado en memoria, sin consultar Mongo)
+        bot = bot_state_registry.get(bot_id)
+        if not bot or not bot.get("is_active", False) or not bot_state_registry.owns(bot_id):
+            bot_state_registry.remove(bot_id)
+            return None
+        
+        # Simular análisis de mercado y decisión de trading
+        should_trade = random.random() < 0.3  # 30% probabilidad de hacer trade
+        
+        if should_trade:
+            await simulate_trade(bot_id, user_id, bot)
+        
+        # Próximo ciclo entre 30 segundos y 5 minutos
+        return random.randint(30, 300)
+        
+    except Exception as e:
+        print(f"Error en trading loop para bot {bot_id}: {e}")
+        # En caso de error, pausar el bot: sin lease y con status error ningún worker lo reclama
+        await get_database().bots.update_one(
+            {"id": bot_id},
+            {
+                "$set": {"status": BotStatus.ERROR.value},
+                "$unset": {"scheduler_owner": "", "scheduler_lease_until": ""}
+            }
+        )
+        bot_state_registry.remove(bot_id)
+        return None
+
+# Los trades del diario actualizan los contadores de sus bots en lote
+trade_journal.add_listener(bot_statistics.record_trade_statistics)
+
+# Planificador único para todos los bots activos del proceso
+bot_scheduler = BotScheduler(
+    run_trading_cycle,
+    max_concurrency=int(os.environ.get('BOT_SCHEDULER_CONCURRENCY', '50'))
+)
 
 async def simulate_trade(bot_id: str, user_id: str, bot: dict):
     """Simula la ejecución de un trade"""
@@ -247,44 +363,14 @@ async def simulate_trade(bot_id: str, user_id: str, bot: dict):
             profit_percentage=profit_factor * 100,
             status=TradeStatus.EXECUTED,
             executed_at=datetime.utcnow(),
-            zaffex_order_id=order_result["order_id"],
+            zaffex_order_id=str(order_result["order_id"]),
             strategy_used=bot["strategy"]
         )
         
-        # Guardar trade en BD
-        await db.trades.insert_one(trade.dict())
-        
-        # Actualizar estadísticas del bot
-        await update_bot_statistics(bot_id, profit_loss)
+        # Guardar trade en BD; el diario actualiza también las estadísticas del bot
+        await trade_journal.record(trade.dict())
         
         print(f"Trade ejecutado: {trade_type.value} {amount:.6f} {pair} a ${current_price:.2f} - P/L: ${profit_loss:.2f}")
         
     except Exception as e:
         print(f"Error al ejecutar trade: {e}")
-
-async def update_bot_statistics(bot_id: str, profit_loss: float):
-    """Actualiza las estadísticas de rendimiento del bot"""
-    
-    bot = await db.bots.find_one({"id": bot_id})
-    if not bot:
-        return
-    
-    # Actualizar métricas
-    new_profit = bot.get("profit", 0) + profit_loss
-    new_total_trades = bot.get("total_trades", 0) + 1
-    new_successful_trades = bot.get("successful_trades", 0) + (1 if profit_loss > 0 else 0)
-    new_accuracy = (new_successful_trades / new_total_trades * 100) if new_total_trades > 0 else 0
-    new_roi = (new_profit / bot["initial_investment"] * 100) if bot["initial_investment"] > 0 else 0
-    
-    await db.bots.update_one(
-        {"id": bot_id},
-        {"$set": {
-            "profit": new_profit,
-            "total_trades": new_total_trades,
-            "successful_trades": new_successful_trades,
-            "accuracy": new_accuracy,
-            "roi": new_roi,
-            "last_trade_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }}
-    )
\ No newline at end of file
@@ -1,67 +1,97 @@
 from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from typing import Dict, List
 from datetime import datetime, timedelta
 import asyncio
 import os
-from pathlib import Path
-from dotenv import load_dotenv
+import time
 
-from models.portfolio import Portfolio, PortfolioResponse, AssetHolding, MarketData
+from models.portfolio import Portfolio, PortfolioResponse, AssetHolding
 from services.production_zaffex_service import production_zaffex_service as zaffex_service
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
+from services.positions import record_trade_positions
+from services.trade_rollups import granularity_for, record_trade_rollups, rollup_summary
+from services.trade_journal import trade_journal
+from services.order_sync import sync_order_history
 
-# Load environment variables
-ROOT_DIR = Path(__file__).parent.parent
-load_dotenv(ROOT_DIR / '.env')
+router = APIRouter(prefix="/api/portfolio", tags=["portfolio"])
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Los trades del diario actualizan las posiciones materializadas y los rollups
+trade_journal.add_listener(record_trade_positions)
+trade_journal.add_listener(record_trade_rollups)
 
-router = APIRouter(prefix="/api/portfolio", tags=["portfolio"])
+# Antigüedad máxima del balance de Zaffex que acepta la lectura del portfolio
+PORTFOLIO_BALANCE_TTL = float(os.environ.get('PORTFOLIO_BALANCE_TTL', '15'))
+
+# Intervalo mínimo entre escrituras del portfolio de un mismo usuario
+PERSIST_INTERVAL = float(os.environ.get('PORTFOLIO_PERSIST_INTERVAL', '60'))
+_last_persisted: Dict[str, float] = {}
+
+# Tiempo máximo de cada rama de /performance antes de responder sin ella
+PERFORMANCE_BRANCH_TIMEOUT = float(os.environ.get('PORTFOLIO_PERFORMANCE_TIMEOUT', '3'))
+
+def _should_persist(user_id: str) -> bool:
+    now = time.monotonic()
+    last = _last_persisted.get(user_id)
+    if last is not None and now - last < PERSIST_INTERVAL:
+        return False
+    _last_persisted[user_id] = now
+    return True
 
 def get_current_user_id():
     return "user_123"  # En producción, esto vendría del JWT token
 
 @router.get("/", response_model=PortfolioResponse)
-async def get_portfolio(user_id: str = Depends(get_current_user_id)):
+async def get_portfolio(user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Obtener el portfolio completo del usuario"""
     
     # Buscar portfolio existente
     portfolio = await db.portfolios.find_one({"user_id": user_id})
     
     if not portfolio:
-        # Crear portfolio inicial si no existe
+        # Crear portfolio inicial si no existe; con upsert, dos peticiones
+        # simultáneas no chocan con el índice único por usuario
         initial_portfolio = Portfolio(
             user_id=user_id,
             total_balance=40000.0,
             available_balance=35000.0,
             in_orders=5000.0,
             initial_investment=40000.0
+        ).dict()
+        initial_portfolio.pop("user_id")
+        await db.portfolios.update_one(
+            {"user_id": user_id},
+            {"$setOnInsert": initial_portfolio},
+            upsert=True
         )
-        await db.portfolios.insert_one(initial_portfolio.dict())
-        portfolio = initial_portfolio.dict()
+        portfolio = await db.portfolios.find_one({"user_id": user_id})
     
     # Actualizar con datos en tiempo real si hay conexión con Zaffex
     if zaffex_service.is_user_connected(user_id):
         try:
-            balance_info = await zaffex_service.get_account_balance(user_id)
+            # Balance cacheado en el servicio por (usuario, API key); se descarta al desconectar
+            balance_info = await zaffex_service.get_account_balance(user_id, max_age=PORTFOLIO_BALANCE_TTL)
             
             # Actualizar balances
-            portfolio["total_balance"] = balance_info["total_balance"]
-            portfolio["available_balance"] = balance_info["available_balance"] 
-            portfolio["in_orders"] = balance_info["in_orders"]
+            live = {
+                "total_balance": balance_info["total_balance"],
+                "available_balance": balance_info["available_balance"],
+                "in_orders": balance_info["in_orders"]
+            }
             
             # Calcular métricas de rendimiento
-            portfolio["total_profit_loss"] = portfolio["total_balance"] - portfolio["initial_investment"]
-            portfolio["total_profit_percentage"] = (portfolio["total_profit_loss"] / portfolio["initial_investment"]) * 100
+            live["total_profit_loss"] = live["total_balance"] - portfolio["initial_investment"]
+            live["total_profit_percentage"] = (live["total_profit_loss"] / portfolio["initial_investment"]) * 100
+            
+            changed = {k: v for k, v in live.items() if portfolio.get(k) != v}
+            portfolio.update(live)
             
-            # Actualizar en base de datos
-            await db.portfolios.update_one(
-                {"user_id": user_id},
-                {"$set": portfolio}
-            )
+            # Persistir solo si hay cambios y como mucho una vez por intervalo
+            if changed and _should_persist(user_id):
+                await db.portfolios.update_one(
+                    {"user_id": user_id},
+                    {"$set": {**live, "updated_at": datetime.utcnow()}}
+                )
             
         except Exception as e:
             print(f"Error actualizando portfolio desde Zaffex: {e}")
@@ -69,73 +99,50 @@ async def get_portfolio(user_id: str = Depends(get_current_user_id)):
     return PortfolioResponse(**portfolio)
 
 @router.get("/holdings", response_model=List[AssetHolding])
-async def get_asset_holdings(user_id: str = Depends(get_current_user_id)):
+async def get_asset_holdings(user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Obtener las tenencias de activos del usuario"""
     
-    # Obtener trades recientes para calcular holdings
-    trades_cursor = db.trades.find({"user_id": user_id, "status": "executed"})
-    trades = await trades_cursor.to_list(length=None)
-    
-    # Agrupar por activo
-    holdings_dict = {}
-    
-    for trade in trades:
-        symbol = trade["trading_pair"].split("/")[0]  # BTC de BTC/USDT
-        
-        if symbol not in holdings_dict:
-            holdings_dict[symbol] = {
-                "symbol": symbol,
-                "amount": 0.0,
-                "total_cost": 0.0,
-                "trades": 0
-            }
-        
-        if trade["trade_type"] == "BUY":
-            holdings_dict[symbol]["amount"] += trade["amount"]
-            holdings_dict[symbol]["total_cost"] += trade["total_value"]
-        else:  # SELL
-            holdings_dict[symbol]["amount"] -= trade["amount"]
-            holdings_dict[symbol]["total_cost"] -= trade["total_value"]
-        
-        holdings_dict[symbol]["trades"] += 1
+    # Posiciones materializadas: un documento por activo, no por trade
+    positions_cursor = db.positions.find(
+        {"user_id": user_id, "amount": {"$gt": 0}},  # Solo activos con balance positivo
+        {"_id": 0, "symbol": 1, "amount": 1, "total_cost": 1}
+    )
+    positions = await positions_cursor.to_list(length=None)
     
     # Obtener precios actuales
-    symbols = [f"{symbol}/USDT" for symbol in holdings_dict.keys()]
+    symbols = [f"{position['symbol']}/USDT" for position in positions]
     market_data = await zaffex_service.get_market_data(symbols) if symbols else []
+    prices = {market["symbol"]: market["price"] for market in market_data}
     
     # Crear objetos AssetHolding
     holdings = []
-    for symbol, data in holdings_dict.items():
-        if data["amount"] > 0:  # Solo mostrar activos con balance positivo
-            # Buscar precio actual
-            current_price = 0
-            for market in market_data:
-                if market["symbol"] == f"{symbol}/USDT":
-                    current_price = market["price"]
-                    break
-            
-            average_price = data["total_cost"] / data["amount"] if data["amount"] > 0 else 0
-            total_value = data["amount"] * current_price
-            profit_loss = total_value - (data["amount"] * average_price)
-            profit_percentage = (profit_loss / (data["amount"] * average_price)) * 100 if average_price > 0 else 0
-            
-            holding = AssetHolding(
-                symbol=symbol,
-                amount=data["amount"],
-                average_price=average_price,
-                current_price=current_price,
-                total_value=total_value,
-                profit_loss=profit_loss,
-                profit_percentage=profit_percentage
-            )
-            holdings.append(holding)
+    for data in positions:
+        symbol = data["symbol"]
+        current_price = prices.get(f"{symbol}/USDT", 0)
+        
+        average_price = data["total_cost"] / data["amount"]
+        total_value = data["amount"] * current_price
+        profit_loss = total_value - (data["amount"] * average_price)
+        profit_percentage = (profit_loss / (data["amount"] * average_price)) * 100 if average_price > 0 else 0
+        
+        holding = AssetHolding(
+            symbol=symbol,
+            amount=data["amount"],
+            average_price=average_price,
+            current_price=current_price,
+            total_value=total_value,
+            profit_loss=profit_loss,
+            profit_percentage=profit_percentage
+        )
+        holdings.append(holding)
     
     return holdings
 
 @router.get("/performance")
 async def get_portfolio_performance(
     period: str = "7d",  # 1d, 7d, 30d, 1y
-    user_id: str = Depends(get_current_user_id)
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Obtener métricas de rendimiento del portfolio"""
     
@@ -152,39 +159,23 @@ async def get_portfolio_performance(
     else:
         start_date = now - timedelta(days=7)
     
-    # Obtener trades del período
-    trades_cursor = db.trades.find({
-        "user_id": user_id,
-        "executed_at": {"$gte": start_date},
-        "status": "executed"
-    }).sort("executed_at", 1)
+    # Rollups, últimos trades y portfolio son independientes: se piden en paralelo.
+    # Una rama lenta o con error devuelve su valor por defecto y marca la respuesta como parcial.
+    degraded: List[str] = []
+    granularity = granularity_for(start_date, now)
+    summary, recent_trades, portfolio = await asyncio.gather(
+        _branch("summary", rollup_summary(db, {"user_id": user_id}, start_date, granularity), {
+            "totals": {"total_trades": 0, "profitable_trades": 0, "total_profit_loss": 0, "total_volume": 0},
+            "daily_data": [],
+            "by_pair": []
+        }, degraded),
+        _branch("recent_trades", get_recent_trades(user_id, start_date, db), [], degraded),
+        _branch("portfolio", get_portfolio(user_id, db), None, degraded)
+    )
     
-    trades = await trades_cursor.to_list(length=None)
-    
-    # Calcular métricas
-    total_trades = len(trades)
-    profitable_trades = len([t for t in trades if t.get("profit_loss", 0) > 0])
-    total_profit_loss = sum([t.get("profit_loss", 0) for t in trades])
-    total_volume = sum([t.get("total_value", 0) for t in trades])
-    
-    # Agrupar por día para gráfico
-    daily_performance = {}
-    for trade in trades:
-        date_key = trade["executed_at"].strftime("%Y-%m-%d")
-        if date_key not in daily_performance:
-            daily_performance[date_key] = {
-                "date": date_key,
-                "profit_loss": 0,
-                "trades": 0,
-                "volume": 0
-            }
-        
-        daily_performance[date_key]["profit_loss"] += trade.get("profit_loss", 0)
-        daily_performance[date_key]["trades"] += 1
-        daily_performance[date_key]["volume"] += trade.get("total_value", 0)
-    
-    # Obtener portfolio actual
-    portfolio = await get_portfolio(user_id)
+    totals = summary["totals"]
+    total_trades = totals["total_trades"]
+    profitable_trades = totals["profitable_trades"]
     
     return {
         "period": period,
@@ -192,47 +183,40 @@ async def get_portfolio_performance(
             "total_trades": total_trades,
             "profitable_trades": profitable_trades,
             "win_rate": (profitable_trades / total_trades * 100) if total_trades > 0 else 0,
-            "total_profit_loss": total_profit_loss,
-            "total_volume": total_volume,
-            "current_balance": portfolio.total_balance,
-            "roi": portfolio.total_profit_percentage
+            "total_profit_loss": totals["total_profit_loss"],
+            "total_volume": totals["total_volume"],
+            "current_balance": portfolio.total_balance if portfolio else None,
+            "roi": portfolio.total_profit_percentage if portfolio else None
         },
-        "daily_data": list(daily_performance.values()),
-        "top_performing_assets": await get_top_performing_assets(user_id, start_date),
-        "recent_trades": trades[-10:] if trades else []
+        "daily_data": summary["daily_data"],
+        "top_performing_assets": format_top_assets(summary["by_pair"]),
+        "recent_trades": recent_trades,
+        "partial": bool(degraded),
+        "degraded": degraded
     }
 
-async def get_top_performing_assets(user_id: str, start_date: datetime):
-    """Obtener los activos con mejor rendimiento"""
-    
-    # Obtener trades del período agrupados por activo
-    pipeline = [
-        {
-            "$match": {
-                "user_id": user_id,
-                "executed_at": {"$gte": start_date},
-                "status": "executed"
-            }
-        },
-        {
-            "$group": {
-                "_id": "$trading_pair",
-                "total_profit_loss": {"$sum": "$profit_loss"},
-                "total_trades": {"$sum": 1},
-                "total_volume": {"$sum": "$total_value"}
-            }
-        },
-        {
-            "$sort": {"total_profit_loss": -1}
-        },
-        {
-            "$limit": 5
-        }
-    ]
+async def _branch(name: str, coro, default, degraded: List[str]):
+    """Ejecutar una rama del rendimiento con timeout; ante fallo devuelve `default`"""
+    try:
+        return await asyncio.wait_for(coro, PERFORMANCE_BRANCH_TIMEOUT)
+    except Exception as e:
+        print(f"Rama '{name}' del rendimiento no disponible: {e!r}")
+        degraded.append(name)
+        return default
+
+async def get_recent_trades(user_id: str, start_date: datetime, db: AsyncIOMotorDatabase, limit: int = 10):
+    """Últimos trades ejecutados del período, en orden cronológico"""
     
-    cursor = db.trades.aggregate(pipeline)
-    results = await cursor.to_list(length=None)
+    recent_cursor = db.trades.find(
+        {"user_id": user_id, "status": "executed", "executed_at": {"$gte": start_date}},
+        {"_id": 0}
+    ).sort("executed_at", -1).limit(limit)
+    recent_trades = await recent_cursor.to_list(length=limit)
     
+    # Orden cronológico, como el resto de la respuesta
+    return list(reversed(recent_trades))
+
+def format_top_assets(results: List[dict]):
     return [
         {
             "asset": result["_id"],
@@ -244,7 +228,7 @@ async def get_top_performing_assets(user_id: str, start_date: datetime):
     ]
 
 @router.post("/sync")
-async def sync_portfolio_with_zaffex(user_id: str = Depends(get_current_user_id)):
+async def sync_portfolio_with_zaffex(user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Sincronizar portfolio con datos de Zaffex"""
     
     if not zaffex_service.is_user_connected(user_id):
@@ -254,9 +238,14 @@ async def sync_portfolio_with_zaffex(user_id: str = Depends(get_current_user_id)
         )
     
     try:
-        # Obtener datos actualizados de Zaffex
+        # Obtener datos actualizados de Zaffex; la sincronización explícita no reutiliza el balance cacheado
+        zaffex_service.invalidate_balance(user_id)
         balance_info = await zaffex_service.get_account_balance(user_id)
-        order_history = await zaffex_service.get_order_history(user_id, limit=100)
+        # Solo las órdenes posteriores a la última sincronización
+        order_sync = await sync_order_history(
+            db, zaffex_service, user_id,
+            listeners=[record_trade_positions, record_trade_rollups]
+        )
         
         # Actualizar portfolio
         portfolio = await db.portfolios.find_one({"user_id": user_id})
@@ -283,7 +272,7 @@ async def sync_portfolio_with_zaffex(user_id: str = Depends(get_current_user_id)
         return {
             "message": "Portfolio sincronizado exitosamente",
             "balance_info": balance_info,
-            "orders_imported": len(order_history),
+            "orders_imported": order_sync["orders_imported"],
             "sync_time": datetime.utcnow()
         }
         
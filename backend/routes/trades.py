@@ -0,0 +1,89 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Dict, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+
+from models.trade import Trade, TradeStatus
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
+
+router = APIRouter(prefix="/api/trades", tags=["trades"])
+
+# Campos que se pueden pedir con `fields`; executed_at e id siempre se incluyen (forman el cursor)
+TRADE_FIELDS = set(Trade.__fields__)
+CURSOR_FIELDS = {"executed_at", "id"}
+
+def get_current_user_id():
+    return "user_123"  # En producción, esto vendría del JWT token
+
+def encode_cursor(executed_at: datetime, trade_id: str) -> str:
+    """Cursor opaco con la clave (executed_at, id) del último trade de la página"""
+    raw = json.dumps([executed_at.isoformat(), trade_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        executed_at, trade_id = json.loads(raw)
+        return datetime.fromisoformat(executed_at), str(trade_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Cursor inválido") from e
+
+def build_projection(fields: Optional[str]) -> Dict:
+    if not fields:
+        return {"_id": 0}
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - TRADE_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Campos desconocidos: {', '.join(sorted(unknown))}")
+
+    return {"_id": 0, **{field: 1 for field in requested | CURSOR_FIELDS}}
+
+@router.get("/")
+async def list_trades(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    bot_id: Optional[str] = None,
+    trading_pair: Optional[str] = None,
+    status: Optional[TradeStatus] = None,
+    fields: Optional[str] = None,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """
+    Historial de trades del usuario, del más reciente al más antiguo
+
+    Paginación por clave (executed_at, id): cada página es un rango del índice,
+    así que una página profunda cuesta lo mismo que la primera.
+    """
+
+    query = {"user_id": user_id, "executed_at": {"$type": "date"}}
+    if bot_id:
+        query["bot_id"] = bot_id
+    if trading_pair:
+        query["trading_pair"] = trading_pair
+    if status:
+        query["status"] = status.value
+
+    if cursor:
+        executed_at, trade_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"executed_at": {"$lt": executed_at}},
+            {"executed_at": executed_at, "id": {"$lt": trade_id}}
+        ]
+
+    # Un documento de más para saber si hay página siguiente
+    trades_cursor = db.trades.find(query, build_projection(fields)).sort(
+        [("executed_at", -1), ("id", -1)]
+    ).limit(limit + 1)
+    trades = await trades_cursor.to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(trades) > limit:
+        trades = trades[:limit]
+        last = trades[-1]
+        next_cursor = encode_cursor(last["executed_at"], last["id"])
+
+    return {"trades": trades, "next_cursor": next_cursor}
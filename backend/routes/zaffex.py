@@ -1,22 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import Dict, List
 from datetime import datetime
-import os
-from pathlib import Path
-from dotenv import load_dotenv
 
 from models.user import ZaffexConnectionUpdate
 from services.production_zaffex_service import production_zaffex_service as zaffex_service
-from motor.motor_asyncio import AsyncIOMotorClient
-
-# Load environment variables
-ROOT_DIR = Path(__file__).parent.parent
-load_dotenv(ROOT_DIR / '.env')
-
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from database import get_db
 
 router = APIRouter(prefix="/api/zaffex", tags=["zaffex"])
 
@@ -26,7 +15,8 @@ def get_current_user_id():
 @router.post("/connect")
 async def connect_zaffex(
     connection_data: ZaffexConnectionUpdate, 
-    user_id: str = Depends(get_current_user_id)
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Conectar cuenta de Zaffex con credenciales API"""
     
@@ -78,7 +68,7 @@ async def connect_zaffex(
         raise HTTPException(status_code=500, detail=f"Error al conectar con Zaffex: {str(e)}")
 
 @router.delete("/disconnect")
-async def disconnect_zaffex(user_id: str = Depends(get_current_user_id)):
+async def disconnect_zaffex(user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Desconectar cuenta de Zaffex"""
     
     # Desconectar del servicio
@@ -100,7 +90,7 @@ async def disconnect_zaffex(user_id: str = Depends(get_current_user_id)):
     return {"message": "Desconectado de Zaffex exitosamente"}
 
 @router.get("/status")
-async def get_zaffex_status(user_id: str = Depends(get_current_user_id)):
+async def get_zaffex_status(user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Obtener estado de la conexión con Zaffex"""
     
     user = await db.users.find_one({"id": user_id})
@@ -120,7 +110,7 @@ async def get_zaffex_status(user_id: str = Depends(get_current_user_id)):
     }
 
 @router.get("/balance")
-async def get_zaffex_balance(user_id: str = Depends(get_current_user_id)):
+async def get_zaffex_balance(user_id: str = Depends(get_current_user_id), db: AsyncIOMotorDatabase = Depends(get_db)):
     """Obtener balance actual de Zaffex"""
     
     if not zaffex_service.is_user_connected(user_id):
@@ -165,6 +155,15 @@ async def get_market_data(symbols: str = "BTC/USDT,ETH/USDT,ADA/USDT,DOT/USDT"):
             detail=f"Error al obtener datos de mercado: {str(e)}"
         )
 
+@router.get("/circuits")
+async def get_circuit_states():
+    """Estado de los circuit breakers por endpoint de Zaffex"""
+    
+    return {
+        "circuits": zaffex_service.circuit_states(),
+        "rate_limiter": zaffex_service.rate_limiter.stats()
+    }
+
 @router.get("/order-history")
 async def get_order_history(
     limit: int = 50, 
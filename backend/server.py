@@ -1,7 +1,7 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Depends
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
 import os
 import logging
 from pathlib import Path
@@ -10,17 +10,52 @@ from typing import List
 import uuid
 from datetime import datetime
 
+# Shared MongoDB client
+from database import get_db, get_database, close_client
+
 # Import route modules
-from routes import bots, zaffex, portfolio
+from routes import bots, zaffex, portfolio, trades
+from services.production_zaffex_service import production_zaffex_service
+from services.bot_registry import bot_state_registry
+from services.trade_journal import trade_journal
+from services.index_manager import index_manager
+from services.order_sync import dedupe_demo_order_ids
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+
+# Índices para los patrones de acceso de las rutas
+index_manager.declare("bots", [("id", 1), ("user_id", 1)], name="bots_id_user", unique=True)
+index_manager.declare("bots", [("user_id", 1)], name="bots_user")
+index_manager.declare("bots", [("is_active", 1), ("scheduler_lease_until", 1)], name="bots_active_lease")
+index_manager.declare("trades", [("user_id", 1), ("status", 1), ("executed_at", 1)], name="trades_user_status_executed")
+index_manager.declare(
+    "trades", [("user_id", 1), ("zaffex_order_id", 1)], name="trades_user_zaffex_order", unique=True,
+    partialFilterExpression={"zaffex_order_id": {"$type": "string"}}
+)
+index_manager.prepare("trades", "trades_user_zaffex_order", dedupe_demo_order_ids)
+index_manager.retire("trades", "trades_zaffex_order")
+index_manager.declare(
+    "trades", [("user_id", 1), ("executed_at", -1), ("id", -1)], name="trades_user_executed_id"
+)
+index_manager.declare(
+    "trades", [("user_id", 1), ("bot_id", 1), ("executed_at", -1), ("id", -1)], name="trades_user_bot_executed_id"
+)
+index_manager.declare("sync_state", [("user_id", 1), ("source", 1)], name="sync_state_user_source", unique=True)
+index_manager.declare("portfolios", [("user_id", 1)], name="portfolios_user", unique=True)
+index_manager.declare("positions", [("user_id", 1), ("symbol", 1)], name="positions_user_symbol", unique=True)
+index_manager.declare(
+    "trade_rollups",
+    [("user_id", 1), ("granularity", 1), ("bucket", 1), ("bot_id", 1), ("trading_pair", 1)],
+    name="rollups_user_bucket", unique=True
+)
+index_manager.declare("users", [("id", 1)], name="users_id", unique=True)
+
+# Índices sin consultas desde que /performance lee los contadores del bot
+index_manager.retire("trades", "trades_bot_created")
+index_manager.retire("trade_rollups", "rollups_bot_bucket")
 
 # Create the main app
 app = FastAPI(
@@ -59,15 +94,20 @@ async def health_check():
         "database": "connected"
     }
 
+@api_router.get("/health/indexes")
+async def index_health(db: AsyncIOMotorDatabase = Depends(get_db)):
+    """Índices declarados que faltan e índices sin uso"""
+    return await index_manager.report(db)
+
 @api_router.post("/status", response_model=StatusCheck)
-async def create_status_check(input: StatusCheckCreate):
+async def create_status_check(input: StatusCheckCreate, db: AsyncIOMotorDatabase = Depends(get_db)):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
     _ = await db.status_checks.insert_one(status_obj.dict())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
+async def get_status_checks(db: AsyncIOMotorDatabase = Depends(get_db)):
     status_checks = await db.status_checks.find().to_list(1000)
     return [StatusCheck(**status_check) for status_check in status_checks]
 
@@ -78,6 +118,7 @@ app.include_router(api_router)
 app.include_router(bots.router)
 app.include_router(zaffex.router)
 app.include_router(portfolio.router)
+app.include_router(trades.router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -94,6 +135,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_indexes():
+    index_manager.start(get_database())
+
+@app.on_event("startup")
+async def startup_zaffex_session():
+    await production_zaffex_service.start()
+
+@app.on_event("startup")
+async def startup_bot_scheduler():
+    db = get_database()
+    trade_journal.start(db)
+    bots.bot_scheduler.start()
+    # Planificar los bots activos cuyo lease obtiene este worker
+    bot_state_registry.start(
+        db.bots,
+        on_claim=lambda bot: bots.bot_scheduler.schedule(bot["id"], bot["user_id"])
+    )
+
+@app.on_event("shutdown")
+async def shutdown_bot_scheduler():
+    await bots.bot_scheduler.stop()
+    await trade_journal.stop()
+    await bot_state_registry.stop()
+
+@app.on_event("shutdown")
+async def shutdown_zaffex_session():
+    await production_zaffex_service.close()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    close_client()
@@ -0,0 +1,198 @@
+"""
+Backtesting vectorizado de las estrategias de los bots
+Señales e indicadores con NumPy sobre arrays OHLCV; salidas por stop loss / take profit
+"""
+
+import math
+from typing import Dict, Mapping, Optional
+
+import numpy as np
+
+from models.bot import Strategy
+
+# Comisión por lado, la misma que aplica el modo demo del servicio de Zaffex
+FEE_RATE = 0.001
+
+DEFAULT_PARAMS = {
+    Strategy.DCA_RSI: {"rsi_period": 14, "oversold": 30.0},
+    Strategy.MOMENTUM_TRADING: {"fast_period": 12, "slow_period": 26},
+    Strategy.GRID_TRADING: {"grid_period": 20, "grid_step": 1.0}
+}
+
+# Con d = 1 - alpha, un bloque se limita para que d^-k no pase de 1e12 y no se pierda precisión
+_MAX_BLOCK_SCALE = 12 * math.log(10)
+
+
+def ema(values: np.ndarray, period: int, alpha: Optional[float] = None) -> np.ndarray:
+    """
+    EMA de todo el array, sembrada con la SMA de los primeros `period` valores (NaN antes)
+
+    La recurrencia y[t] = d*y[t-1] + alpha*x[t] se resuelve por bloques con sumas
+    acumuladas escaladas por potencias de d, sin bucle por elemento.
+    """
+    alpha = 2.0 / (period + 1) if alpha is None else alpha
+    decay = 1.0 - alpha
+    n = len(values)
+    out = np.full(n, np.nan)
+    if n < period:
+        return out
+
+    out[period - 1] = values[:period].mean()
+    if decay == 0.0:
+        out[period:] = values[period:]
+        return out
+
+    block = max(1, int(_MAX_BLOCK_SCALE / -math.log(decay)))
+    powers = decay ** np.arange(block + 1)
+    inverse = 1.0 / powers[1:]
+
+    previous = out[period - 1]
+    start = period
+    while start < n:
+        chunk = values[start:start + block]
+        k = len(chunk)
+        # y[j] = d^(j+1) * prev + alpha * d^j * sum_{i<=j} x[i] * d^-i
+        scaled = np.cumsum(chunk * inverse[:k] * decay)
+        out[start:start + k] = powers[1:k + 1] * previous + alpha * powers[:k] * scaled
+        previous = out[start + k - 1]
+        start += k
+    return out
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if len(values) >= period:
+        sums = np.cumsum(values)
+        out[period - 1] = sums[period - 1]
+        out[period:] = sums[period:] - sums[:-period]
+        out[period - 1:] /= period
+    return out
+
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """RSI de Wilder: medias exponenciales con alpha = 1/period de subidas y bajadas"""
+    out = np.full(len(close), np.nan)
+    if len(close) <= period:
+        return out
+
+    change = np.diff(close)
+    gains = ema(np.maximum(change, 0.0), period, alpha=1.0 / period)
+    losses = ema(np.maximum(-change, 0.0), period, alpha=1.0 / period)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100.0 - 100.0 / (1.0 + gains / losses)
+    values = np.where(losses == 0, np.where(gains > 0, 100.0, 50.0), values)
+    out[1:] = np.where(np.isnan(gains), np.nan, values)
+    return out
+
+
+def entry_signals(strategy: Strategy, close: np.ndarray, params: Mapping) -> np.ndarray:
+    """Máscara booleana de velas con señal de compra"""
+    if strategy == Strategy.DCA_RSI:
+        values = rsi(close, int(params["rsi_period"]))
+        with np.errstate(invalid="ignore"):
+            return values < params["oversold"]
+
+    if strategy == Strategy.MOMENTUM_TRADING:
+        fast = ema(close, int(params["fast_period"]))
+        slow = ema(close, int(params["slow_period"]))
+        with np.errstate(invalid="ignore"):
+            above = fast > slow
+        # Cruce al alza de la EMA rápida sobre la lenta
+        signals = np.zeros(len(close), dtype=bool)
+        signals[1:] = above[1:] & ~above[:-1]
+        return signals
+
+    if strategy == Strategy.GRID_TRADING:
+        mean = sma(close, int(params["grid_period"]))
+        with np.errstate(invalid="ignore"):
+            return close < mean * (1 - params["grid_step"] / 100)
+
+    raise ValueError(f"Estrategia sin backtest: {strategy.value}")
+
+
+def _first_exit(low: np.ndarray, high: np.ndarray, start: int,
+                stop_price: float, take_price: float) -> int:
+    """Primera vela desde `start` que toca el stop o el objetivo; len(low) si ninguna"""
+    n = len(low)
+    size = 256
+    while start < n:
+        end = min(start + size, n)
+        hits = (low[start:end] <= stop_price) | (high[start:end] >= take_price)
+        if hits.any():
+            return start + int(hits.argmax())
+        start = end
+        size *= 2  # Posiciones largas: ventanas cada vez mayores
+    return n
+
+
+def run_backtest(
+    candles: Mapping[str, np.ndarray],
+    strategy: Strategy,
+    stop_loss_percentage: float = 5.0,
+    take_profit_percentage: float = 10.0,
+    max_investment_per_trade: float = 100.0,
+    initial_investment: float = 1000.0,
+    params: Optional[Mapping] = None
+) -> Dict:
+    """
+    Simular una configuración de bot sobre velas históricas
+
+    `candles` contiene arrays "open", "high", "low", "close". Una sola posición
+    a la vez: se compra al cierre de la vela con señal por `max_investment_per_trade`
+    y se vende al tocar el stop loss o el take profit (el stop primero si ambos caen
+    en la misma vela; al precio de apertura si la vela abre más allá). Una posición
+    abierta al final se cierra al último cierre. Cada lado paga FEE_RATE.
+    """
+    strategy = Strategy(strategy)
+    params = {**DEFAULT_PARAMS.get(strategy, {}), **(params or {})}
+
+    open_ = np.asarray(candles["open"], dtype=np.float64)
+    high = np.asarray(candles["high"], dtype=np.float64)
+    low = np.asarray(candles["low"], dtype=np.float64)
+    close = np.asarray(candles["close"], dtype=np.float64)
+
+    signal_index = np.flatnonzero(entry_signals(strategy, close, params))
+    stop_factor = 1 - stop_loss_percentage / 100
+    take_factor = 1 + take_profit_percentage / 100
+
+    entries = []
+    exits = []
+    position = 0
+    while position < len(signal_index):
+        entry = int(signal_index[position])
+        entry_price = close[entry]
+        stop_price = entry_price * stop_factor
+        take_price = entry_price * take_factor
+
+        exit_bar = _first_exit(low, high, entry + 1, stop_price, take_price)
+        if exit_bar == len(close):
+            exit_price = close[-1]
+        elif low[exit_bar] <= stop_price:
+            exit_price = min(open_[exit_bar], stop_price)
+        else:
+            exit_price = max(open_[exit_bar], take_price)
+
+        entries.append(entry_price)
+        exits.append(exit_price)
+        # Siguiente señal posterior a la salida
+        position = int(np.searchsorted(signal_index, exit_bar, side="right"))
+
+    entry_prices = np.asarray(entries)
+    exit_prices = np.asarray(exits)
+    notional = max_investment_per_trade
+    pnl = notional * (exit_prices / entry_prices - 1) - FEE_RATE * notional * (1 + exit_prices / entry_prices)
+
+    total_trades = int(len(pnl))
+    successful_trades = int((pnl > 0).sum())
+    profit = float(pnl.sum())
+
+    return {
+        "strategy": strategy.value,
+        "profit": profit,
+        "roi": (profit / initial_investment * 100) if initial_investment > 0 else 0,
+        "accuracy": (successful_trades / total_trades * 100) if total_trades > 0 else 0,
+        "total_trades": total_trades,
+        "successful_trades": successful_trades,
+        "bars": int(len(close))
+    }
@@ -0,0 +1,212 @@
+"""
+Registro en memoria del estado de los bots activos
+Los ciclos de trading leen de aquí en lugar de consultar Mongo en cada iteración
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from models.bot import BotStatus
+
+logger = logging.getLogger(__name__)
+
+# Campos del bot que necesita el ciclo de trading
+BOT_STATE_FIELDS = (
+    "id",
+    "user_id",
+    "is_active",
+    "status",
+    "strategy",
+    "initial_investment",
+    "max_investment_per_trade",
+    "stop_loss_percentage",
+    "take_profit_percentage"
+)
+
+BOT_STATE_PROJECTION = {field: 1 for field in BOT_STATE_FIELDS} | {"_id": 0}
+
+# Lease en el documento del bot: qué worker lo planifica y hasta cuándo
+OWNER_FIELD = "scheduler_owner"
+LEASE_FIELD = "scheduler_lease_until"
+
+
+class BotStateRegistry:
+    """
+    Estado de los bots que planifica este proceso
+
+    Se mantiene al día desde las escrituras de activate/deactivate/update/delete.
+    Como esas escrituras pueden llegar a otro worker, una reconciliación periódica
+    refresca todos los bots registrados con una única consulta `$in`.
+
+    Con varios workers, cada bot activo tiene un lease en Mongo (`scheduler_owner`,
+    `scheduler_lease_until`): solo lo planifica el worker que lo reclama con
+    `find_one_and_update`. La reconciliación renueva los leases propios, suelta los
+    bots que ahora son de otro worker y reclama los activos sin dueño o caducados.
+    """
+
+    def __init__(self, reconcile_interval: float = 30.0, lease_ttl: float = 90.0,
+                 owner: Optional[str] = None):
+        self.reconcile_interval = reconcile_interval
+        self.lease_ttl = lease_ttl
+        self.owner = owner or uuid.uuid4().hex
+        self._states: Dict[str, Dict] = {}
+        self._leases: Dict[str, float] = {}  # bot_id -> caducidad local (time.monotonic)
+        self._task: Optional[asyncio.Task] = None
+        self._collection = None
+        self._on_claim: Optional[Callable[[Dict], object]] = None
+
+    def get(self, bot_id: str) -> Optional[Dict]:
+        return self._states.get(bot_id)
+
+    def owns(self, bot_id: str) -> bool:
+        """El lease del bot es de este worker y no ha caducado"""
+        expires = self._leases.get(bot_id)
+        return expires is not None and time.monotonic() < expires
+
+    def put(self, bot: Dict):
+        """Registrar o reemplazar el estado de un bot a partir de su documento"""
+        self._states[bot["id"]] = {field: bot.get(field) for field in BOT_STATE_FIELDS}
+
+    def update(self, bot_id: str, changes: Dict):
+        """Aplicar los campos escritos en Mongo al estado en memoria"""
+        state = self._states.get(bot_id)
+        if state is not None:
+            state.update({k: v for k, v in changes.items() if k in BOT_STATE_FIELDS})
+
+    def remove(self, bot_id: str):
+        self._states.pop(bot_id, None)
+        self._leases.pop(bot_id, None)
+
+    def bot_ids(self) -> List[str]:
+        return list(self._states)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _claimable(self, now: datetime) -> Dict:
+        """Filtro de bots activos, no pausados por error, sin lease vigente de otro worker"""
+        return {
+            "is_active": True,
+            "status": {"$ne": BotStatus.ERROR.value},
+            "$or": [
+                {OWNER_FIELD: self.owner},
+                {LEASE_FIELD: {"$not": {"$gt": now}}}
+            ]
+        }
+
+    async def _claim_one(self, collection, query: Dict) -> Optional[Dict]:
+        now = datetime.utcnow()
+        claimed_at = time.monotonic()
+        bot = await collection.find_one_and_update(
+            {**query, **self._claimable(now)},
+            {"$set": {OWNER_FIELD: self.owner, LEASE_FIELD: now + timedelta(seconds=self.lease_ttl)}},
+            projection=BOT_STATE_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+        if bot is not None:
+            self.put(bot)
+            self._leases[bot["id"]] = claimed_at + self.lease_ttl
+        return bot
+
+    async def claim(self, collection, bot_id: str) -> Optional[Dict]:
+        """Reclamar el lease de un bot activo; None si lo planifica otro worker"""
+        return await self._claim_one(collection, {"id": bot_id})
+
+    async def claim_active(self, collection) -> List[Dict]:
+        """Reclamar, uno a uno, los bots activos sin dueño o con el lease caducado"""
+        claimed = []
+        while True:
+            bot = await self._claim_one(collection, {"id": {"$nin": self.bot_ids()}})
+            if bot is None:
+                return claimed
+            claimed.append(bot)
+
+    async def release(self, collection, bot_ids: List[str]):
+        """Soltar los leases propios para que otro worker pueda reclamarlos ya"""
+        for bot_id in bot_ids:
+            self.remove(bot_id)
+        if bot_ids:
+            await collection.update_many(
+                {"id": {"$in": bot_ids}, OWNER_FIELD: self.owner},
+                {"$unset": {OWNER_FIELD: "", LEASE_FIELD: ""}}
+            )
+
+    async def reconcile(self, collection):
+        """Renovar los leases y refrescar todos los bots registrados con una sola consulta batched"""
+        bot_ids = self.bot_ids()
+        if not bot_ids:
+            return
+
+        renewed_at = time.monotonic()
+        await collection.update_many(
+            {"id": {"$in": bot_ids}, OWNER_FIELD: self.owner},
+            {"$set": {LEASE_FIELD: datetime.utcnow() + timedelta(seconds=self.lease_ttl)}}
+        )
+
+        cursor = collection.find({"id": {"$in": bot_ids}}, BOT_STATE_PROJECTION | {OWNER_FIELD: 1})
+        found = set()
+        async for bot in cursor:
+            # Bots cuyo lease ha pasado a otro worker se dejan de planificar aquí
+            if bot.get(OWNER_FIELD) != self.owner or bot["id"] not in self._states:
+                continue
+            found.add(bot["id"])
+            self.put(bot)
+            self._leases[bot["id"]] = renewed_at + self.lease_ttl
+
+        # Bots eliminados, desactivados o reclamados desde otro worker
+        for bot_id in bot_ids:
+            if bot_id not in found:
+                self.remove(bot_id)
+
+    def start(self, collection, on_claim: Optional[Callable[[Dict], object]] = None):
+        """
+        Lanzar la reconciliación periódica (startup de FastAPI)
+
+        `on_claim` recibe cada bot activo que este worker reclama, empezando por
+        los que ya estaban activos al arrancar.
+        """
+        self._collection = collection
+        self._on_claim = on_claim
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._reconcile_loop(collection))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._collection is not None:
+            try:
+                await self.release(self._collection, self.bot_ids())
+            except Exception as e:
+                logger.warning(f"Could not release bot leases: {e}")
+
+    async def _reconcile_loop(self, collection):
+        while True:
+            try:
+                await self.reconcile(collection)
+                for bot in await self.claim_active(collection):
+                    logger.info(f"Claimed bot {bot['id']} for worker {self.owner}")
+                    if self._on_claim is not None:
+                        self._on_claim(bot)
+            except Exception as e:
+                logger.warning(f"Bot state reconciliation failed: {e}")
+            await asyncio.sleep(self.reconcile_interval)
+
+
+# Registro global compartido por las rutas y el planificador
+bot_state_registry = BotStateRegistry(
+    reconcile_interval=float(os.environ.get('BOT_STATE_RECONCILE_INTERVAL', '30')),
+    lease_ttl=float(os.environ.get('BOT_LEASE_TTL', '90'))
+)
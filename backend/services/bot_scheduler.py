@@ -0,0 +1,153 @@
+"""
+Planificador central de bots de trading
+Un único componente posee todos los bots activos en lugar de una tarea asyncio por bot
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Un ciclo devuelve los segundos hasta su próxima ejecución, o None para dejar de planificar el bot
+CycleRunner = Callable[[str, str], Awaitable[Optional[float]]]
+
+
+@dataclass
+class _ScheduledBot:
+    bot_id: str
+    user_id: str
+    generation: int
+
+
+class BotScheduler:
+    """
+    Heap de próximas ejecuciones con concurrencia acotada
+
+    - Deduplica por bot_id: activar dos veces el mismo bot no crea dos bucles
+    - `cancel` retira el bot del heap (borrado perezoso); un ciclo ya en curso
+      termina (podría tener una orden en vuelo) pero no se vuelve a planificar
+    - Como máximo `max_concurrency` ciclos se ejecutan a la vez
+    """
+
+    def __init__(self, run_cycle: CycleRunner, max_concurrency: int = 50):
+        self._run_cycle = run_cycle
+        self.max_concurrency = max_concurrency
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._bots: Dict[str, _ScheduledBot] = {}
+        self._sequence = itertools.count()
+        self._generations = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: Set[asyncio.Task] = set()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Lanzar el despachador (startup de FastAPI)"""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+            # Bots planificados antes de arrancar el despachador
+            self._wakeup.set()
+
+    async def stop(self):
+        """Detener el despachador y cancelar los ciclos en curso (shutdown de FastAPI)"""
+        self._bots.clear()
+        tasks = list(self._running)
+        if self._dispatcher is not None:
+            tasks.append(self._dispatcher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = None
+        self._heap.clear()
+
+    def schedule(self, bot_id: str, user_id: str, delay: float = 0.0) -> bool:
+        """Planificar un bot; devuelve False si ya estaba planificado"""
+        if bot_id in self._bots:
+            return False
+
+        bot = _ScheduledBot(bot_id, user_id, next(self._generations))
+        self._bots[bot_id] = bot
+        self._push(bot, delay)
+        return True
+
+    def cancel(self, bot_id: str) -> bool:
+        """Dejar de planificar un bot; devuelve False si no estaba planificado"""
+        return self._bots.pop(bot_id, None) is not None
+
+    def is_scheduled(self, bot_id: str) -> bool:
+        return bot_id in self._bots
+
+    def stats(self) -> Dict:
+        """Estado del planificador para monitorización"""
+        return {
+            "scheduled_bots": len(self._bots),
+            "running_cycles": len(self._running),
+            "max_concurrency": self.max_concurrency
+        }
+
+    def _push(self, bot: _ScheduledBot, delay: float):
+        due = asyncio.get_running_loop().time() + max(delay, 0.0)
+        heapq.heappush(self._heap, (due, next(self._sequence), bot.bot_id, bot.generation))
+        if self._wakeup is not None and self._heap[0][2] == bot.bot_id:
+            self._wakeup.set()
+
+    def _is_current(self, bot_id: str, generation: int) -> bool:
+        bot = self._bots.get(bot_id)
+        return bot is not None and bot.generation == generation
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            self._wakeup.clear()
+
+            # Descartar entradas de bots cancelados
+            while self._heap and not self._is_current(self._heap[0][2], self._heap[0][3]):
+                heapq.heappop(self._heap)
+
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            wait = self._heap[0][0] - loop.time()
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, bot_id, generation = heapq.heappop(self._heap)
+
+            await self._slots.acquire()
+            if not self._is_current(bot_id, generation):
+                self._slots.release()
+                continue
+
+            task = loop.create_task(self._execute(self._bots[bot_id]))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, bot: _ScheduledBot):
+        delay = None
+        try:
+            delay = await self._run_cycle(bot.bot_id, bot.user_id)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Unhandled error in trading cycle for bot {bot.bot_id}: {e}")
+        finally:
+            self._slots.release()
+
+        if not self._is_current(bot.bot_id, bot.generation):
+            return
+        if delay is None:
+            self._bots.pop(bot.bot_id, None)
+        else:
+            self._push(bot, delay)
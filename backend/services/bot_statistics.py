@@ -0,0 +1,101 @@
+"""
+Estadísticas de rendimiento de los bots
+Actualizaciones atómicas en una sola operación por bot, agrupables en bulk_write
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+
+def bot_statistics_pipeline(profit_loss: float, trades: int, successful_trades: int,
+                            traded_at: Optional[datetime] = None) -> List[Dict]:
+    """
+    Pipeline de actualización que incrementa los contadores y deriva accuracy y ROI
+
+    `$inc` no puede combinarse con campos derivados en la misma operación, así que
+    el incremento se expresa con `$add`: sigue siendo atómico sobre el documento.
+    """
+    traded_at = traded_at or datetime.utcnow()
+
+    return [
+        {"$set": {
+            "profit": {"$add": [{"$ifNull": ["$profit", 0]}, profit_loss]},
+            "total_trades": {"$add": [{"$ifNull": ["$total_trades", 0]}, trades]},
+            "successful_trades": {"$add": [{"$ifNull": ["$successful_trades", 0]}, successful_trades]},
+            "last_trade_at": traded_at,
+            "updated_at": traded_at
+        }},
+        {"$set": {
+            "accuracy": {"$cond": [
+                {"$gt": ["$total_trades", 0]},
+                {"$multiply": [{"$divide": ["$successful_trades", "$total_trades"]}, 100]},
+                0
+            ]},
+            "roi": {"$cond": [
+                {"$gt": ["$initial_investment", 0]},
+                {"$multiply": [{"$divide": ["$profit", "$initial_investment"]}, 100]},
+                0
+            ]}
+        }}
+    ]
+
+
+async def apply_bot_statistics(collection, deltas: Dict[str, Tuple[float, int, int]]):
+    """
+    Aplicar en un solo bulk_write los deltas agrupados por bot
+
+    `deltas` mapea bot_id -> (profit_loss, trades, successful_trades)
+    """
+    if not deltas:
+        return None
+
+    traded_at = datetime.utcnow()
+    operations = [
+        UpdateOne({"id": bot_id}, bot_statistics_pipeline(profit, trades, wins, traded_at))
+        for bot_id, (profit, trades, wins) in deltas.items()
+    ]
+    return await collection.bulk_write(operations, ordered=False)
+
+
+async def record_trade_statistics(db, trades: List[Dict]):
+    """Listener del diario de trades: agrupa los trades por bot y actualiza sus contadores"""
+    deltas: Dict[str, Tuple[float, int, int]] = {}
+
+    for trade in trades:
+        profit_loss = trade.get("profit_loss", 0)
+        profit, count, wins = deltas.get(trade["bot_id"], (0.0, 0, 0))
+        deltas[trade["bot_id"]] = (profit + profit_loss, count + 1, wins + (1 if profit_loss > 0 else 0))
+
+    await apply_bot_statistics(db.bots, deltas)
+
+
+async def window_statistics(trades_collection, user_id: str, bot_id: str, since: datetime) -> Dict:
+    """
+    Contadores de un bot en una ventana temporal
+
+    Agregación sobre el índice (user_id, bot_id, executed_at): solo lee los trades de la ventana.
+    """
+    pipeline = [
+        {"$match": {
+            "user_id": user_id,
+            "bot_id": bot_id,
+            "executed_at": {"$gte": since},
+            "status": "executed"
+        }},
+        {"$group": {
+            "_id": None,
+            "total_trades": {"$sum": 1},
+            "successful_trades": {"$sum": {"$cond": [{"$gt": ["$profit_loss", 0]}, 1, 0]}},
+            "profit": {"$sum": "$profit_loss"}
+        }}
+    ]
+
+    results = await trades_collection.aggregate(pipeline).to_list(length=1)
+    totals = results[0] if results else {}
+    return {
+        "total_trades": totals.get("total_trades", 0),
+        "successful_trades": totals.get("successful_trades", 0),
+        "profit": totals.get("profit", 0)
+    }
@@ -0,0 +1,272 @@
+"""
+Almacén local de velas OHLCV
+Un fichero por columna y (símbolo, intervalo), leído con numpy.memmap sin copias
+"""
+
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = {
+    "timestamp": np.int64,  # Apertura de la vela, ms UTC
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64
+}
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "1h": 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000
+}
+
+# Velas por petición de klines
+KLINES_PAGE_SIZE = 1000
+
+# Velas descargadas que se acumulan antes de fusionarlas con la serie
+MERGE_BATCH = 50_000
+
+
+def interval_ms(interval: str) -> int:
+    try:
+        return INTERVAL_MS[interval]
+    except KeyError:
+        raise ValueError(f"Intervalo no soportado: {interval}") from None
+
+
+class CandleSeries:
+    """
+    Velas de un símbolo e intervalo
+
+    - `append` añade velas posteriores a la última al final de los ficheros
+    - `merge` admite también velas anteriores o de huecos intermedios: si no son
+      todas posteriores, reescribe la serie en un directorio temporal y lo
+      intercambia con el actual
+    - `columns` y `range` devuelven vistas memmap de solo lectura
+    - `timestamp` se escribe la última: tras un corte, la longitud válida es la
+      de la columna más corta
+    """
+
+    def __init__(self, path: Path, interval: str):
+        self.path = path
+        self.interval = interval
+        self.step = interval_ms(interval)
+        self._maps: Optional[Dict[str, np.memmap]] = None
+        self._recover()
+
+    @property
+    def _staging(self) -> Path:
+        return self.path.with_name(self.path.name + ".tmp")
+
+    @property
+    def _previous(self) -> Path:
+        return self.path.with_name(self.path.name + ".old")
+
+    def _recover(self):
+        """Deshacer un intercambio de directorios interrumpido entre los dos os.replace"""
+        if not self.path.exists() and self._previous.exists():
+            os.replace(self._previous, self.path)
+
+    def _file(self, column: str) -> Path:
+        return self.path / f"{column}.bin"
+
+    def __len__(self) -> int:
+        lengths = []
+        for column, dtype in COLUMNS.items():
+            file = self._file(column)
+            lengths.append(file.stat().st_size // np.dtype(dtype).itemsize if file.exists() else 0)
+        return min(lengths)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Todas las columnas como memmaps de solo lectura"""
+        length = len(self)
+        if self._maps is None or len(self._maps["timestamp"]) != length:
+            if length == 0:
+                self._maps = {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS.items()}
+            else:
+                self._maps = {
+                    column: np.memmap(self._file(column), dtype=dtype, mode="r", shape=(length,))
+                    for column, dtype in COLUMNS.items()
+                }
+        return self._maps
+
+    @property
+    def first_timestamp(self) -> Optional[int]:
+        timestamps = self.columns()["timestamp"]
+        return int(timestamps[0]) if len(timestamps) else None
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        timestamps = self.columns()["timestamp"]
+        return int(timestamps[-1]) if len(timestamps) else None
+
+    def range(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Velas con start_ms <= timestamp < end_ms; búsqueda binaria sobre timestamp"""
+        columns = self.columns()
+        timestamps = columns["timestamp"]
+        lo = 0 if start_ms is None else int(np.searchsorted(timestamps, start_ms, side="left"))
+        hi = len(timestamps) if end_ms is None else int(np.searchsorted(timestamps, end_ms, side="left"))
+        return {column: values[lo:hi] for column, values in columns.items()}
+
+    def append(self, candles: Mapping[str, np.ndarray]) -> int:
+        """Añadir velas ordenadas; se descartan las que no son posteriores a la última"""
+        timestamps = np.asarray(candles["timestamp"], dtype=np.int64)
+        last = self.last_timestamp
+        keep = slice(int(np.searchsorted(timestamps, last, side="right")), None) if last is not None else slice(None)
+        if len(timestamps[keep]) == 0:
+            return 0
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        length = len(self)
+        for column in [*COLUMNS][1:] + ["timestamp"]:
+            values = np.asarray(candles[column], dtype=COLUMNS[column])[keep]
+            with open(self._file(column), "r+b" if self._file(column).exists() else "wb") as file:
+                # Truncar restos de una escritura interrumpida antes de añadir
+                file.truncate(length * np.dtype(COLUMNS[column]).itemsize)
+                file.seek(0, os.SEEK_END)
+                values.tofile(file)
+
+        self._maps = None
+        return len(timestamps[keep])
+
+    def merge(self, candles: Mapping[str, np.ndarray]) -> int:
+        """
+        Añadir velas en cualquier posición; devuelve cuántas eran nuevas
+
+        Las velas ya almacenadas se conservan. Si todas las nuevas son posteriores
+        a la última se usa `append`; si no, la serie completa se reescribe, un
+        coste O(n) propio de un backfill, no de la lectura.
+        """
+        timestamps = np.asarray(candles["timestamp"], dtype=np.int64)
+        last = self.last_timestamp
+        if len(timestamps) == 0:
+            return 0
+        if last is None or timestamps.min() > last:
+            _, order = np.unique(timestamps, return_index=True)
+            return self.append({column: np.asarray(candles[column])[order] for column in COLUMNS})
+
+        existing = self.columns()
+        combined = {
+            column: np.concatenate([np.asarray(existing[column], dtype=dtype),
+                                    np.asarray(candles[column], dtype=dtype)])
+            for column, dtype in COLUMNS.items()
+        }
+        # np.unique se queda con la primera aparición: prevalecen las velas almacenadas
+        _, keep = np.unique(combined["timestamp"], return_index=True)
+        added = len(keep) - len(existing["timestamp"])
+        if added == 0:
+            return 0
+
+        # Restos de una reescritura interrumpida (un único escritor: backfill)
+        staging = self._staging
+        for leftover in (staging, self._previous):
+            if leftover.exists():
+                shutil.rmtree(leftover)
+        staging.mkdir(parents=True)
+        for column in [*COLUMNS][1:] + ["timestamp"]:
+            combined[column][keep].tofile(staging / f"{column}.bin")
+
+        # Intercambio: actual -> .old, temporal -> actual; _recover deshace un corte a medias
+        self._maps = None
+        os.replace(self.path, self._previous)
+        os.replace(staging, self.path)
+        shutil.rmtree(self._previous)
+        return added
+
+    def gaps(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Huecos [desde, hasta) sin velas dentro del rango pedido"""
+        timestamps = self.range(start_ms, end_ms)["timestamp"]
+        gaps: List[Tuple[int, int]] = []
+
+        if len(timestamps) == 0:
+            if start_ms is not None and end_ms is not None and start_ms < end_ms:
+                gaps.append((start_ms, end_ms))
+            return gaps
+
+        if start_ms is not None and timestamps[0] - start_ms >= self.step:
+            gaps.append((start_ms, int(timestamps[0])))
+
+        jumps = np.flatnonzero(np.diff(timestamps) > self.step)
+        gaps.extend((int(timestamps[i]) + self.step, int(timestamps[i + 1])) for i in jumps)
+
+        if end_ms is not None and end_ms - timestamps[-1] > self.step:
+            gaps.append((int(timestamps[-1]) + self.step, end_ms))
+        return gaps
+
+
+class CandleStore:
+    """Series de velas bajo `root`/<SÍMBOLO>/<intervalo>/"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._series: Dict[Tuple[str, str], CandleSeries] = {}
+
+    def series(self, symbol: str, interval: str) -> CandleSeries:
+        key = (symbol, interval)
+        series = self._series.get(key)
+        if series is None:
+            path = self.root / symbol.replace("/", "_").upper() / interval
+            series = self._series[key] = CandleSeries(path, interval)
+        return series
+
+    async def backfill(self, zaffex_service, symbol: str, interval: str,
+                       start_ms: int, end_ms: Optional[int] = None) -> int:
+        """
+        Descargar de Zaffex las velas cerradas que faltan en [start_ms, end_ms]
+
+        Rellena los huecos del rango: antes de la primera vela almacenada, entre
+        velas y después de la última. Solo se guardan velas cerradas, para no
+        fijar una vela aún en curso.
+        """
+        series = self.series(symbol, interval)
+        closed_before = int(time.time() * 1000) - series.step
+        end_ms = min(end_ms or closed_before, closed_before)
+        added = 0
+
+        for gap_start, gap_end in series.gaps(start_ms, end_ms + 1):
+            pages: List[Mapping[str, np.ndarray]] = []
+            buffered = 0
+            cursor = gap_start
+
+            while cursor < gap_end:
+                page = await zaffex_service.get_klines(
+                    symbol, interval, start_ms=cursor, end_ms=gap_end - 1, limit=KLINES_PAGE_SIZE
+                )
+                if len(page["timestamp"]) == 0:
+                    break
+                pages.append(page)
+                buffered += len(page["timestamp"])
+                cursor = int(page["timestamp"][-1]) + series.step
+
+                if buffered >= MERGE_BATCH:
+                    added += series.merge(_concat(pages))
+                    pages, buffered = [], 0
+
+            if pages:
+                added += series.merge(_concat(pages))
+
+        if added:
+            logger.info(f"Stored {added} {interval} candles for {symbol}")
+        return added
+
+
+def _concat(pages: List[Mapping[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    return {column: np.concatenate([page[column] for page in pages]) for column in COLUMNS}
+
+
+# Instancia global del almacén de velas
+candle_store = CandleStore(
+    os.environ.get('CANDLE_STORE_DIR', str(Path(__file__).parent.parent / "data" / "candles"))
+)
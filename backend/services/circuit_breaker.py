@@ -0,0 +1,104 @@
+"""
+Circuit breaker para endpoints de la API de Zaffex
+Tras varios fallos seguidos el circuito se abre y las llamadas fallan al instante;
+una sonda en segundo plano lo vuelve a cerrar cuando el exchange responde
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto: la llamada no se intenta"""
+
+
+class CircuitBreaker:
+    """
+    Estado de salud de un endpoint
+
+    - closed: las llamadas pasan; `failure_threshold` fallos seguidos lo abren
+    - open: `before_call` lanza CircuitOpenError sin tocar la red
+    - half_open: la sonda (`probe`) está comprobando el endpoint; las llamadas siguen fallando
+      rápido hasta que la sonda tiene éxito y cierra el circuito
+    """
+
+    def __init__(self, name: str, probe: Callable[[], Awaitable[object]],
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def before_call(self):
+        if self.state != CLOSED:
+            raise CircuitOpenError(f"Circuit '{self.name}' is {self.state}")
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != CLOSED:
+            self._close()
+
+    def record_failure(self, error: object):
+        self.failures += 1
+        self.last_error = str(error) or error.__class__.__name__
+        if self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(
+            f"Circuit '{self.name}' opened after {self.failures} failures: {self.last_error}"
+        )
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.get_running_loop().create_task(self._run_probe())
+
+    def _close(self):
+        logger.info(f"Circuit '{self.name}' closed")
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    async def _run_probe(self):
+        while self.state != CLOSED:
+            await asyncio.sleep(self.reset_timeout)
+            self.state = HALF_OPEN
+            try:
+                await self.probe()
+            except Exception as e:
+                self.last_error = str(e) or e.__class__.__name__
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                logger.info(f"Circuit '{self.name}' probe failed: {self.last_error}")
+            else:
+                self._close()
+
+    async def stop(self):
+        if self._probe_task is not None and not self._probe_task.done():
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+        self._probe_task = None
+
+    def snapshot(self) -> Dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "open_for": round(time.monotonic() - self.opened_at, 1) if self.opened_at else None,
+            "last_error": self.last_error
+        }
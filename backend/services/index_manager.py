@@ -0,0 +1,140 @@
+"""
+Gestor de índices de MongoDB
+Declara los índices de cada patrón de acceso, los crea de forma idempotente y reporta su estado
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Migración de datos previa a un índice; recibe la base de datos
+Migration = Callable[[object], Awaitable[object]]
+
+
+def _key_spec(keys) -> Tuple[Tuple[str, object], ...]:
+    return tuple((field, direction) for field, direction in keys.items())
+
+
+class IndexManager:
+    """
+    Registro declarativo de índices por colección
+
+    - `ensure` es idempotente: create_indexes no hace nada si el índice ya existe,
+      y cada índice se crea por separado para que un fallo no bloquee a los demás
+    - `prepare` registra una migración de datos que se ejecuta antes de crear un
+      índice que aún no existe (p. ej. limpiar duplicados antes de un índice único)
+    - `retire` elimina índices que ya no se declaran
+    - `report` compara lo declarado con lo existente y usa $indexStats para
+      detectar índices sin uso desde el último arranque de mongod
+    """
+
+    def __init__(self):
+        self._declared: Dict[str, List[IndexModel]] = {}
+        self._migrations: Dict[Tuple[str, str], List[Migration]] = {}
+        self._retired: Dict[str, List[str]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def declare(self, collection: str, keys: Sequence[Tuple[str, int]], **options):
+        """Declarar un índice para una colección"""
+        self._declared.setdefault(collection, []).append(IndexModel(list(keys), **options))
+
+    def prepare(self, collection: str, name: str, migration: Migration):
+        """Ejecutar `migration(db)` antes de crear el índice `name` si todavía no existe"""
+        self._migrations.setdefault((collection, name), []).append(migration)
+
+    def retire(self, collection: str, name: str):
+        """Eliminar un índice que ya no se usa"""
+        self._retired.setdefault(collection, []).append(name)
+
+    @property
+    def declared(self) -> Dict[str, List[IndexModel]]:
+        return self._declared
+
+    async def ensure(self, db):
+        """Eliminar los índices retirados y crear, uno a uno, todos los declarados"""
+        for collection, names in self._retired.items():
+            existing = await self._index_names(db, collection)
+            for name in names:
+                if name in existing:
+                    try:
+                        await db[collection].drop_index(name)
+                        logger.info(f"Dropped retired index {collection}.{name}")
+                    except OperationFailure as e:
+                        logger.error(f"Could not drop index {collection}.{name}: {e}")
+
+        for collection, models in self._declared.items():
+            existing = await self._index_names(db, collection)
+            for model in models:
+                name = model.document["name"]
+                if name not in existing:
+                    for migration in self._migrations.get((collection, name), []):
+                        try:
+                            await migration(db)
+                        except Exception as e:
+                            logger.error(f"Migration before index {collection}.{name} failed: {e}")
+                try:
+                    await db[collection].create_indexes([model])
+                    logger.info(f"Index ready on {collection}: {name}")
+                except OperationFailure as e:
+                    # Por ejemplo, un índice con el mismo nombre y otras opciones, o
+                    # datos que violan un índice único
+                    logger.error(f"Could not create index {collection}.{name}: {e}")
+
+    @staticmethod
+    async def _index_names(db, collection: str) -> Set[str]:
+        return {index["name"] async for index in db[collection].list_indexes()}
+
+    async def report(self, db) -> Dict[str, Dict]:
+        """Índices declarados que faltan e índices existentes sin uso, por colección"""
+        report = {}
+
+        for collection, models in self._declared.items():
+            declared = {_key_spec(model.document["key"]): model.document["name"] for model in models}
+
+            existing = {}
+            async for index in db[collection].list_indexes():
+                existing[_key_spec(index["key"])] = index["name"]
+
+            usage = {}
+            try:
+                async for stats in db[collection].aggregate([{"$indexStats": {}}]):
+                    usage[stats["name"]] = stats["accesses"]["ops"]
+            except OperationFailure as e:
+                logger.debug(f"$indexStats not available on {collection}: {e}")
+
+            report[collection] = {
+                "missing": [name for spec, name in declared.items() if spec not in existing],
+                "unused": [
+                    name for name in existing.values()
+                    if name != "_id_" and usage.get(name) == 0
+                ],
+                "usage": usage
+            }
+
+        return report
+
+    def start(self, db):
+        """Crear los índices en background sin bloquear el arranque"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._bootstrap(db))
+
+    async def _bootstrap(self, db):
+        try:
+            await self.ensure(db)
+            report = await self.report(db)
+            for collection, status in report.items():
+                if status["missing"]:
+                    logger.warning(f"Missing indexes on {collection}: {status['missing']}")
+                if status["unused"]:
+                    logger.info(f"Unused indexes on {collection}: {status['unused']}")
+        except Exception as e:
+            logger.error(f"Index bootstrap failed: {e}")
+
+
+# Gestor global de índices
+index_manager = IndexManager()
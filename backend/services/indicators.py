@@ -0,0 +1,272 @@
+"""
+Indicadores técnicos incrementales
+Cada indicador se actualiza en O(1) por vela o tick con buffers circulares y sumas acumuladas
+"""
+
+import math
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+
+class RingBuffer:
+    """Ventana circular de tamaño fijo; `push` devuelve el valor que sale de la ventana"""
+
+    __slots__ = ("size", "_values", "_index", "count")
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        self.size = size
+        self._values = [0.0] * size
+        self._index = 0
+        self.count = 0
+
+    def push(self, value: float) -> Optional[float]:
+        evicted = self._values[self._index] if self.count == self.size else None
+        self._values[self._index] = value
+        self._index = (self._index + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+        return evicted
+
+    @property
+    def full(self) -> bool:
+        return self.count == self.size
+
+
+class SMA:
+    """Media simple sobre `period` valores"""
+
+    __slots__ = ("period", "_window", "_sum", "value")
+
+    def __init__(self, period: int):
+        self.period = period
+        self._window = RingBuffer(period)
+        self._sum = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, price: float) -> Optional[float]:
+        evicted = self._window.push(price)
+        self._sum += price - (evicted or 0.0)
+        if self._window.full:
+            self.value = self._sum / self.period
+        return self.value
+
+
+class EMA:
+    """Media exponencial; se inicializa con la SMA de los primeros `period` valores"""
+
+    __slots__ = ("period", "alpha", "_seed_sum", "_seen", "value")
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self._seed_sum = 0.0
+        self._seen = 0
+        self.value: Optional[float] = None
+
+    def update(self, price: float) -> Optional[float]:
+        if self.value is not None:
+            self.value += self.alpha * (price - self.value)
+            return self.value
+
+        self._seen += 1
+        self._seed_sum += price
+        if self._seen == self.period:
+            self.value = self._seed_sum / self.period
+        return self.value
+
+
+class RSI:
+    """RSI con el suavizado de Wilder"""
+
+    __slots__ = ("period", "_previous", "_gain", "_loss", "_seen", "value")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._previous: Optional[float] = None
+        self._gain = 0.0
+        self._loss = 0.0
+        self._seen = 0
+        self.value: Optional[float] = None
+
+    def update(self, price: float) -> Optional[float]:
+        if self._previous is None:
+            self._previous = price
+            return None
+
+        change = price - self._previous
+        self._previous = price
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+
+        if self._seen < self.period:
+            # Primeras `period` variaciones: media simple
+            self._seen += 1
+            self._gain += gain
+            self._loss += loss
+            if self._seen < self.period:
+                return None
+            self._gain /= self.period
+            self._loss /= self.period
+        else:
+            self._gain = (self._gain * (self.period - 1) + gain) / self.period
+            self._loss = (self._loss * (self.period - 1) + loss) / self.period
+
+        if self._loss == 0:
+            self.value = 100.0 if self._gain > 0 else 50.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + self._gain / self._loss)
+        return self.value
+
+
+class MACD:
+    """MACD: EMA rápida - EMA lenta, su señal y el histograma"""
+
+    __slots__ = ("_fast", "_slow", "_signal", "value")
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self._fast = EMA(fast)
+        self._slow = EMA(slow)
+        self._signal = EMA(signal)
+        self.value: Optional[Tuple[float, float, float]] = None
+
+    def update(self, price: float) -> Optional[Tuple[float, float, float]]:
+        fast = self._fast.update(price)
+        slow = self._slow.update(price)
+        if fast is None or slow is None:
+            return None
+
+        line = fast - slow
+        signal = self._signal.update(line)
+        if signal is not None:
+            self.value = (line, signal, line - signal)
+        return self.value
+
+
+class BollingerBands:
+    """Bandas de Bollinger (media, superior, inferior) con suma y suma de cuadrados acumuladas"""
+
+    __slots__ = ("period", "k", "_window", "_sum", "_sum_sq", "value")
+
+    def __init__(self, period: int = 20, k: float = 2.0):
+        self.period = period
+        self.k = k
+        self._window = RingBuffer(period)
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self.value: Optional[Tuple[float, float, float]] = None
+
+    def update(self, price: float) -> Optional[Tuple[float, float, float]]:
+        evicted = self._window.push(price)
+        if evicted is not None:
+            self._sum -= evicted
+            self._sum_sq -= evicted * evicted
+        self._sum += price
+        self._sum_sq += price * price
+
+        if not self._window.full:
+            return None
+
+        mean = self._sum / self.period
+        # El redondeo puede dejar una varianza mínimamente negativa
+        deviation = math.sqrt(max(self._sum_sq / self.period - mean * mean, 0.0))
+        self.value = (mean, mean + self.k * deviation, mean - self.k * deviation)
+        return self.value
+
+
+class ATR:
+    """Average True Range con el suavizado de Wilder"""
+
+    __slots__ = ("period", "_previous_close", "_seed_sum", "_seen", "value")
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self._previous_close: Optional[float] = None
+        self._seed_sum = 0.0
+        self._seen = 0
+        self.value: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        if self._previous_close is None:
+            true_range = high - low
+        else:
+            true_range = max(
+                high - low,
+                abs(high - self._previous_close),
+                abs(low - self._previous_close)
+            )
+        self._previous_close = close
+
+        if self.value is not None:
+            self.value = (self.value * (self.period - 1) + true_range) / self.period
+            return self.value
+
+        self._seen += 1
+        self._seed_sum += true_range
+        if self._seen == self.period:
+            self.value = self._seed_sum / self.period
+        return self.value
+
+
+class IndicatorSet:
+    """Indicadores de un símbolo en un timeframe, actualizados juntos con cada vela"""
+
+    __slots__ = ("sma", "ema", "rsi", "macd", "bollinger", "atr")
+
+    def __init__(self, sma: int = 20, ema: int = 20, rsi: int = 14,
+                 macd: Tuple[int, int, int] = (12, 26, 9), bollinger: Tuple[int, float] = (20, 2.0),
+                 atr: int = 14):
+        self.sma = SMA(sma)
+        self.ema = EMA(ema)
+        self.rsi = RSI(rsi)
+        self.macd = MACD(*macd)
+        self.bollinger = BollingerBands(*bollinger)
+        self.atr = ATR(atr)
+
+    def update(self, high: float, low: float, close: float) -> Dict[str, object]:
+        self.sma.update(close)
+        self.ema.update(close)
+        self.rsi.update(close)
+        self.macd.update(close)
+        self.bollinger.update(close)
+        self.atr.update(high, low, close)
+        return self.snapshot()
+
+    def update_tick(self, price: float) -> Dict[str, object]:
+        """Un tick sin máximos/mínimos cuenta como vela de rango cero"""
+        return self.update(price, price, price)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "sma": self.sma.value,
+            "ema": self.ema.value,
+            "rsi": self.rsi.value,
+            "macd": self.macd.value,
+            "bollinger": self.bollinger.value,
+            "atr": self.atr.value
+        }
+
+
+class IndicatorBank:
+    """Un IndicatorSet por (símbolo, timeframe), creado bajo demanda"""
+
+    def __init__(self, factory: Callable[[], IndicatorSet] = IndicatorSet):
+        self.factory = factory
+        self._sets: Dict[Tuple[str, Hashable], IndicatorSet] = {}
+
+    def get(self, symbol: str, timeframe: Hashable) -> IndicatorSet:
+        key = (symbol, timeframe)
+        indicators = self._sets.get(key)
+        if indicators is None:
+            indicators = self._sets[key] = self.factory()
+        return indicators
+
+    def update(self, symbol: str, timeframe: Hashable,
+               high: float, low: float, close: float) -> Dict[str, object]:
+        return self.get(symbol, timeframe).update(high, low, close)
+
+    def remove(self, symbol: str, timeframe: Hashable):
+        self._sets.pop((symbol, timeframe), None)
+
+    def __len__(self) -> int:
+        return len(self._sets)
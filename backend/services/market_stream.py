@@ -0,0 +1,218 @@
+"""
+Stream de datos de mercado por WebSocket
+Mantiene un libro en memoria con el último precio de cada símbolo suscrito
+"""
+
+import asyncio
+import json
+import random
+import time
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, NamedTuple, Optional, Set
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class PriceTick(NamedTuple):
+    price: float
+    change_24h: float
+    volume_24h: float
+    event_time: int       # milisegundos, según el exchange
+    received_at: float    # time.monotonic() local
+
+
+class PriceBook:
+    """
+    Libro de últimos precios por símbolo del exchange
+
+    Sin locks: hay un único escritor (el consumidor del stream) y cada
+    actualización sustituye la entrada completa por una tupla inmutable,
+    así que un lector nunca ve un precio a medio escribir.
+    """
+
+    def __init__(self):
+        self._ticks: Dict[str, PriceTick] = {}
+
+    def update(self, exchange_symbol: str, price: float, event_time: int,
+               change_24h: Optional[float] = None, volume_24h: Optional[float] = None):
+        """Registrar un precio; los campos 24h omitidos conservan su último valor"""
+        previous = self._ticks.get(exchange_symbol)
+        if previous is not None and event_time < previous.event_time:
+            return  # Mensaje fuera de orden
+
+        if change_24h is None:
+            change_24h = previous.change_24h if previous else 0.0
+        if volume_24h is None:
+            volume_24h = previous.volume_24h if previous else 0.0
+
+        self._ticks[exchange_symbol] = PriceTick(
+            price, change_24h, volume_24h, event_time, time.monotonic()
+        )
+
+    def get(self, exchange_symbol: str, max_age: float) -> Optional[PriceTick]:
+        """Último precio si se recibió hace menos de `max_age` segundos"""
+        tick = self._ticks.get(exchange_symbol)
+        if tick is None or time.monotonic() - tick.received_at > max_age:
+            return None
+        return tick
+
+    def __len__(self) -> int:
+        return len(self._ticks)
+
+
+class MarketDataStream:
+    """
+    Consumidor asyncio de los streams de ticker y trades de Zaffex
+
+    Se suscribe a los símbolos en uso a medida que se registran con `track`
+    (como máximo `max_symbols`) y se reconecta con backoff exponencial si la
+    conexión se pierde.
+    """
+
+    def __init__(
+        self,
+        ws_url: str,
+        session_factory: Callable[[], Awaitable[aiohttp.ClientSession]],
+        price_book: Optional[PriceBook] = None,
+        initial_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        heartbeat: float = 20.0,
+        max_symbols: int = 200
+    ):
+        self.ws_url = ws_url
+        self.price_book = price_book if price_book is not None else PriceBook()
+        self._session_factory = session_factory
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.heartbeat = heartbeat
+        self.max_symbols = max_symbols
+
+        self._symbols: Set[str] = set()
+        self._pending: Set[str] = set()
+        self._pending_event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._request_id = 0
+        self.connected = False
+        self.reconnects = 0
+
+    def track(self, exchange_symbols: Iterable[str]):
+        """Suscribir símbolos del exchange que aún no estén en el stream, hasta `max_symbols`"""
+        new_symbols = {s.upper() for s in exchange_symbols} - self._symbols
+        room = self.max_symbols - len(self._symbols)
+        if len(new_symbols) > room:
+            logger.warning(
+                f"Market stream symbol cap reached ({self.max_symbols}); "
+                f"not tracking {len(new_symbols) - max(room, 0)} symbols"
+            )
+            new_symbols = set(sorted(new_symbols)[:max(room, 0)])
+        if new_symbols:
+            self._symbols |= new_symbols
+            self._pending |= new_symbols
+            self._pending_event.set()
+
+    def start(self):
+        """Lanzar el consumidor en background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Detener el consumidor y cerrar la conexión"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.connected = False
+
+    async def _run(self):
+        backoff = self.initial_backoff
+
+        while True:
+            try:
+                session = await self._session_factory()
+                async with session.ws_connect(f"{self.ws_url}/stream", heartbeat=self.heartbeat) as ws:
+                    self.connected = True
+                    backoff = self.initial_backoff
+                    logger.info(f"Market stream connected to {self.ws_url}")
+
+                    # Tras (re)conectar hay que volver a suscribir todo
+                    self._pending = set(self._symbols)
+                    self._pending_event.set()
+                    await self._consume(ws)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Market stream error: {e}")
+
+            self.connected = False
+            self.reconnects += 1
+            delay = backoff * random.uniform(0.5, 1.0)
+            backoff = min(backoff * 2, self.max_backoff)
+            await asyncio.sleep(delay)
+
+    async def _consume(self, ws: aiohttp.ClientWebSocketResponse):
+        subscriber = asyncio.get_running_loop().create_task(self._subscribe_pending(ws))
+        try:
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    self._handle_message(msg.data)
+                elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    break
+        finally:
+            subscriber.cancel()
+
+    async def _subscribe_pending(self, ws: aiohttp.ClientWebSocketResponse):
+        while True:
+            await self._pending_event.wait()
+            self._pending_event.clear()
+
+            symbols, self._pending = sorted(self._pending), set()
+            if not symbols:
+                continue
+
+            self._request_id += 1
+            params = []
+            for symbol in symbols:
+                params.append(f"{symbol.lower()}@ticker")
+                params.append(f"{symbol.lower()}@trade")
+
+            await ws.send_str(json.dumps({
+                "method": "SUBSCRIBE",
+                "params": params,
+                "id": self._request_id
+            }))
+
+    def _handle_message(self, raw: str):
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            return
+
+        # Los streams combinados envuelven el evento en {"stream": ..., "data": ...}
+        data = message.get("data", message) if isinstance(message, dict) else None
+        if not isinstance(data, dict):
+            return
+
+        event = data.get("e")
+        try:
+            if event == "24hrTicker":
+                self.price_book.update(
+                    data["s"],
+                    price=float(data["c"]),
+                    event_time=int(data.get("E", 0)),
+                    change_24h=float(data.get("P", 0)),
+                    volume_24h=float(data.get("v", 0))
+                )
+            elif event == "trade":
+                self.price_book.update(
+                    data["s"],
+                    price=float(data["p"]),
+                    event_time=int(data.get("T", data.get("E", 0)))
+                )
+        except (KeyError, TypeError, ValueError) as e:
+            logger.debug(f"Ignoring malformed stream event: {e}")
@@ -0,0 +1,225 @@
+"""
+Barrido de parámetros de estrategias en un pool de procesos
+Las velas se comparten por memoria compartida; los resultados llegan por bloques a medida que terminan
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import random
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.bot import Strategy
+from services.backtest import run_backtest
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("open", "high", "low", "close")
+
+# Claves de la configuración del bot; el resto son parámetros de la estrategia
+BOT_KEYS = ("stop_loss_percentage", "take_profit_percentage", "max_investment_per_trade", "initial_investment")
+
+# Espacios de búsqueda por defecto: parámetros de cada estrategia y gestión del riesgo
+SEARCH_SPACES = {
+    Strategy.DCA_RSI: {"rsi_period": [7, 10, 14, 21], "oversold": [20.0, 25.0, 30.0, 35.0]},
+    Strategy.MOMENTUM_TRADING: {"fast_period": [5, 8, 12, 16], "slow_period": [20, 26, 34, 50]},
+    Strategy.GRID_TRADING: {"grid_period": [10, 20, 30, 50], "grid_step": [0.5, 1.0, 1.5, 2.0]}
+}
+RISK_SPACE = {"stop_loss_percentage": [2.0, 3.0, 5.0, 8.0], "take_profit_percentage": [4.0, 6.0, 10.0, 15.0]}
+
+CandleHandle = Tuple[str, int]
+
+# Estado de cada proceso del pool: se conecta una vez a la memoria compartida
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+_worker_candles: Optional[Dict[str, np.ndarray]] = None
+
+
+def search_space(strategy: Strategy) -> Dict[str, Sequence]:
+    """Espacio por defecto de una estrategia, incluidos stop loss y take profit"""
+    strategy = Strategy(strategy)
+    if strategy not in SEARCH_SPACES:
+        raise ValueError(f"Estrategia sin backtest: {strategy.value}")
+    return {**SEARCH_SPACES[strategy], **RISK_SPACE}
+
+
+def parameter_grid(space: Mapping[str, Sequence]) -> Iterator[Dict]:
+    """Todas las combinaciones de los valores de `space`"""
+    keys = list(space)
+    for values in itertools.product(*(space[key] for key in keys)):
+        yield dict(zip(keys, values))
+
+
+def random_samples(space: Mapping[str, object], count: int, seed: Optional[int] = None) -> Iterator[Dict]:
+    """
+    `count` configuraciones aleatorias
+
+    Cada valor de `space` es una lista de opciones o un rango (low, high);
+    los rangos de enteros dan enteros.
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        config = {}
+        for key, choices in space.items():
+            if isinstance(choices, tuple) and len(choices) == 2:
+                low, high = choices
+                if isinstance(low, int) and isinstance(high, int):
+                    config[key] = rng.randint(low, high)
+                else:
+                    config[key] = rng.uniform(low, high)
+            else:
+                config[key] = rng.choice(list(choices))
+        yield config
+
+
+class SharedCandles:
+    """Copia las columnas OHLC en un bloque de memoria compartida mientras dura el barrido"""
+
+    def __init__(self, candles: Mapping[str, np.ndarray]):
+        length = len(candles["close"])
+        self._shm = shared_memory.SharedMemory(create=True, size=max(len(COLUMNS) * length * 8, 1))
+        matrix = np.ndarray((len(COLUMNS), length), dtype=np.float64, buffer=self._shm.buf)
+        for row, column in enumerate(COLUMNS):
+            matrix[row] = candles[column]
+        del matrix
+        self.handle: CandleHandle = (self._shm.name, length)
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _attach(handle: CandleHandle):
+    """Inicializador del pool: vistas de solo lectura sobre la memoria compartida, sin copias"""
+    global _worker_shm, _worker_candles
+    name, length = handle
+    # Con spawn los workers comparten el resource tracker del padre, que es quien libera el bloque
+    _worker_shm = shared_memory.SharedMemory(name=name)
+
+    matrix = np.ndarray((len(COLUMNS), length), dtype=np.float64, buffer=_worker_shm.buf)
+    matrix.flags.writeable = False
+    _worker_candles = {column: matrix[row] for row, column in enumerate(COLUMNS)}
+
+
+def _run_chunk(strategy: str, base: Dict, configs: List[Dict]) -> List[Dict]:
+    results = []
+    for config in configs:
+        merged = {**base, **config}
+        bot = {key: merged.pop(key) for key in BOT_KEYS if key in merged}
+        result = run_backtest(_worker_candles, strategy, params=merged, **bot)
+        results.append({"config": config, "result": result})
+    return results
+
+
+def _chunks(configs: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    iterator = iter(configs)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def sweep(
+    candles: Mapping[str, np.ndarray],
+    strategy: str,
+    configs: Iterable[Dict],
+    base: Optional[Dict] = None,
+    objective: str = "profit",
+    max_workers: Optional[int] = None,
+    chunk_size: int = 10,
+    patience: Optional[int] = None,
+    target: Optional[float] = None
+) -> AsyncIterator[Dict]:
+    """
+    Evaluar `configs` en paralelo y entregar cada resultado en cuanto su bloque termina
+
+    - `configs` puede ser un generador: solo se materializan los bloques en vuelo
+    - `base` se combina con cada configuración (p. ej. la configuración actual del bot)
+    - Parada temprana: tras `patience` resultados sin mejorar `objective`, o al
+      alcanzar `target`; los bloques pendientes se cancelan
+    Cada elemento es {"config", "result", "best"}.
+    """
+    base = dict(base or {})
+    max_workers = max_workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    chunks = _chunks(configs, chunk_size)
+
+    shared = SharedCandles(candles)
+    pool: Optional[ProcessPoolExecutor] = None
+    pending: set = set()
+
+    def submit_next() -> bool:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        future: Future = pool.submit(_run_chunk, strategy, base, chunk)
+        pending.add(asyncio.wrap_future(future, loop=loop))
+        return True
+
+    best: Optional[float] = None
+    since_best = 0
+    stop = False
+
+    try:
+        # Dentro del try: si el pool o el primer envío fallan, la memoria compartida se libera igual
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            # spawn: los workers no heredan el event loop ni los hilos del servidor
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_attach,
+            initargs=(shared.handle,)
+        )
+
+        # Dos bloques por worker: ninguno se queda ocioso esperando al siguiente envío
+        for _ in range(max_workers * 2):
+            if not submit_next():
+                break
+
+        while pending and not stop:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for finished in done:
+                pending.discard(finished)
+                for item in finished.result():
+                    score = item["result"][objective]
+                    if best is None or score > best:
+                        best = score
+                        since_best = 0
+                    else:
+                        since_best += 1
+                    yield {**item, "best": best}
+
+                    if (target is not None and score >= target) or \
+                            (patience is not None and since_best >= patience):
+                        stop = True
+                        break
+                if stop:
+                    break
+                submit_next()
+
+        if stop:
+            logger.info(f"Parameter sweep stopped early at best {objective}={best}")
+    finally:
+        try:
+            for future in pending:
+                future.cancel()
+            if pool is not None:
+                # El cierre del pool espera a los bloques en ejecución: fuera del event loop
+                await loop.run_in_executor(None, lambda: pool.shutdown(wait=True, cancel_futures=True))
+        finally:
+            shared.close()
+
+
+async def best_config(*args, **kwargs) -> Optional[Dict]:
+    """Ejecutar `sweep` completo y devolver el mejor resultado según `objective`"""
+    objective = kwargs.get("objective", "profit")
+    winner = None
+    async for item in sweep(*args, **kwargs):
+        if winner is None or item["result"][objective] > winner["result"][objective]:
+            winner = item
+    return winner
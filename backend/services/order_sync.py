@@ -0,0 +1,193 @@
+"""
+Importación incremental del historial de órdenes de Zaffex
+Una marca por usuario (último order_id leído) y sus órdenes abiertas en la colección sync_state
+"""
+
+import logging
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SYNC_SOURCE = "zaffex_orders"
+
+# Estados en los que una orden ya no cambia; el resto se vuelve a consultar en la siguiente sincronización
+FINAL_STATUSES = {"FILLED", "CANCELED", "REJECTED", "EXPIRED", "EXPIRED_IN_MATCH"}
+
+# Los trades importados no pertenecen a ningún bot
+IMPORTED_BOT_ID = "zaffex_import"
+
+TradeListener = Callable[[object, List[Dict]], Awaitable[object]]
+
+
+def order_to_trade(user_id: str, order: Dict) -> Dict:
+    """Documento de trades para una orden ejecutada de Zaffex"""
+    amount = order["amount"]
+    total = order["total"]
+    # Las órdenes de mercado no informan precio: se usa el precio medio ejecutado
+    price = order["price"] or (total / amount if amount else 0.0)
+    now = datetime.utcnow()
+
+    return {
+        "id": str(uuid.uuid4()),
+        "bot_id": IMPORTED_BOT_ID,
+        "user_id": user_id,
+        "trading_pair": order["symbol"],
+        "trade_type": order["type"],
+        "amount": amount,
+        "price": price,
+        "total_value": total,
+        "profit_loss": 0.0,
+        "profit_percentage": 0.0,
+        "status": "executed",
+        "executed_at": order["executed_at"],
+        "zaffex_order_id": str(order["order_id"]),
+        "strategy_used": "imported",
+        "market_conditions": None,
+        "created_at": now,
+        "updated_at": now
+    }
+
+
+async def _import_filled(
+    db,
+    user_id: str,
+    orders: List[Dict],
+    listeners: Sequence[TradeListener]
+) -> int:
+    """Insertar los trades de las órdenes ejecutadas y avisar a los listeners de los nuevos"""
+    trades = [
+        order_to_trade(user_id, order)
+        for order in orders
+        if order["status"] == "FILLED" and order["amount"] > 0
+    ]
+    if not trades:
+        return 0
+
+    result = await db.trades.bulk_write(
+        [
+            UpdateOne(
+                {"user_id": user_id, "zaffex_order_id": trade["zaffex_order_id"]},
+                {"$setOnInsert": trade},
+                upsert=True
+            )
+            for trade in trades
+        ],
+        ordered=False
+    )
+    inserted = [trades[index] for index in result.upserted_ids]
+    if inserted:
+        for listener in listeners:
+            await listener(db, inserted)
+    return len(inserted)
+
+
+async def sync_order_history(
+    db,
+    zaffex_service,
+    user_id: str,
+    listeners: Sequence[TradeListener] = ()
+) -> Dict:
+    """
+    Importar las órdenes nuevas desde la marca del usuario
+
+    Los trades se insertan con un upsert por (user_id, zaffex_order_id) ($setOnInsert), así que
+    repetir una página no duplica nada. Solo los trades realmente insertados se pasan
+    a los `listeners` (posiciones, rollups).
+
+    La marca avanza hasta el final de cada página aunque haya órdenes abiertas; esas
+    se guardan aparte en `open_orders` y en la siguiente sincronización se consultan
+    una a una (/api/v3/order), en vez de volver a leer todo lo posterior a la más antigua.
+    El estado se guarda tras revisar las abiertas y tras cada página.
+    """
+    query = {"user_id": user_id, "source": SYNC_SOURCE}
+    state = await db.sync_state.find_one(query) or {}
+    watermark: Optional[int] = state.get("last_order_id")
+    open_orders: Dict[int, str] = {
+        entry["order_id"]: entry["symbol"] for entry in state.get("open_orders", [])
+    }
+
+    async def save():
+        await db.sync_state.update_one(
+            query,
+            {"$set": {
+                "last_order_id": watermark,
+                "open_orders": [
+                    {"order_id": order_id, "symbol": symbol}
+                    for order_id, symbol in sorted(open_orders.items())
+                ],
+                "updated_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+
+    seen = 0
+    imported = 0
+
+    if open_orders:
+        closed = []
+        for order_id, symbol in list(open_orders.items()):
+            order = await zaffex_service.get_order(user_id, symbol, order_id)
+            if order["status"] in FINAL_STATUSES:
+                closed.append(order)
+                del open_orders[order_id]
+        imported += await _import_filled(db, user_id, closed, listeners)
+        await save()
+
+    from_id = watermark + 1 if watermark is not None else None
+
+    async for page in zaffex_service.iter_order_history(user_id, from_order_id=from_id):
+        seen += len(page)
+        imported += await _import_filled(db, user_id, page, listeners)
+
+        for order in page:
+            if order["status"] not in FINAL_STATUSES:
+                open_orders[order["order_id"]] = order["symbol"]
+        watermark = page[-1]["order_id"]
+        await save()
+
+    return {
+        "orders_seen": seen,
+        "orders_imported": imported,
+        "last_order_id": watermark,
+        "open_orders": len(open_orders)
+    }
+
+
+async def dedupe_demo_order_ids(db) -> int:
+    """
+    Reescribir los zaffex_order_id demo repetidos de un mismo usuario
+
+    Los trades demo antiguos usaban DEMO_{randint} y pueden repetirse, lo que impide
+    crear el índice único (user_id, zaffex_order_id). Se conserva el primero de cada
+    grupo y el resto pasa a DEMO_..._{id del trade}; es determinista, así que varios
+    procesos pueden ejecutarlo a la vez.
+    """
+    pipeline = [
+        {"$match": {"zaffex_order_id": {"$regex": "^DEMO_"}}},
+        {"$sort": {"executed_at": 1, "id": 1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "zaffex_order_id": "$zaffex_order_id"},
+            "ids": {"$push": "$id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+
+    operations = []
+    async for group in db.trades.aggregate(pipeline, allowDiskUse=True):
+        order_id = group["_id"]["zaffex_order_id"]
+        for trade_id in group["ids"][1:]:
+            operations.append(UpdateOne(
+                {"id": trade_id, "zaffex_order_id": order_id},
+                {"$set": {"zaffex_order_id": f"{order_id}_{trade_id}"}}
+            ))
+
+    if not operations:
+        return 0
+    result = await db.trades.bulk_write(operations, ordered=False)
+    logger.info(f"Rewrote {result.modified_count} duplicate demo order ids")
+    return result.modified_count
@@ -0,0 +1,96 @@
+"""
+Posiciones materializadas por usuario y activo
+Cantidad y coste acumulados, actualizados con $inc al registrar cada trade
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+
+def base_asset(trading_pair: str) -> str:
+    """BTC de BTC/USDT"""
+    return trading_pair.split("/")[0]
+
+
+def position_deltas(trades: List[Dict]) -> Dict[Tuple[str, str], Tuple[float, float, int]]:
+    """Agrupar trades en deltas (amount, total_cost, trades) por (user_id, símbolo)"""
+    deltas: Dict[Tuple[str, str], Tuple[float, float, int]] = {}
+
+    for trade in trades:
+        key = (trade["user_id"], base_asset(trade["trading_pair"]))
+        sign = 1 if trade["trade_type"] == "BUY" else -1
+        amount, total_cost, count = deltas.get(key, (0.0, 0.0, 0))
+        deltas[key] = (
+            amount + sign * trade["amount"],
+            total_cost + sign * trade["total_value"],
+            count + 1
+        )
+
+    return deltas
+
+
+async def record_trade_positions(db, trades: List[Dict]):
+    """Listener del diario de trades: aplica los trades a las posiciones con un bulk_write"""
+    deltas = position_deltas([trade for trade in trades if trade.get("status") == "executed"])
+    if not deltas:
+        return None
+
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"user_id": user_id, "symbol": symbol},
+            {
+                "$inc": {"amount": amount, "total_cost": total_cost, "trades": count},
+                "$set": {"updated_at": now}
+            },
+            upsert=True
+        )
+        for (user_id, symbol), (amount, total_cost, count) in deltas.items()
+    ]
+    return await db.positions.bulk_write(operations, ordered=False)
+
+
+async def rebuild_positions(db, user_id: Optional[str] = None):
+    """Recalcular las posiciones desde la colección trades (de un usuario o de todos)"""
+    match = {"status": "executed"}
+    if user_id:
+        match["user_id"] = user_id
+
+    def signed(field: str) -> Dict:
+        # Las compras suman y las ventas restan, igual que en record_trade_positions
+        return {"$cond": [{"$eq": ["$trade_type", "BUY"]}, f"${field}", {"$multiply": [-1, f"${field}"]}]}
+
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "symbol": {"$arrayElemAt": [{"$split": ["$trading_pair", "/"]}, 0]}
+            },
+            "amount": {"$sum": signed("amount")},
+            "total_cost": {"$sum": signed("total_value")},
+            "trades": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            "symbol": "$_id.symbol",
+            "amount": 1,
+            "total_cost": 1,
+            "trades": 1,
+            "updated_at": "$$NOW"
+        }},
+        {"$merge": {
+            "into": "positions",
+            "on": ["user_id", "symbol"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }}
+    ]
+
+    # Las posiciones sin trades no las produce el pipeline: se eliminan antes
+    await db.positions.delete_many({"user_id": user_id} if user_id else {})
+    await db.trades.aggregate(pipeline).to_list(length=None)
+    return await db.positions.count_documents({"user_id": user_id} if user_id else {})
@@ -5,15 +5,25 @@ Maneja tanto el modo demo como el modo real automáticamente
 
 import aiohttp
 import asyncio
+import numpy as np
 import hmac
 import hashlib
 import time
 import json
 import random
-from typing import Dict, List, Optional
+import uuid
+from typing import AsyncIterator, Dict, List, Optional
 from datetime import datetime
 import logging
 import os
+from contextlib import asynccontextmanager
+
+from services.circuit_breaker import CircuitBreaker
+from services.market_stream import MarketDataStream, PriceBook
+from services.rate_limiter import RateLimiter
+from services.single_flight import SingleFlight
+from services.symbol_registry import index_tickers, symbol_registry
+from services.ticker_cache import TickerCache
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +37,161 @@ class ProductionZaffexService:
         self.testnet_url = "https://testnet.zaffex.com"  
         self.connected_users = {}
         
+        # Sesión HTTP compartida (una por event loop) con pool de conexiones
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Snapshot de tickers compartido entre todos los bots y endpoints
+        self.ticker_cache = TickerCache(
+            self._fetch_tickers,
+            ttl=float(os.environ.get('ZAFFEX_TICKER_TTL', '1.0')),
+            max_stale=float(os.environ.get('ZAFFEX_TICKER_MAX_STALE', '30'))
+        )
+        
+        # Stream WebSocket con el último precio de los símbolos en uso
+        self.ws_url = os.environ.get('ZAFFEX_WS_URL', "wss://stream.zaffex.com")
+        self.stream_enabled = os.environ.get('ZAFFEX_WS_ENABLED', 'true').lower() == 'true'
+        self.stream_max_age = float(os.environ.get('ZAFFEX_WS_MAX_AGE', '5'))
+        self.price_book = PriceBook()
+        self.market_stream = MarketDataStream(
+            self.ws_url, self._get_session, self.price_book,
+            max_symbols=int(os.environ.get('ZAFFEX_WS_MAX_SYMBOLS', '200'))
+        )
+        
+        # Peso de peticiones por IP y por API key, para no provocar 429/418
+        self.rate_limiter = RateLimiter(
+            ip_weight_per_minute=float(os.environ.get('ZAFFEX_IP_WEIGHT_PER_MINUTE', '6000')),
+            key_weight_per_minute=float(os.environ.get('ZAFFEX_KEY_WEIGHT_PER_MINUTE', '1200')),
+            headroom=float(os.environ.get('ZAFFEX_RATE_HEADROOM', '0.9'))
+        )
+        
+        # Un circuit breaker por endpoint: con el exchange caído se falla al instante
+        self.circuits: Dict[str, CircuitBreaker] = {}
+        self.circuit_failures = int(os.environ.get('ZAFFEX_CIRCUIT_FAILURES', '5'))
+        self.circuit_reset = float(os.environ.get('ZAFFEX_CIRCUIT_RESET', '30'))
+        
+        # Lecturas firmadas de balance: una petición en vuelo por usuario, reutilizada unos segundos
+        self.balance_flight = SingleFlight(ttl=float(os.environ.get('ZAFFEX_BALANCE_REUSE', '2')))
+        
+    def _create_connector(self) -> aiohttp.TCPConnector:
+        """Crear el pool de conexiones con keep-alive y caché DNS"""
+        return aiohttp.TCPConnector(
+            limit=int(os.environ.get('ZAFFEX_POOL_SIZE', '100')),
+            limit_per_host=int(os.environ.get('ZAFFEX_POOL_PER_HOST', '50')),
+            ttl_dns_cache=int(os.environ.get('ZAFFEX_DNS_CACHE_TTL', '300')),
+            keepalive_timeout=float(os.environ.get('ZAFFEX_KEEPALIVE_TIMEOUT', '30')),
+            enable_cleanup_closed=True
+        )
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Obtener la sesión compartida, creándola si no existe en este event loop"""
+        loop = asyncio.get_running_loop()
+        
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # Una sesión de otro loop no puede reutilizarse ni cerrarse desde aquí
+            self._session = aiohttp.ClientSession(
+                connector=self._create_connector(),
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+            self._session_loop = loop
+        
+        return self._session
+    
+    def _circuit(self, path: str) -> CircuitBreaker:
+        circuit = self.circuits.get(path)
+        if circuit is None:
+            circuit = self.circuits[path] = CircuitBreaker(
+                path,
+                probe=self._ping,
+                failure_threshold=self.circuit_failures,
+                reset_timeout=self.circuit_reset
+            )
+        return circuit
+    
+    async def _ping(self):
+        """Sonda ligera de los circuit breakers"""
+        timeout = aiohttp.ClientTimeout(total=5)
+        async with self._request('GET', "/api/v3/ping", guarded=False, timeout=timeout) as response:
+            if response.status != 200:
+                raise Exception(f"Error de API: {response.status}")
+    
+    def circuit_states(self) -> Dict[str, Dict]:
+        """Estado de los circuitos por endpoint, para monitorización"""
+        return {path: circuit.snapshot() for path, circuit in self.circuits.items()}
+    
+    @asynccontextmanager
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        api_key: Optional[str] = None,
+        api_secret: Optional[str] = None,
+        params: Optional[Dict] = None,
+        data: Optional[Dict] = None,
+        headers: Optional[Dict] = None,
+        guarded: bool = True,
+        **kwargs
+    ):
+        """
+        Petición a la API REST respetando el limitador de peso y el circuit breaker
+        
+        Con `api_secret` la petición se firma después de la espera del limitador,
+        para que el timestamp no caduque mientras está en cola. Los errores de red,
+        los timeouts y los 5xx cuentan como fallos del circuito del endpoint.
+        """
+        circuit = self._circuit(path) if guarded else None
+        if circuit is not None:
+            circuit.before_call()
+        
+        await self.rate_limiter.acquire(path, api_key)
+        
+        headers = dict(headers or {})
+        if api_key:
+            headers['X-ZAFFEX-APIKEY'] = api_key
+        if api_secret:
+            payload = data if data is not None else params
+            payload['timestamp'] = str(int(time.time() * 1000))
+            query_string = '&'.join([f"{k}={v}" for k, v in sorted(payload.items())])
+            headers['X-ZAFFEX-SIGNATURE'] = self._generate_signature(api_secret, query_string)
+        
+        session = await self._get_session()
+        recorded = False
+        try:
+            async with session.request(
+                method, f"{self.base_url}{path}", params=params, data=data, headers=headers, **kwargs
+            ) as response:
+                self.rate_limiter.observe(response.status, response.headers, api_key)
+                if circuit is not None:
+                    if response.status >= 500:
+                        circuit.record_failure(f"HTTP {response.status}")
+                    else:
+                        circuit.record_success()
+                    recorded = True
+                yield response
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if circuit is not None and not recorded:
+                circuit.record_failure(e)
+            raise
+    
+    async def start(self):
+        """Abrir la sesión HTTP compartida y el stream de mercado (startup de FastAPI)"""
+        await self._get_session()
+        logger.info("Zaffex HTTP session pool started")
+        
+        if self.stream_enabled:
+            self.market_stream.start()
+    
+    async def close(self):
+        """Cerrar el stream de mercado y la sesión HTTP compartida (shutdown de FastAPI)"""
+        await self.market_stream.stop()
+        for circuit in self.circuits.values():
+            await circuit.stop()
+        
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+        
     def _is_demo_credentials(self, api_key: str, api_secret: str) -> bool:
         """Detectar si son credenciales demo"""
         return (api_key.startswith('demo_') or 
@@ -52,35 +217,39 @@ class ProductionZaffexService:
         
         # Modo Real - Validar con Zaffex
         try:
-            timestamp = str(int(time.time() * 1000))
-            query_string = f"timestamp={timestamp}"
-            signature = self._generate_signature(api_secret, query_string)
-            
-            headers = {
-                'X-ZAFFEX-APIKEY': api_key,
-                'X-ZAFFEX-SIGNATURE': signature,
-                'Content-Type': 'application/json'
-            }
-            
             timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(
-                    f"{self.base_url}/api/v3/account",
-                    headers=headers,
-                    params={'timestamp': timestamp}
-                ) as response:
-                    return response.status == 200
+            async with self._request(
+                'GET', "/api/v3/account",
+                api_key=api_key,
+                api_secret=api_secret,
+                headers={'Content-Type': 'application/json'},
+                params={},
+                timeout=timeout
+            ) as response:
+                return response.status == 200
                     
         except Exception as e:
             logger.error(f"Error validating real credentials: {e}")
             return False
     
-    async def get_account_balance(self, user_id: str) -> Dict:
-        """Obtener balance (demo o real)"""
+    async def get_account_balance(self, user_id: str, max_age: Optional[float] = None) -> Dict:
+        """
+        Obtener balance (demo o real); las lecturas concurrentes del mismo usuario comparten petición
+
+        `max_age` acepta un balance cacheado de hasta esos segundos (por defecto ZAFFEX_BALANCE_REUSE)
+        """
         if user_id not in self.connected_users:
             raise Exception("Usuario no conectado a Zaffex")
         
         credentials = self.connected_users[user_id]
+        return await self.balance_flight.do(
+            (user_id, credentials['api_key']),
+            lambda: self._fetch_account_balance(credentials),
+            max_age=max_age
+        )
+    
+    async def _fetch_account_balance(self, credentials: Dict) -> Dict:
+        """Consultar el balance en Zaffex (sin coalescencia)"""
         
         # Modo Demo
         if self._is_demo_credentials(credentials['api_key'], credentials['api_secret']):
@@ -94,49 +263,49 @@ class ProductionZaffexService:
         
         # Modo Real
         try:
-            timestamp = str(int(time.time() * 1000))
-            query_string = f"timestamp={timestamp}"
-            signature = self._generate_signature(credentials['api_secret'], query_string)
-            
-            headers = {
-                'X-ZAFFEX-APIKEY': credentials['api_key'],
-                'X-ZAFFEX-SIGNATURE': signature
-            }
-            
             timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(
-                    f"{self.base_url}/api/v3/account",
-                    headers=headers,
-                    params={'timestamp': timestamp}
-                ) as response:
+            async with self._request(
+                'GET', "/api/v3/account",
+                api_key=credentials['api_key'],
+                api_secret=credentials['api_secret'],
+                params={},
+                timeout=timeout
+            ) as response:
                     
-                    if response.status == 200:
-                        data = await response.json()
+                if response.status == 200:
+                    data = await response.json()
                         
-                        total_balance = 0
-                        available_balance = 0
+                    total_balance = 0
+                    available_balance = 0
                         
-                        for balance in data.get('balances', []):
-                            if balance['asset'] == 'USDT':
-                                available_balance = float(balance['free'])
-                                total_balance = available_balance + float(balance['locked'])
-                                break
+                    for balance in data.get('balances', []):
+                        if balance['asset'] == 'USDT':
+                            available_balance = float(balance['free'])
+                            total_balance = available_balance + float(balance['locked'])
+                            break
                         
-                        return {
-                            "total_balance": total_balance,
-                            "available_balance": available_balance,
-                            "in_orders": total_balance - available_balance,
-                            "currency": "USDT", 
-                            "mode": "real"
-                        }
-                    else:
-                        raise Exception(f"Error de API: {response.status}")
+                    return {
+                        "total_balance": total_balance,
+                        "available_balance": available_balance,
+                        "in_orders": total_balance - available_balance,
+                        "currency": "USDT", 
+                        "mode": "real"
+                    }
+                else:
+                    raise Exception(f"Error de API: {response.status}")
                         
         except Exception as e:
             logger.error(f"Error getting real balance: {e}")
             raise e
     
+    async def _fetch_tickers(self) -> List[Dict]:
+        """Descargar los tickers 24h de Zaffex indexados por símbolo del exchange"""
+        timeout = aiohttp.ClientTimeout(total=5)
+        async with self._request('GET', "/api/v3/ticker/24hr", timeout=timeout) as response:
+            if response.status != 200:
+                raise Exception(f"Error de API: {response.status}")
+            return index_tickers(await response.json())
+    
     async def get_market_data(self, symbols: List[str]) -> List[Dict]:
         """Obtener datos de mercado (demo o real)"""
         
@@ -144,36 +313,56 @@ class ProductionZaffexService:
         if not symbols:
             symbols = ["BTC/USDT", "ETH/USDT", "ADA/USDT", "DOT/USDT"]
         
-        try:
-            # Intentar obtener datos reales primero
-            market_data = []
-            
-            timeout = aiohttp.ClientTimeout(total=5)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(f"{self.base_url}/api/v3/ticker/24hr") as response:
-                    if response.status == 200:
-                        tickers = await response.json()
-                        
-                        for symbol in symbols:
-                            zaffex_symbol = symbol.replace('/', '')
-                            
-                            for ticker in tickers:
-                                if ticker['symbol'] == zaffex_symbol:
-                                    market_data.append({
-                                        "symbol": symbol,
-                                        "price": float(ticker['lastPrice']),
-                                        "change_24h": float(ticker['priceChangePercent']),
-                                        "volume_24h": f"{float(ticker['volume']):.0f}",
-                                        "last_updated": datetime.utcnow(),
-                                        "mode": "real"
-                                    })
-                                    break
-                        
-                        if market_data:
-                            return market_data
-            
-        except Exception as e:
-            logger.warning(f"Could not get real market data, using demo: {e}")
+        resolved = symbol_registry.resolve(symbols)
+        
+        # 1) Libro de precios del WebSocket
+        market_data = []
+        missing = []
+        for symbol, zaffex_symbol in resolved:
+            tick = self.price_book.get(zaffex_symbol, self.stream_max_age)
+            if tick is not None:
+                market_data.append({
+                    "symbol": symbol,
+                    "price": tick.price,
+                    "change_24h": tick.change_24h,
+                    "volume_24h": f"{tick.volume_24h:.0f}",
+                    "last_updated": datetime.utcnow(),
+                    "mode": "real"
+                })
+            else:
+                missing.append((symbol, zaffex_symbol))
+        
+        # 2) Snapshot REST compartido para los símbolos sin precio en el stream
+        if missing:
+            try:
+                tickers = await self.ticker_cache.get()
+                
+                # Solo se suscriben al stream símbolos que existen en el exchange
+                if self.stream_enabled:
+                    self.market_stream.track(
+                        zaffex_symbol for _, zaffex_symbol in missing if zaffex_symbol in tickers
+                    )
+                
+                for symbol, zaffex_symbol in missing:
+                    ticker = tickers.get(zaffex_symbol)
+                    if ticker is not None:
+                        market_data.append({
+                            "symbol": symbol,
+                            "price": float(ticker['lastPrice']),
+                            "change_24h": float(ticker['priceChangePercent']),
+                            "volume_24h": f"{float(ticker['volume']):.0f}",
+                            "last_updated": datetime.utcnow(),
+                            "mode": "real"
+                        })
+                
+            except Exception as e:
+                logger.warning(f"Could not get real market data, using demo: {e}")
+        
+        if market_data:
+            # Respetar el orden de los símbolos solicitados
+            order = {symbol: i for i, symbol in enumerate(symbols)}
+            market_data.sort(key=lambda item: order.get(item["symbol"], 0))
+            return market_data
         
         # Fallback a datos demo
         base_prices = {
@@ -203,6 +392,42 @@ class ProductionZaffexService:
         
         return market_data
     
+    async def get_klines(
+        self,
+        symbol: str,
+        interval: str,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        limit: int = 1000
+    ) -> Dict[str, np.ndarray]:
+        """Velas OHLCV de /api/v3/klines como columnas NumPy (timestamp en ms)"""
+        params = {
+            'symbol': symbol_registry.to_exchange(symbol),
+            'interval': interval,
+            'limit': str(limit)
+        }
+        if start_ms is not None:
+            params['startTime'] = str(start_ms)
+        if end_ms is not None:
+            params['endTime'] = str(end_ms)
+        
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with self._request('GET', "/api/v3/klines", params=params, timeout=timeout) as response:
+            if response.status != 200:
+                raise Exception(f"Error de API: {response.status}")
+            klines = await response.json()
+        
+        # [open_time, open, high, low, close, volume, close_time, ...]
+        rows = np.array([kline[:6] for kline in klines], dtype=np.float64).reshape(-1, 6)
+        return {
+            "timestamp": rows[:, 0].astype(np.int64),
+            "open": rows[:, 1],
+            "high": rows[:, 2],
+            "low": rows[:, 3],
+            "close": rows[:, 4],
+            "volume": rows[:, 5]
+        }
+    
     async def place_order(self, user_id: str, order_data: Dict) -> Dict:
         """Colocar orden (demo o real)"""
         if user_id not in self.connected_users:
@@ -216,7 +441,8 @@ class ProductionZaffexService:
             
             success_rate = 0.85
             if random.random() < success_rate:
-                order_id = f"DEMO_{random.randint(100000, 999999)}"
+                # Único: zaffex_order_id tiene un índice único en trades
+                order_id = f"DEMO_{uuid.uuid4().hex[:12].upper()}"
                 
                 return {
                     "order_id": order_id,
@@ -235,52 +461,42 @@ class ProductionZaffexService:
         
         # Modo Real - ⚠️ USA DINERO REAL
         try:
-            timestamp = str(int(time.time() * 1000))
-            
             params = {
                 'symbol': order_data['symbol'].replace('/', ''),
                 'side': order_data['type'].upper(),
                 'type': 'MARKET',
-                'quantity': f"{order_data['amount']:.8f}",
-                'timestamp': timestamp
-            }
-            
-            query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-            signature = self._generate_signature(credentials['api_secret'], query_string)
-            
-            headers = {
-                'X-ZAFFEX-APIKEY': credentials['api_key'],
-                'X-ZAFFEX-SIGNATURE': signature,
-                'Content-Type': 'application/x-www-form-urlencoded'
+                'quantity': f"{order_data['amount']:.8f}"
             }
             
             logger.warning(f"⚠️ PLACING REAL ORDER: {params}")
             
             timeout = aiohttp.ClientTimeout(total=15)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(
-                    f"{self.base_url}/api/v3/order",
-                    headers=headers,
-                    data=params
-                ) as response:
+            async with self._request(
+                'POST', "/api/v3/order",
+                api_key=credentials['api_key'],
+                api_secret=credentials['api_secret'],
+                headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                data=params,
+                timeout=timeout
+            ) as response:
                     
-                    result = await response.json()
+                result = await response.json()
                     
-                    if response.status == 200:
-                        return {
-                            "order_id": result.get('orderId'),
-                            "status": result.get('status', 'FILLED'),
-                            "symbol": order_data['symbol'],
-                            "type": order_data['type'],
-                            "amount": float(result.get('executedQty', order_data['amount'])),
-                            "price": float(result.get('price', order_data['price'])),
-                            "total": float(result.get('cummulativeQuoteQty', 0)),
-                            "executed_at": datetime.utcnow(),
-                            "fees": float(result.get('fills', [{}])[0].get('commission', 0)) if result.get('fills') else 0,
-                            "mode": "real"
-                        }
-                    else:
-                        raise Exception(f"API Error: {result.get('msg', 'Unknown error')}")
+                if response.status == 200:
+                    return {
+                        "order_id": result.get('orderId'),
+                        "status": result.get('status', 'FILLED'),
+                        "symbol": order_data['symbol'],
+                        "type": order_data['type'],
+                        "amount": float(result.get('executedQty', order_data['amount'])),
+                        "price": float(result.get('price', order_data['price'])),
+                        "total": float(result.get('cummulativeQuoteQty', 0)),
+                        "executed_at": datetime.utcnow(),
+                        "fees": float(result.get('fills', [{}])[0].get('commission', 0)) if result.get('fills') else 0,
+                        "mode": "real"
+                    }
+                else:
+                    raise Exception(f"API Error: {result.get('msg', 'Unknown error')}")
                         
         except Exception as e:
             logger.error(f"Error placing real order: {e}")
@@ -321,54 +537,115 @@ class ProductionZaffexService:
         
         # Modo Real
         try:
-            timestamp = str(int(time.time() * 1000))
-            
-            params = {
-                'timestamp': timestamp,
-                'limit': str(limit)
-            }
-            
-            query_string = '&'.join([f"{k}={v}" for k, v in sorted(params.items())])
-            signature = self._generate_signature(credentials['api_secret'], query_string)
-            
-            headers = {
-                'X-ZAFFEX-APIKEY': credentials['api_key'],
-                'X-ZAFFEX-SIGNATURE': signature
-            }
-            
             timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(
-                    f"{self.base_url}/api/v3/allOrders",
-                    headers=headers,
-                    params=params
-                ) as response:
+            async with self._request(
+                'GET', "/api/v3/allOrders",
+                api_key=credentials['api_key'],
+                api_secret=credentials['api_secret'],
+                params={'limit': str(limit)},
+                timeout=timeout
+            ) as response:
                     
-                    if response.status == 200:
-                        orders = await response.json()
-                        
-                        processed_orders = []
-                        for order in orders:
-                            processed_orders.append({
-                                "order_id": order.get('orderId'),
-                                "symbol": order.get('symbol', '').replace('USDT', '/USDT'),
-                                "type": order.get('side'),
-                                "amount": float(order.get('executedQty', 0)),
-                                "price": float(order.get('price', 0)),
-                                "total": float(order.get('cummulativeQuoteQty', 0)),
-                                "status": order.get('status'),
-                                "executed_at": datetime.fromtimestamp(order.get('time', 0) / 1000),
-                                "mode": "real"
-                            })
-                        
-                        return processed_orders
-                    else:
-                        raise Exception(f"Error getting order history: {response.status}")
+                if response.status == 200:
+                    orders = await response.json()
+                    return [self._process_order(order) for order in orders]
+                else:
+                    raise Exception(f"Error getting order history: {response.status}")
                         
         except Exception as e:
             logger.error(f"Error getting real order history: {e}")
             return []
     
+    async def iter_order_history(
+        self,
+        user_id: str,
+        from_order_id: Optional[int] = None,
+        page_size: int = 500
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Recorrer /api/v3/allOrders por páginas a partir de `from_order_id` (incluido)
+        
+        Cada página se entrega en orden ascendente de order_id. En modo demo no hay
+        historial real que importar. Los errores se propagan para no avanzar la marca
+        de sincronización sobre páginas que no se han leído.
+        """
+        if user_id not in self.connected_users:
+            raise Exception("Usuario no conectado a Zaffex")
+        
+        credentials = self.connected_users[user_id]
+        if self._is_demo_credentials(credentials['api_key'], credentials['api_secret']):
+            return
+        
+        next_id = from_order_id
+        timeout = aiohttp.ClientTimeout(total=10)
+        
+        while True:
+            params = {'limit': str(page_size)}
+            if next_id is not None:
+                params['orderId'] = str(next_id)
+            
+            async with self._request(
+                'GET', "/api/v3/allOrders",
+                api_key=credentials['api_key'],
+                api_secret=credentials['api_secret'],
+                params=params,
+                timeout=timeout
+            ) as response:
+                if response.status != 200:
+                    raise Exception(f"Error getting order history: {response.status}")
+                orders = await response.json()
+            
+            page = sorted(
+                (self._process_order(order) for order in orders),
+                key=lambda order: order["order_id"]
+            )
+            if page:
+                yield page
+            
+            if len(orders) < page_size:
+                return
+            next_id = page[-1]["order_id"] + 1
+    
+    async def get_order(self, user_id: str, symbol: str, order_id: int) -> Dict:
+        """
+        Estado actual de una orden concreta (/api/v3/order)
+        
+        Los errores se propagan, como en iter_order_history, para no dar por cerrada
+        una orden que no se ha podido consultar.
+        """
+        if user_id not in self.connected_users:
+            raise Exception("Usuario no conectado a Zaffex")
+        
+        credentials = self.connected_users[user_id]
+        timeout = aiohttp.ClientTimeout(total=10)
+        
+        async with self._request(
+            'GET', "/api/v3/order",
+            api_key=credentials['api_key'],
+            api_secret=credentials['api_secret'],
+            params={'symbol': symbol_registry.to_exchange(symbol), 'orderId': str(order_id)},
+            timeout=timeout
+        ) as response:
+            if response.status != 200:
+                raise Exception(f"Error getting order {order_id}: {response.status}")
+            order = await response.json()
+        
+        return self._process_order(order)
+    
+    def _process_order(self, order: Dict) -> Dict:
+        """Normalizar una orden de /api/v3/allOrders"""
+        return {
+            "order_id": order.get('orderId'),
+            "symbol": symbol_registry.to_display(order.get('symbol', '')),
+            "type": order.get('side'),
+            "amount": float(order.get('executedQty', 0)),
+            "price": float(order.get('price', 0)),
+            "total": float(order.get('cummulativeQuoteQty', 0)),
+            "status": order.get('status'),
+            "executed_at": datetime.fromtimestamp(order.get('time', 0) / 1000),
+            "mode": "real"
+        }
+    
     def connect_user(self, user_id: str, api_key: str, api_secret: str):
         """Conectar usuario con sus credenciales"""
         self.connected_users[user_id] = {
@@ -381,10 +658,18 @@ class ProductionZaffexService:
         mode = "DEMO" if self._is_demo_credentials(api_key, api_secret) else "REAL"
         logger.info(f"User {user_id} connected to Zaffex in {mode} mode")
     
+    def invalidate_balance(self, user_id: str):
+        """Descartar el balance reutilizado de un usuario conectado"""
+        credentials = self.connected_users.get(user_id)
+        if credentials is not None:
+            self.balance_flight.forget((user_id, credentials['api_key']))
+    
     def disconnect_user(self, user_id: str):
         """Desconectar usuario de Zaffex"""
         if user_id in self.connected_users:
-            del self.connected_users[user_id]
+            credentials = self.connected_users.pop(user_id)
+            self.rate_limiter.forget(credentials['api_key'])
+            self.balance_flight.forget((user_id, credentials['api_key']))
             logger.info(f"User {user_id} disconnected from Zaffex")
     
     def is_user_connected(self, user_id: str) -> bool:
@@ -0,0 +1,140 @@
+"""
+Limitador de peso de peticiones para la API de Zaffex
+Token buckets por IP (todas las peticiones) y por API key (peticiones firmadas)
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Peso de cada endpoint según la documentación del exchange
+ENDPOINT_WEIGHTS = {
+    "/api/v3/account": 20,
+    "/api/v3/allOrders": 20,
+    "/api/v3/order": 1,
+    "/api/v3/ticker/24hr": 80,
+    "/api/v3/klines": 2
+}
+
+USED_WEIGHT_HEADERS = ("X-ZAFFEX-USED-WEIGHT-1M", "X-MBX-USED-WEIGHT-1M")
+
+# Pausa si un 429/418 no trae Retry-After
+DEFAULT_RETRY_AFTER = 60.0
+
+
+class TokenBucket:
+    """
+    Bucket de `capacity` unidades que se rellena por completo cada `period` segundos
+
+    `acquire` espera en orden de llegada (asyncio.Lock es FIFO) en vez de rechazar.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, weight: float):
+        weight = min(weight, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._blocked_until and self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                await asyncio.sleep(max(
+                    self._blocked_until - now,
+                    (weight - self.tokens) / self.rate
+                ))
+
+    def sync_used(self, used: float):
+        """Ajustar al peso consumido que informa el exchange (puede incluir otros procesos)"""
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, max(self.capacity - used, 0.0))
+
+    def block(self, seconds: float):
+        """No conceder peso durante `seconds` (Retry-After de un 429/418)"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0.0
+        self._blocked_until = max(self._blocked_until, now + seconds)
+
+    @property
+    def blocked_for(self) -> float:
+        return max(self._blocked_until - time.monotonic(), 0.0)
+
+
+class RateLimiter:
+    """
+    Limitador por IP y por API key con pesos por endpoint
+
+    - `acquire` reserva el peso antes de la petición y espera si no hay margen
+    - `observe` lee las cabeceras de peso usado y los 429/418 de cada respuesta
+    - `headroom` deja un margen bajo el límite real para no rozar el baneo
+    """
+
+    def __init__(self, ip_weight_per_minute: float, key_weight_per_minute: float,
+                 headroom: float = 0.9, default_weight: float = 1):
+        self.ip_limit = ip_weight_per_minute * headroom
+        self.key_limit = key_weight_per_minute * headroom
+        self.default_weight = default_weight
+        self.ip_bucket = TokenBucket(self.ip_limit)
+        self._key_buckets: Dict[str, TokenBucket] = {}
+
+    def weight(self, path: str) -> float:
+        return ENDPOINT_WEIGHTS.get(path, self.default_weight)
+
+    def _key_bucket(self, api_key: str) -> TokenBucket:
+        bucket = self._key_buckets.get(api_key)
+        if bucket is None:
+            bucket = self._key_buckets[api_key] = TokenBucket(self.key_limit)
+        return bucket
+
+    async def acquire(self, path: str, api_key: Optional[str] = None):
+        weight = self.weight(path)
+        if api_key:
+            await self._key_bucket(api_key).acquire(weight)
+        await self.ip_bucket.acquire(weight)
+
+    def observe(self, status: int, headers: Mapping[str, str], api_key: Optional[str] = None):
+        for header in USED_WEIGHT_HEADERS:
+            used = headers.get(header)
+            if used is not None:
+                try:
+                    self.ip_bucket.sync_used(float(used))
+                except ValueError:
+                    pass
+                break
+
+        if status in (418, 429):
+            try:
+                retry_after = float(headers.get("Retry-After", DEFAULT_RETRY_AFTER))
+            except ValueError:
+                retry_after = DEFAULT_RETRY_AFTER
+            logger.warning(f"Zaffex rate limit hit ({status}), pausing requests for {retry_after:.0f}s")
+            self.ip_bucket.block(retry_after)
+            if api_key:
+                self._key_bucket(api_key).block(retry_after)
+
+    def forget(self, api_key: str):
+        """Liberar el bucket de una API key desconectada"""
+        self._key_buckets.pop(api_key, None)
+
+    def stats(self) -> Dict:
+        return {
+            "ip_tokens": round(self.ip_bucket.tokens, 1),
+            "ip_capacity": self.ip_limit,
+            "blocked_for": round(self.ip_bucket.blocked_for, 1),
+            "keys": len(self._key_buckets)
+        }
@@ -13,6 +13,8 @@ from typing import Dict, List, Optional
 import logging
 from datetime import datetime
 
+from services.symbol_registry import index_tickers, symbol_registry
+
 logger = logging.getLogger(__name__)
 
 class RealZaffexIntegration:
@@ -152,24 +154,21 @@ class RealZaffexIntegration:
                 # Obtener todos los tickers
                 async with session.get(f"{self.base_url}/api/v3/ticker/24hr") as response:
                     if response.status == 200:
-                        tickers = await response.json()
+                        tickers = index_tickers(await response.json())
                         
-                        # Filtrar por símbolos solicitados
-                        for symbol in symbols:
-                            zaffex_symbol = symbol.replace('/', '')  # BTC/USDT -> BTCUSDT
-                            
-                            for ticker in tickers:
-                                if ticker['symbol'] == zaffex_symbol:
-                                    market_data.append({
-                                        'symbol': symbol,
-                                        'price': float(ticker['lastPrice']),
-                                        'change_24h': float(ticker['priceChangePercent']),
-                                        'volume_24h': float(ticker['volume']),
-                                        'high_24h': float(ticker['highPrice']),
-                                        'low_24h': float(ticker['lowPrice']),
-                                        'timestamp': datetime.utcnow()
-                                    })
-                                    break
+                        # Filtrar por símbolos solicitados (BTC/USDT -> BTCUSDT)
+                        for symbol, zaffex_symbol in symbol_registry.resolve(symbols):
+                            ticker = tickers.get(zaffex_symbol)
+                            if ticker is not None:
+                                market_data.append({
+                                    'symbol': symbol,
+                                    'price': float(ticker['lastPrice']),
+                                    'change_24h': float(ticker['priceChangePercent']),
+                                    'volume_24h': float(ticker['volume']),
+                                    'high_24h': float(ticker['highPrice']),
+                                    'low_24h': float(ticker['lowPrice']),
+                                    'timestamp': datetime.utcnow()
+                                })
             
             return market_data
             
@@ -0,0 +1,72 @@
+"""
+Single-flight por clave
+Las llamadas concurrentes con la misma clave comparten una sola ejecución
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Coalescencia de llamadas asíncronas idénticas
+
+    - Mientras una llamada está en curso, las demás con la misma clave la esperan
+    - Con `ttl` > 0 el resultado se reutiliza durante ese tiempo; `do(max_age=...)`
+      permite a un llamador aceptar resultados más antiguos (o exigirlos más recientes)
+    - Los errores no se cachean: la siguiente llamada vuelve a intentarlo
+    """
+
+    def __init__(self, ttl: float = 0.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Los resultados se conservan lo que pida el llamador más tolerante
+        self.retention = ttl
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]],
+                 max_age: Optional[float] = None) -> Any:
+        max_age = self.ttl if max_age is None else max_age
+        self.retention = max(self.retention, max_age)
+
+        cached = self._results.get(key)
+        if cached is not None and time.monotonic() - cached[0] < max_age:
+            return cached[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._run(key, fn))
+            task.add_done_callback(_consume_exception)
+            self._inflight[key] = task
+
+        # shield: si un llamador se cancela, los demás siguen esperando el resultado
+        return await asyncio.shield(task)
+
+    def forget(self, key: Hashable):
+        """Descartar el resultado cacheado de una clave"""
+        self._results.pop(key, None)
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            result = await fn()
+            if self.retention > 0:
+                self._store(key, result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def _store(self, key: Hashable, result: Any):
+        if len(self._results) >= self.max_entries:
+            now = time.monotonic()
+            self._results = {
+                k: entry for k, entry in self._results.items() if now - entry[0] < self.retention
+            }
+        self._results[key] = (time.monotonic(), result)
+
+
+def _consume_exception(task: asyncio.Task):
+    # Evita el aviso "exception was never retrieved" si todos los llamadores se cancelaron
+    if not task.cancelled():
+        task.exception()
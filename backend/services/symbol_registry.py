@@ -0,0 +1,67 @@
+"""
+Registro de símbolos e índice de tickers
+Normaliza BTC/USDT <-> BTCUSDT una sola vez y permite búsquedas O(1) por símbolo
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+# Activos de cotización conocidos, del sufijo más largo al más corto
+QUOTE_ASSETS = ("FDUSD", "USDT", "USDC", "BUSD", "TUSD", "EUR", "BTC", "ETH", "BNB")
+
+
+class SymbolRegistry:
+    """
+    Mapa precalculado entre símbolos de la plataforma (BTC/USDT)
+    y símbolos del exchange (BTCUSDT)
+
+    Los símbolos llegan de peticiones de usuario: a partir de `max_entries`
+    se convierten sin guardarse, para que el mapa no crezca sin límite.
+    """
+
+    def __init__(self, quote_assets: Tuple[str, ...] = QUOTE_ASSETS, max_entries: int = 5000):
+        self.quote_assets = tuple(sorted(quote_assets, key=len, reverse=True))
+        self.max_entries = max_entries
+        self._to_exchange: Dict[str, str] = {}
+        self._to_display: Dict[str, str] = {}
+
+    def register(self, symbol: str) -> str:
+        """Registrar un símbolo de la plataforma y devolver su forma en el exchange"""
+        exchange_symbol = symbol.replace('/', '').upper()
+        if len(self._to_exchange) < self.max_entries:
+            self._to_exchange[symbol] = exchange_symbol
+        if '/' in symbol and len(self._to_display) < self.max_entries:
+            self._to_display.setdefault(exchange_symbol, symbol.upper())
+        return exchange_symbol
+
+    def to_exchange(self, symbol: str) -> str:
+        """BTC/USDT -> BTCUSDT"""
+        exchange_symbol = self._to_exchange.get(symbol)
+        if exchange_symbol is None:
+            exchange_symbol = self.register(symbol)
+        return exchange_symbol
+
+    def to_display(self, exchange_symbol: str) -> str:
+        """BTCUSDT -> BTC/USDT"""
+        symbol = self._to_display.get(exchange_symbol)
+        if symbol is None:
+            symbol = exchange_symbol
+            for quote in self.quote_assets:
+                if exchange_symbol.endswith(quote) and len(exchange_symbol) > len(quote):
+                    symbol = f"{exchange_symbol[:-len(quote)]}/{quote}"
+                    break
+            if len(self._to_display) < self.max_entries:
+                self._to_display[exchange_symbol] = symbol
+        return symbol
+
+    def resolve(self, symbols: Iterable[str]) -> List[Tuple[str, str]]:
+        """Resolver una lista de símbolos a pares (plataforma, exchange)"""
+        return [(symbol, self.to_exchange(symbol)) for symbol in symbols]
+
+
+def index_tickers(tickers: List[Dict]) -> Dict[str, Dict]:
+    """Indexar el payload de tickers por símbolo del exchange"""
+    return {ticker['symbol']: ticker for ticker in tickers if 'symbol' in ticker}
+
+
+# Registro global compartido por los servicios
+symbol_registry = SymbolRegistry()
@@ -0,0 +1,75 @@
+"""
+Caché de tickers compartida por todo el proceso
+Un único snapshot de /api/v3/ticker/24hr sirve a todos los bots y endpoints
+"""
+
+import asyncio
+import time
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TickerCache:
+    """
+    Caché con TTL, refresco single-flight y stale-while-revalidate
+
+    - Dentro del TTL se devuelve el snapshot en memoria
+    - Entre el TTL y max_stale se devuelve el snapshot viejo y se refresca en background
+    - Sin snapshot utilizable, todos los llamadores esperan la misma descarga
+    """
+
+    def __init__(self, fetcher: Callable[[], Awaitable[Any]], ttl: float = 1.0, max_stale: float = 30.0):
+        self._fetcher = fetcher
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._snapshot: Optional[Any] = None
+        self._fetched_at = 0.0
+        self._inflight: Optional[asyncio.Task] = None
+
+    @property
+    def age(self) -> float:
+        """Segundos desde la última descarga correcta"""
+        if self._snapshot is None:
+            return float('inf')
+        return time.monotonic() - self._fetched_at
+
+    async def get(self) -> Any:
+        """Obtener el snapshot de tickers, descargándolo solo si es necesario"""
+        age = self.age
+
+        if age < self.ttl:
+            return self._snapshot
+
+        if age < self.max_stale:
+            # Stale-while-revalidate: responder ya y refrescar en segundo plano
+            self._start_refresh()
+            return self._snapshot
+
+        # shield: si un llamador se cancela, la descarga compartida continúa
+        return await asyncio.shield(self._start_refresh())
+
+    def invalidate(self):
+        """Descartar el snapshot actual"""
+        self._snapshot = None
+        self._fetched_at = 0.0
+
+    def _start_refresh(self) -> asyncio.Task:
+        """Lanzar una descarga o reutilizar la que ya está en curso"""
+        loop = asyncio.get_running_loop()
+        if self._inflight is None or self._inflight.done() or self._inflight.get_loop() is not loop:
+            self._inflight = loop.create_task(self._refresh())
+            self._inflight.add_done_callback(self._log_refresh_error)
+        return self._inflight
+
+    async def _refresh(self) -> Any:
+        snapshot = await self._fetcher()
+        self._snapshot = snapshot
+        self._fetched_at = time.monotonic()
+        return snapshot
+
+    @staticmethod
+    def _log_refresh_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Ticker refresh failed: {task.exception()}")
@@ -0,0 +1,170 @@
+"""
+Diario de trades con escritura diferida
+Agrupa los trades ejecutados y los persiste con insert_many en lugar de un insert por trade
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Un listener recibe la base de datos y los trades efectivamente insertados en el lote
+FlushListener = Callable[[object, List[Dict]], Awaitable[None]]
+
+# Centinela que marca el cierre del diario dentro de la cola
+_STOP = object()
+
+
+class TradeJournal:
+    """
+    Buffer asíncrono de trades ejecutados
+
+    - Vacía el buffer al llegar a `max_batch` trades o tras `flush_interval` segundos
+    - La cola está acotada a `max_pending`: si se llena, `record` espera (backpressure)
+    - Tras cada insert_many avisa a los listeners (contadores de bots, etc.)
+    - `stop` vacía lo pendiente antes del cierre
+    """
+
+    def __init__(self, max_batch: int = 500, flush_interval: float = 1.0,
+                 max_pending: int = 10000, max_attempts: int = 5):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._listeners: List[FlushListener] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._db = None
+        self._closing = False
+        self.flushed_trades = 0
+        self.dropped_trades = 0
+
+    def add_listener(self, listener: FlushListener):
+        self._listeners.append(listener)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self, db):
+        """Lanzar el flusher en background (startup de FastAPI)"""
+        if self._task is None or self._task.done():
+            self._db = db
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._closing = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Detener el flusher persistiendo todo lo pendiente (shutdown de FastAPI)"""
+        if self._task is None:
+            return
+
+        # El centinela llega detrás de todos los trades ya encolados
+        self._closing = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def record(self, trade: Dict):
+        """Encolar un trade ejecutado; espera si el buffer está lleno"""
+        if self._task is None or self._closing:
+            raise RuntimeError("TradeJournal no iniciado")
+        await self._queue.put(trade)
+
+    async def _run(self):
+        stopping = False
+
+        while not stopping:
+            # Esperar al primer trade y acumular hasta el tamaño o el tiempo límite
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(batch) < self.max_batch:
+                if self._queue.empty():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict]):
+        if not batch:
+            return
+
+        inserted = await self._insert(batch)
+        self.flushed_trades += len(inserted)
+
+        for listener in self._listeners:
+            try:
+                await listener(self._db, inserted)
+            except Exception as e:
+                logger.error(f"Trade journal listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+    async def _insert(self, batch: List[Dict]) -> List[Dict]:
+        """insert_many con reintentos; devuelve los trades efectivamente insertados"""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self._db.trades.insert_many(batch, ordered=False)
+                return batch
+
+            except BulkWriteError as e:
+                failed = {
+                    error["index"] for error in e.details.get("writeErrors", [])
+                    if not _already_inserted(error, batch[error["index"]])
+                }
+                if failed:
+                    logger.error(f"Trade journal: {len(failed)} of {len(batch)} trades rejected")
+                    self.dropped_trades += len(failed)
+                return [trade for i, trade in enumerate(batch) if i not in failed]
+
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    logger.error(f"Trade journal: dropping {len(batch)} trades after {attempt} attempts: {e}")
+                    self.dropped_trades += len(batch)
+                    return []
+                await asyncio.sleep(min(0.5 * 2 ** attempt, 10))
+
+        return []
+
+
+def _already_inserted(error: Dict, trade: Dict) -> bool:
+    """
+    Clave duplicada por el propio trade, insertado en un intento anterior
+
+    Un duplicado en otro índice único (p. ej. (user_id, zaffex_order_id) ya
+    importado por /sync) es otro documento: el trade no se guardó.
+    """
+    if error.get("code") != 11000:
+        return False
+    key = error.get("keyPattern") or {}
+    if key == {"_id": 1}:
+        return True
+    return key == {"id": 1} and (error.get("keyValue") or {}).get("id") == trade.get("id")
+
+
+# Diario global compartido por los bucles de trading
+trade_journal = TradeJournal(
+    max_batch=int(os.environ.get('TRADE_JOURNAL_BATCH_SIZE', '500')),
+    flush_interval=float(os.environ.get('TRADE_JOURNAL_FLUSH_INTERVAL', '1.0')),
+    max_pending=int(os.environ.get('TRADE_JOURNAL_MAX_PENDING', '10000'))
+)
@@ -0,0 +1,188 @@
+"""
+Rollups de trades por hora y por día
+P&L, volumen, número de trades y ganadores por (usuario, bot, par, bucket)
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+GRANULARITIES = ("hour", "day")
+
+ROLLUP_KEY_FIELDS = ["user_id", "granularity", "bucket", "bot_id", "trading_pair"]
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Inicio del bucket horario o diario que contiene `moment`"""
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def granularity_for(start_date: datetime, now: datetime) -> str:
+    """Buckets horarios para ventanas de hasta un día, diarios para el resto"""
+    return "hour" if now - start_date <= timedelta(days=1) else "day"
+
+
+def rollup_deltas(trades: List[Dict]) -> Dict[Tuple, Tuple[float, float, int, int]]:
+    """Agrupar trades en deltas (profit_loss, volume, trades, wins) por clave de rollup"""
+    deltas: Dict[Tuple, Tuple[float, float, int, int]] = {}
+
+    for trade in trades:
+        executed_at = trade.get("executed_at")
+        if executed_at is None:
+            continue
+
+        profit_loss = trade.get("profit_loss", 0)
+        for granularity in GRANULARITIES:
+            key = (
+                trade["user_id"],
+                granularity,
+                bucket_start(executed_at, granularity),
+                trade["bot_id"],
+                trade["trading_pair"]
+            )
+            pl, volume, count, wins = deltas.get(key, (0.0, 0.0, 0, 0))
+            deltas[key] = (
+                pl + profit_loss,
+                volume + trade.get("total_value", 0),
+                count + 1,
+                wins + (1 if profit_loss > 0 else 0)
+            )
+
+    return deltas
+
+
+async def record_trade_rollups(db, trades: List[Dict]):
+    """Listener del diario de trades: incrementa los rollups con un bulk_write"""
+    deltas = rollup_deltas([trade for trade in trades if trade.get("status") == "executed"])
+    if not deltas:
+        return None
+
+    operations = [
+        UpdateOne(
+            dict(zip(ROLLUP_KEY_FIELDS, key)),
+            {"$inc": {"profit_loss": pl, "volume": volume, "trades": count, "wins": wins}},
+            upsert=True
+        )
+        for key, (pl, volume, count, wins) in deltas.items()
+    ]
+    return await db.trade_rollups.bulk_write(operations, ordered=False)
+
+
+async def backfill_rollups(db, user_id: Optional[str] = None):
+    """Recalcular los rollups desde la colección trades (de un usuario o de todos)"""
+    match = {"status": "executed", "executed_at": {"$ne": None}}
+    if user_id:
+        match["user_id"] = user_id
+
+    scope = {"user_id": user_id} if user_id else {}
+    await db.trade_rollups.delete_many(scope)
+
+    for granularity in GRANULARITIES:
+        parts = {
+            "year": {"$year": "$executed_at"},
+            "month": {"$month": "$executed_at"},
+            "day": {"$dayOfMonth": "$executed_at"}
+        }
+        if granularity == "hour":
+            parts["hour"] = {"$hour": "$executed_at"}
+
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {
+                    "user_id": "$user_id",
+                    "bucket": {"$dateFromParts": parts},
+                    "bot_id": "$bot_id",
+                    "trading_pair": "$trading_pair"
+                },
+                "profit_loss": {"$sum": "$profit_loss"},
+                "volume": {"$sum": "$total_value"},
+                "trades": {"$sum": 1},
+                "wins": {"$sum": {"$cond": [{"$gt": ["$profit_loss", 0]}, 1, 0]}}
+            }},
+            {"$project": {
+                "_id": 0,
+                "user_id": "$_id.user_id",
+                "granularity": {"$literal": granularity},
+                "bucket": "$_id.bucket",
+                "bot_id": "$_id.bot_id",
+                "trading_pair": "$_id.trading_pair",
+                "profit_loss": 1,
+                "volume": 1,
+                "trades": 1,
+                "wins": 1
+            }},
+            {"$merge": {
+                "into": "trade_rollups",
+                "on": ROLLUP_KEY_FIELDS,
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }}
+        ]
+        await db.trades.aggregate(pipeline).to_list(length=None)
+
+    return await db.trade_rollups.count_documents(scope)
+
+
+async def rollup_summary(db, match: Dict, start_date: datetime, granularity: str = "day") -> Dict:
+    """
+    Totales, serie diaria y ranking por par a partir de los rollups
+
+    `match` filtra por user_id o bot_id; `start_date` se redondea al inicio de su bucket.
+    """
+    pipeline = [
+        {"$match": {
+            **match,
+            "granularity": granularity,
+            "bucket": {"$gte": bucket_start(start_date, granularity)}
+        }},
+        {"$facet": {
+            "totals": [
+                {"$group": {
+                    "_id": None,
+                    "total_trades": {"$sum": "$trades"},
+                    "profitable_trades": {"$sum": "$wins"},
+                    "total_profit_loss": {"$sum": "$profit_loss"},
+                    "total_volume": {"$sum": "$volume"}
+                }}
+            ],
+            "daily_data": [
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$bucket"}},
+                    "profit_loss": {"$sum": "$profit_loss"},
+                    "trades": {"$sum": "$trades"},
+                    "volume": {"$sum": "$volume"}
+                }},
+                {"$sort": {"_id": 1}},
+                {"$project": {"_id": 0, "date": "$_id", "profit_loss": 1, "trades": 1, "volume": 1}}
+            ],
+            "by_pair": [
+                {"$group": {
+                    "_id": "$trading_pair",
+                    "total_profit_loss": {"$sum": "$profit_loss"},
+                    "total_trades": {"$sum": "$trades"},
+                    "total_volume": {"$sum": "$volume"}
+                }},
+                {"$sort": {"total_profit_loss": -1}},
+                {"$limit": 5}
+            ]
+        }}
+    ]
+
+    results = await db.trade_rollups.aggregate(pipeline).to_list(length=1)
+    result = results[0] if results else {}
+    totals = (result.get("totals") or [{}])[0]
+
+    return {
+        "totals": {
+            "total_trades": totals.get("total_trades", 0),
+            "profitable_trades": totals.get("profitable_trades", 0),
+            "total_profit_loss": totals.get("total_profit_loss", 0),
+            "total_volume": totals.get("total_volume", 0)
+        },
+        "daily_data": result.get("daily_data", []),
+        "by_pair": result.get("by_pair", [])
+    }
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los módulos del backend se importan como `services...`, igual que desde server.py
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
@@ -0,0 +1,183 @@
+"""
+Colección Mongo en memoria para los tests
+Implementa solo los operadores y métodos que usan los servicios
+"""
+
+import copy
+from types import SimpleNamespace
+
+from pymongo import ReturnDocument
+
+_MISSING = object()
+
+
+def _compare(value, condition):
+    if isinstance(condition, dict) and any(key.startswith("$") for key in condition):
+        for op, arg in condition.items():
+            if op == "$in" and value not in arg:
+                return False
+            if op == "$nin" and value in arg:
+                return False
+            if op == "$ne" and value == arg:
+                return False
+            if op == "$exists" and (value is not _MISSING) != arg:
+                return False
+            if op == "$type" and arg == "string" and not isinstance(value, str):
+                return False
+            if op == "$not" and _compare(value, arg):
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is _MISSING or value is None:
+                    return False
+                if op == "$gt" and not value > arg:
+                    return False
+                if op == "$gte" and not value >= arg:
+                    return False
+                if op == "$lt" and not value < arg:
+                    return False
+                if op == "$lte" and not value <= arg:
+                    return False
+        return True
+    return value == condition
+
+
+def matches(document, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif not _compare(document.get(key, _MISSING), condition):
+            return False
+    return True
+
+
+def project(document, projection):
+    if not projection:
+        return copy.deepcopy(document)
+    included = [key for key, flag in projection.items() if flag and key != "_id"]
+    if included:
+        return {key: copy.deepcopy(document[key]) for key in included if key in document}
+    return {key: copy.deepcopy(value) for key, value in document.items() if projection.get(key, 1)}
+
+
+def apply_update(document, update, inserting=False):
+    for key, value in update.get("$set", {}).items():
+        document[key] = value
+    for key in update.get("$unset", {}):
+        document.pop(key, None)
+    for key, value in update.get("$inc", {}).items():
+        document[key] = document.get(key, 0) + value
+    if inserting:
+        for key, value in update.get("$setOnInsert", {}).items():
+            document[key] = value
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self._documents = documents
+
+    def sort(self, key, direction=1):
+        self._documents.sort(key=lambda document: document.get(key), reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        if count:
+            self._documents = self._documents[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return self._documents[:length] if length else list(self._documents)
+
+    def __aiter__(self):
+        self._iterator = iter(self._documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, documents=()):
+        self.documents = [dict(document) for document in documents]
+        self.calls = []
+
+    def find(self, query=None, projection=None):
+        self.calls.append("find")
+        return FakeCursor([project(d, projection) for d in self.documents if matches(d, query or {})])
+
+    async def find_one(self, query=None, projection=None):
+        self.calls.append("find_one")
+        for document in self.documents:
+            if matches(document, query or {}):
+                return project(document, projection)
+        return None
+
+    async def insert_one(self, document):
+        self.calls.append("insert_one")
+        self.documents.append(copy.deepcopy(document))
+        return SimpleNamespace(inserted_id=document.get("id"))
+
+    async def insert_many(self, documents, ordered=True):
+        self.calls.append("insert_many")
+        self.documents.extend(copy.deepcopy(document) for document in documents)
+        return SimpleNamespace(inserted_ids=[document.get("id") for document in documents])
+
+    async def update_one(self, query, update, upsert=False):
+        self.calls.append("update_one")
+        for document in self.documents:
+            if matches(document, query):
+                apply_update(document, update)
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            document = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            apply_update(document, update, inserting=True)
+            self.documents.append(document)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=len(self.documents))
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def bulk_write(self, operations, ordered=True):
+        """Solo UpdateOne, que es lo que usa el backend"""
+        self.calls.append("bulk_write")
+        upserted_ids = {}
+        for index, operation in enumerate(operations):
+            result = await self.update_one(operation._filter, operation._doc, upsert=operation._upsert)
+            self.calls.pop()
+            if result.upserted_id is not None:
+                upserted_ids[index] = result.upserted_id
+        return SimpleNamespace(upserted_ids=upserted_ids)
+
+    async def update_many(self, query, update):
+        self.calls.append("update_many")
+        matched = [document for document in self.documents if matches(document, query)]
+        for document in matched:
+            apply_update(document, update)
+        return SimpleNamespace(matched_count=len(matched), modified_count=len(matched))
+
+    async def find_one_and_update(self, query, update, projection=None,
+                                  return_document=ReturnDocument.BEFORE):
+        self.calls.append("find_one_and_update")
+        for document in self.documents:
+            if matches(document, query):
+                before = project(document, projection)
+                apply_update(document, update)
+                return project(document, projection) if return_document == ReturnDocument.AFTER else before
+        return None
+
+
+class FakeDatabase:
+    """Atributos de colección creados bajo demanda, como en Motor"""
+
+    def __init__(self, **collections):
+        for name, documents in collections.items():
+            setattr(self, name, FakeCollection(documents))
+
+    def __getattr__(self, name):
+        collection = FakeCollection()
+        setattr(self, name, collection)
+        return collection
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from services.backtest import ema, rsi, sma
+from services.indicators import EMA, RSI, SMA
+
+
+def prices(n=600, seed=7):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+
+
+def stream(indicator, values):
+    out = [indicator.update(float(v)) for v in values]
+    return np.array([np.nan if v is None else v for v in out])
+
+
+@pytest.mark.parametrize("period", [1, 5, 14, 50])
+def test_streaming_sma_matches_vectorized(period):
+    close = prices()
+    np.testing.assert_allclose(stream(SMA(period), close), sma(close, period), rtol=1e-9)
+
+
+@pytest.mark.parametrize("period", [2, 12, 26, 200])
+def test_streaming_ema_matches_vectorized(period):
+    close = prices()
+    np.testing.assert_allclose(stream(EMA(period), close), ema(close, period), rtol=1e-9)
+
+
+@pytest.mark.parametrize("period", [2, 14, 30])
+def test_streaming_rsi_matches_vectorized(period):
+    close = prices()
+    np.testing.assert_allclose(stream(RSI(period), close), rsi(close, period), rtol=1e-9, atol=1e-9)
+
+
+def test_rsi_flat_and_rising_series():
+    flat = np.full(30, 10.0)
+    rising = np.arange(1.0, 31.0)
+    np.testing.assert_allclose(stream(RSI(14), flat)[14:], rsi(flat, 14)[14:])
+    np.testing.assert_allclose(stream(RSI(14), rising)[14:], rsi(rising, 14)[14:])
+    assert rsi(flat, 14)[-1] == 50.0 and rsi(rising, 14)[-1] == 100.0
+
+
+def test_short_series_is_all_nan():
+    close = prices(10)
+    assert np.isnan(ema(close, 20)).all()
+    assert np.isnan(sma(close, 20)).all()
+    assert np.isnan(rsi(close, 14)).all()
@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from services.bot_registry import BotStateRegistry
+
+from .fakes import FakeCollection
+
+
+def make_bots(*bot_ids, **fields):
+    return [{"id": bot_id, "user_id": "user_1", "is_active": True, "status": "active", **fields}
+            for bot_id in bot_ids]
+
+
+def test_only_one_worker_claims_a_bot():
+    collection = FakeCollection(make_bots("bot_1"))
+    first = BotStateRegistry(owner="worker_a")
+    second = BotStateRegistry(owner="worker_b")
+
+    async def main():
+        assert await first.claim(collection, "bot_1") is not None
+        assert await second.claim(collection, "bot_1") is None
+        # El dueño puede volver a reclamarlo (renovación)
+        assert await first.claim(collection, "bot_1") is not None
+
+    asyncio.run(main())
+    assert first.owns("bot_1")
+    assert not second.owns("bot_1") and second.get("bot_1") is None
+    assert collection.documents[0]["scheduler_owner"] == "worker_a"
+
+
+def test_claim_active_splits_bots_and_takes_expired_leases():
+    expired = datetime.utcnow() - timedelta(seconds=1)
+    collection = FakeCollection(
+        make_bots("bot_1", "bot_2")
+        + make_bots("bot_3", scheduler_owner="dead_worker", scheduler_lease_until=expired)
+        + make_bots("bot_4", is_active=False)
+    )
+    first = BotStateRegistry(owner="worker_a")
+    second = BotStateRegistry(owner="worker_b")
+
+    async def main():
+        return await first.claim_active(collection), await second.claim_active(collection)
+
+    claimed_a, claimed_b = asyncio.run(main())
+    assert sorted(bot["id"] for bot in claimed_a) == ["bot_1", "bot_2", "bot_3"]
+    assert claimed_b == []
+
+
+def test_reconcile_drops_bots_claimed_by_another_worker():
+    collection = FakeCollection(make_bots("bot_1", "bot_2"))
+    registry = BotStateRegistry(owner="worker_a")
+
+    async def main():
+        await registry.claim_active(collection)
+        # Otro worker se queda con bot_2 (p. ej. tras una pausa larga de este proceso)
+        collection.documents[1]["scheduler_owner"] = "worker_b"
+        await registry.reconcile(collection)
+
+    asyncio.run(main())
+    assert registry.bot_ids() == ["bot_1"]
+    assert registry.owns("bot_1") and not registry.owns("bot_2")
+    assert collection.documents[0]["scheduler_lease_until"] > datetime.utcnow()
+
+
+def test_stop_releases_leases_and_start_schedules_claimed_bots():
+    collection = FakeCollection(make_bots("bot_1", "bot_2"))
+    registry = BotStateRegistry(reconcile_interval=60, owner="worker_a")
+    scheduled = []
+
+    async def main():
+        registry.start(collection, on_claim=lambda bot: scheduled.append(bot["id"]))
+        for _ in range(10):
+            await asyncio.sleep(0)
+        await registry.stop()
+
+    asyncio.run(main())
+    assert sorted(scheduled) == ["bot_1", "bot_2"]
+    assert len(registry) == 0
+    assert all("scheduler_owner" not in bot for bot in collection.documents)
+
+
+def test_expired_local_lease_stops_ownership():
+    collection = FakeCollection(make_bots("bot_1"))
+    registry = BotStateRegistry(lease_ttl=0.0, owner="worker_a")
+
+    asyncio.run(registry.claim(collection, "bot_1"))
+    assert registry.get("bot_1") is not None
+    assert not registry.owns("bot_1")
+
+
+def test_errored_bot_is_not_reclaimed():
+    collection = FakeCollection(make_bots("bot_1", "bot_2"))
+    registry = BotStateRegistry(lease_ttl=0.0, owner="worker_a")
+    other = BotStateRegistry(owner="worker_b")
+
+    async def main():
+        await registry.claim_active(collection)
+        # Lo que hace run_trading_cycle al fallar un ciclo
+        await collection.update_one(
+            {"id": "bot_1"},
+            {"$set": {"status": "error"}, "$unset": {"scheduler_owner": "", "scheduler_lease_until": ""}}
+        )
+        registry.remove("bot_1")
+        return (
+            await registry.claim_active(collection),
+            await other.claim_active(collection),
+            await other.claim(collection, "bot_1")
+        )
+
+    mine, theirs, direct = asyncio.run(main())
+    assert mine == []
+    assert [bot["id"] for bot in theirs] == ["bot_2"]  # lease de bot_2 caducado (ttl 0)
+    assert direct is None
+    assert collection.documents[0].get("scheduler_owner") is None
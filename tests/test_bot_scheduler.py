@@ -0,0 +1,128 @@
+import asyncio
+
+from services.bot_scheduler import BotScheduler
+
+
+def test_schedule_deduplicates_by_bot_id():
+    runs = []
+
+    async def run_cycle(bot_id, user_id):
+        runs.append(bot_id)
+        return None
+
+    scheduler = BotScheduler(run_cycle)
+
+    async def main():
+        scheduler.start()
+        assert scheduler.schedule("bot_1", "user_1")
+        assert not scheduler.schedule("bot_1", "user_1")
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert runs == ["bot_1"]
+
+
+def test_cycles_repeat_until_cancelled():
+    runs = []
+
+    async def run_cycle(bot_id, user_id):
+        runs.append(bot_id)
+        return 0.01
+
+    scheduler = BotScheduler(run_cycle)
+
+    async def main():
+        scheduler.start()
+        scheduler.schedule("bot_1", "user_1")
+        await asyncio.sleep(0.1)
+        assert scheduler.cancel("bot_1")
+        assert not scheduler.cancel("bot_1")
+        count = len(runs)
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+        return count
+
+    count = asyncio.run(main())
+    assert count > 1
+    assert len(runs) == count
+    assert not scheduler.is_scheduled("bot_1")
+
+
+def test_running_cycle_finishes_but_is_not_rescheduled_after_cancel():
+    started = []
+    finished = []
+
+    async def run_cycle(bot_id, user_id):
+        started.append(bot_id)
+        await asyncio.sleep(0.05)
+        finished.append(bot_id)
+        return 0.0
+
+    scheduler = BotScheduler(run_cycle)
+
+    async def main():
+        scheduler.start()
+        scheduler.schedule("bot_1", "user_1")
+        await asyncio.sleep(0.01)
+        scheduler.cancel("bot_1")
+        await asyncio.sleep(0.1)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert started == ["bot_1"]
+    assert finished == ["bot_1"]
+
+
+def test_concurrency_cap():
+    active = 0
+    peak = 0
+    done = []
+
+    async def run_cycle(bot_id, user_id):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        done.append(bot_id)
+        return None
+
+    scheduler = BotScheduler(run_cycle, max_concurrency=3)
+
+    async def main():
+        scheduler.start()
+        for n in range(10):
+            scheduler.schedule(f"bot_{n}", "user_1")
+        for _ in range(100):
+            if len(done) == 10:
+                break
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert len(done) == 10
+    assert peak == 3
+
+
+def test_failing_cycle_stops_only_that_bot():
+    runs = []
+
+    async def run_cycle(bot_id, user_id):
+        runs.append(bot_id)
+        if bot_id == "broken":
+            raise RuntimeError("boom")
+        return None
+
+    scheduler = BotScheduler(run_cycle)
+
+    async def main():
+        scheduler.start()
+        scheduler.schedule("broken", "user_1")
+        scheduler.schedule("healthy", "user_1")
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert sorted(runs) == ["broken", "healthy"]
+    assert scheduler.stats()["scheduled_bots"] == 0
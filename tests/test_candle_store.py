@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from routes import bots
+from services.candle_store import CandleSeries, CandleStore
+
+from .fakes import FakeDatabase
+
+STEP = 3600_000
+
+
+def make_candles(timestamps):
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    close = timestamps / STEP
+    return {
+        "timestamp": timestamps, "open": close, "high": close + 1, "low": close - 1,
+        "close": close, "volume": np.ones(len(timestamps))
+    }
+
+
+class FakeKlines:
+    """Exchange con todas las velas horarias de `start` a `end`, paginadas como Zaffex"""
+
+    def __init__(self, start, end):
+        self.timestamps = np.arange(start, end + 1, STEP, dtype=np.int64)
+        self.requests = []
+
+    async def get_klines(self, symbol, interval, start_ms, end_ms, limit):
+        self.requests.append((start_ms, end_ms))
+        window = self.timestamps[(self.timestamps >= start_ms) & (self.timestamps <= end_ms)][:limit]
+        return make_candles(window)
+
+
+def test_merge_prepends_and_fills_internal_gaps(tmp_path):
+    series = CandleSeries(tmp_path / "BTC_USDT" / "1h", "1h")
+    assert series.merge(make_candles([10 * STEP, 11 * STEP, 14 * STEP])) == 3
+    assert series.merge(make_candles([15 * STEP, 16 * STEP])) == 2
+
+    # Anteriores, intermedias y una repetida (se conserva la almacenada)
+    older = make_candles([8 * STEP, 9 * STEP, 12 * STEP, 13 * STEP, 14 * STEP])
+    older["close"] = older["close"] + 1000
+    assert series.merge(older) == 4
+
+    columns = series.columns()
+    np.testing.assert_array_equal(columns["timestamp"], np.arange(8, 17) * STEP)
+    assert columns["close"][6] == 14  # la vela 14 ya existía
+    assert columns["close"][0] == 1008
+    assert series.gaps(8 * STEP, 17 * STEP) == []
+    assert not series._staging.exists() and not series._previous.exists()
+
+
+def test_merge_of_known_candles_adds_nothing(tmp_path):
+    series = CandleSeries(tmp_path / "s", "1h")
+    series.merge(make_candles([1 * STEP, 2 * STEP]))
+    assert series.merge(make_candles([1 * STEP])) == 0
+    assert len(series) == 2
+
+
+def test_interrupted_swap_is_rolled_back(tmp_path):
+    path = tmp_path / "BTC_USDT" / "1h"
+    CandleSeries(path, "1h").merge(make_candles([1 * STEP, 2 * STEP]))
+
+    # Corte entre los dos os.replace: solo queda .old y un .tmp a medias
+    path.rename(path.with_name("1h.old"))
+    path.with_name("1h.tmp").mkdir()
+    (path.with_name("1h.tmp") / "close.bin").write_bytes(b"partial")
+
+    series = CandleSeries(path, "1h")
+    np.testing.assert_array_equal(series.columns()["timestamp"], [1 * STEP, 2 * STEP])
+
+    # La siguiente reescritura descarta el temporal a medias
+    assert series.merge(make_candles([0])) == 1
+    assert not path.with_name("1h.tmp").exists()
+    np.testing.assert_array_equal(series.columns()["timestamp"], [0, 1 * STEP, 2 * STEP])
+
+
+def test_backfill_extends_history_backwards(tmp_path):
+    now = int(time.time() * 1000) // STEP * STEP
+    exchange = FakeKlines(now - 200 * STEP, now)
+    store = CandleStore(tmp_path)
+
+    async def main():
+        first = await store.backfill(exchange, "BTC/USDT", "1h", now - 30 * STEP)
+        # Un backfill más largo debe añadir las velas anteriores, no 0
+        second = await store.backfill(exchange, "BTC/USDT", "1h", now - 90 * STEP)
+        return first, second
+
+    first, second = asyncio.run(main())
+    series = store.series("BTC/USDT", "1h")
+    assert (first, second) == (30, 60)
+    np.testing.assert_array_equal(series.columns()["timestamp"], np.arange(now - 90 * STEP, now, STEP))
+
+
+def test_backfill_fills_internal_holes(tmp_path):
+    now = int(time.time() * 1000) // STEP * STEP
+    exchange = FakeKlines(now - 200 * STEP, now)
+    store = CandleStore(tmp_path)
+    series = store.series("BTC/USDT", "1h")
+    stored = np.concatenate([np.arange(now - 50 * STEP, now - 30 * STEP, STEP),
+                             np.arange(now - 20 * STEP, now - 5 * STEP, STEP)])
+    series.merge(make_candles(stored))
+
+    added = asyncio.run(store.backfill(exchange, "BTC/USDT", "1h", now - 50 * STEP))
+    assert added == 10 + 5
+    assert series.gaps(now - 50 * STEP, now) == []
+    # Solo se piden los huecos, no el rango completo
+    assert exchange.requests[0] == (now - 30 * STEP, now - 20 * STEP - 1)
+    assert [start for start, _ in exchange.requests[1:]] == [now - 5 * STEP]
+
+
+def test_backtest_rejects_leading_gap(tmp_path, monkeypatch):
+    now = int(time.time() * 1000) // STEP * STEP
+    store = CandleStore(tmp_path)
+    store.series("BTC/USDT", "1h").merge(make_candles(np.arange(now - 24 * STEP, now, STEP)))
+    monkeypatch.setattr(bots, "candle_store", store)
+    db = FakeDatabase(bots=[{
+        "id": "bot_1", "user_id": "user_1", "strategy": "Momentum Trading", "initial_investment": 1000.0
+    }])
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(bots.backtest_bot("bot_1", "BTC/USDT", "1h", days=3, user_id="user_1", db=db))
+    assert error.value.status_code == 409
+
+    result = asyncio.run(bots.backtest_bot("bot_1", "BTC/USDT", "1h", days=0.5, user_id="user_1", db=db))
+    assert result["gaps"] == 0
+    assert result["bars"] in (11, 12)
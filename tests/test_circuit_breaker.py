@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def test_opens_after_consecutive_failures_and_fails_fast():
+    async def probe():
+        raise RuntimeError("still down")
+
+    async def main():
+        breaker = CircuitBreaker("ticker", probe, failure_threshold=3, reset_timeout=60)
+        breaker.record_failure(RuntimeError("500"))
+        breaker.record_success()
+        breaker.record_failure(RuntimeError("500"))
+        breaker.record_failure(RuntimeError("500"))
+        assert breaker.state == CLOSED
+        breaker.record_failure(TimeoutError())
+        assert breaker.state == OPEN
+        assert breaker.snapshot()["last_error"] == "TimeoutError"
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        await breaker.stop()
+
+    asyncio.run(main())
+
+
+def test_probe_closes_circuit_once_endpoint_recovers():
+    attempts = []
+
+    async def probe():
+        attempts.append(breaker.state)
+        if len(attempts) < 2:
+            raise RuntimeError("still down")
+
+    breaker = None
+
+    async def main():
+        nonlocal breaker
+        breaker = CircuitBreaker("ticker", probe, failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure(RuntimeError("500"))
+        assert breaker.state == OPEN
+        for _ in range(50):
+            if breaker.state == CLOSED:
+                break
+            await asyncio.sleep(0.01)
+        breaker.before_call()
+        await breaker.stop()
+
+    asyncio.run(main())
+    assert attempts == [HALF_OPEN, HALF_OPEN]
+    assert breaker.failures == 0
+    assert breaker.snapshot()["open_for"] is None
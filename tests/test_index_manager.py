@@ -0,0 +1,107 @@
+import asyncio
+from types import SimpleNamespace
+
+from pymongo.errors import OperationFailure
+
+from services.index_manager import IndexManager
+from services.order_sync import dedupe_demo_order_ids
+
+
+class IndexCollection:
+    def __init__(self, existing=(), failing=()):
+        self.indexes = {"_id_", *existing}
+        self.failing = set(failing)
+        self.dropped = []
+
+    async def list_indexes(self):
+        for name in sorted(self.indexes):
+            yield {"name": name, "key": {"_id": 1}}
+
+    async def create_indexes(self, models):
+        assert len(models) == 1
+        name = models[0].document["name"]
+        if name in self.failing:
+            raise OperationFailure("E11000 duplicate key error", code=11000)
+        self.indexes.add(name)
+        return [name]
+
+    async def drop_index(self, name):
+        self.indexes.discard(name)
+        self.dropped.append(name)
+
+
+class IndexDatabase(dict):
+    def __getitem__(self, name):
+        return self.setdefault(name, IndexCollection())
+
+
+def test_failing_index_does_not_block_the_others():
+    db = IndexDatabase(trades=IndexCollection(failing={"unique_one"}))
+    manager = IndexManager()
+    manager.declare("trades", [("a", 1)], name="first")
+    manager.declare("trades", [("b", 1)], name="unique_one", unique=True)
+    manager.declare("trades", [("c", 1)], name="last")
+
+    asyncio.run(manager.ensure(db))
+    assert db["trades"].indexes == {"_id_", "first", "last"}
+
+
+def test_migration_runs_only_before_missing_index_and_retired_index_is_dropped():
+    db = IndexDatabase(
+        trades=IndexCollection(existing={"old_index"}),
+        bots=IndexCollection(existing={"bots_user"})
+    )
+    ran = []
+
+    async def migration(database):
+        ran.append(database)
+
+    manager = IndexManager()
+    manager.declare("trades", [("user_id", 1), ("order", 1)], name="new_unique", unique=True)
+    manager.declare("bots", [("user_id", 1)], name="bots_user")
+    manager.prepare("trades", "new_unique", migration)
+    manager.prepare("bots", "bots_user", migration)
+    manager.retire("trades", "old_index")
+    manager.retire("trades", "never_created")
+
+    asyncio.run(manager.ensure(db))
+    assert ran == [db]
+    assert db["trades"].dropped == ["old_index"]
+    assert db["trades"].indexes == {"_id_", "new_unique"}
+
+    asyncio.run(manager.ensure(db))
+    assert ran == [db]
+
+
+class DemoTrades:
+    def __init__(self, groups):
+        self.groups = groups
+        self.operations = []
+
+    async def aggregate(self, pipeline, allowDiskUse=False):
+        for group in self.groups:
+            yield group
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+        return SimpleNamespace(modified_count=len(operations))
+
+
+def test_dedupe_demo_order_ids_keeps_first_and_renames_the_rest():
+    trades = DemoTrades([
+        {"_id": {"user_id": "user_1", "zaffex_order_id": "DEMO_42"}, "ids": ["t1", "t2", "t3"], "count": 3}
+    ])
+    db = SimpleNamespace(trades=trades)
+
+    assert asyncio.run(dedupe_demo_order_ids(db)) == 2
+    updates = [(op._filter, op._doc) for op in trades.operations]
+    assert updates == [
+        ({"id": "t2", "zaffex_order_id": "DEMO_42"}, {"$set": {"zaffex_order_id": "DEMO_42_t2"}}),
+        ({"id": "t3", "zaffex_order_id": "DEMO_42"}, {"$set": {"zaffex_order_id": "DEMO_42_t3"}})
+    ]
+
+
+def test_dedupe_demo_order_ids_without_duplicates_writes_nothing():
+    trades = DemoTrades([])
+    assert asyncio.run(dedupe_demo_order_ids(SimpleNamespace(trades=trades))) == 0
+    assert trades.operations == []
@@ -0,0 +1,50 @@
+import pytest
+
+from services.indicators import ATR, EMA, RSI, SMA, BollingerBands, IndicatorBank, RingBuffer
+
+
+def test_ring_buffer_evicts_oldest_value():
+    window = RingBuffer(2)
+    assert window.push(1.0) is None
+    assert window.push(2.0) is None
+    assert window.full
+    assert window.push(3.0) == 1.0
+
+
+def test_sma_and_ema_warm_up_then_update():
+    sma, ema = SMA(3), EMA(3)
+    prices = [1.0, 2.0, 3.0, 4.0]
+    assert [sma.update(p) for p in prices] == [None, None, 2.0, 3.0]
+    # Semilla = SMA de los 3 primeros; después alpha = 2 / (3 + 1)
+    assert [ema.update(p) for p in prices] == [None, None, 2.0, 3.0]
+
+
+def test_rsi_and_bollinger_on_constant_series():
+    rsi, bands = RSI(3), BollingerBands(3, 2.0)
+    for _ in range(5):
+        rsi.update(10.0)
+        bands.update(10.0)
+    assert rsi.value == 50.0
+    assert bands.value == pytest.approx((10.0, 10.0, 10.0))
+
+
+def test_atr_uses_previous_close_for_true_range():
+    atr = ATR(2)
+    atr.update(11.0, 9.0, 10.0)   # rango 2
+    atr.update(15.0, 12.0, 14.0)  # |15 - 10| = 5
+    assert atr.value == 3.5
+    atr.update(14.0, 13.0, 13.5)  # |13 - 14| = 1 -> (3.5 + 1) / 2
+    assert atr.value == 2.25
+
+
+def test_indicator_bank_keeps_one_set_per_symbol_and_timeframe():
+    bank = IndicatorBank()
+    for price in range(100, 140):
+        bank.update("BTCUSDT", "1m", price, price, price)
+    bank.update("ETHUSDT", "1m", 1.0, 1.0, 1.0)
+
+    assert len(bank) == 2
+    assert bank.get("BTCUSDT", "1m").snapshot()["sma"] is not None
+    assert bank.get("ETHUSDT", "1m").snapshot()["sma"] is None
+    bank.remove("ETHUSDT", "1m")
+    assert len(bank) == 1
@@ -0,0 +1,140 @@
+import asyncio
+import json
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from services.market_stream import MarketDataStream, PriceBook
+from services.production_zaffex_service import ProductionZaffexService
+from services.symbol_registry import SymbolRegistry
+
+
+class FakeExchange:
+    """Servidor WebSocket local que imita /stream: confirma suscripciones y emite tickers"""
+
+    def __init__(self):
+        self.subscriptions = []
+        self.sockets = []
+        self.app = web.Application()
+        self.app.router.add_get("/stream", self.handle)
+
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.append(ws)
+        async for msg in ws:
+            payload = json.loads(msg.data)
+            self.subscriptions.append(payload["params"])
+            await ws.send_str(json.dumps({"result": None, "id": payload["id"]}))
+            for param in payload["params"]:
+                symbol, stream = param.split("@")
+                if stream == "ticker":
+                    await ws.send_str(json.dumps({
+                        "stream": param,
+                        "data": {"e": "24hrTicker", "s": symbol.upper(), "c": "101.5",
+                                 "E": 1000, "P": "2.5", "v": "1234"}
+                    }))
+        return ws
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met")
+        await asyncio.sleep(0.01)
+
+
+def run_with_stream(scenario, **stream_kwargs):
+    async def main():
+        exchange = FakeExchange()
+        server = TestServer(exchange.app)
+        await server.start_server()
+        session = aiohttp.ClientSession()
+
+        async def session_factory():
+            return session
+
+        stream = MarketDataStream(
+            str(server.make_url("")).rstrip("/"), session_factory, PriceBook(),
+            initial_backoff=0.01, **stream_kwargs
+        )
+        try:
+            stream.start()
+            await scenario(exchange, stream)
+        finally:
+            await stream.stop()
+            await session.close()
+            await server.close()
+
+    asyncio.run(main())
+
+
+def test_consumer_subscribes_and_updates_price_book():
+    async def scenario(exchange, stream):
+        stream.track(["btcusdt", "ETHUSDT"])
+        await wait_for(lambda: len(stream.price_book) == 2)
+
+        tick = stream.price_book.get("BTCUSDT", max_age=60)
+        assert tick.price == 101.5
+        assert tick.change_24h == 2.5
+        assert tick.volume_24h == 1234
+        assert stream.connected
+        assert exchange.subscriptions == [["btcusdt@ticker", "btcusdt@trade", "ethusdt@ticker", "ethusdt@trade"]]
+
+    run_with_stream(scenario)
+
+
+def test_consumer_caps_tracked_symbols():
+    async def scenario(exchange, stream):
+        stream.track(["AAAUSDT", "BBBUSDT", "CCCUSDT"])
+        stream.track(["DDDUSDT"])
+        await wait_for(lambda: len(stream.price_book) == 2)
+        await asyncio.sleep(0.05)
+
+        subscribed = [param for params in exchange.subscriptions for param in params]
+        assert subscribed == ["aaausdt@ticker", "aaausdt@trade", "bbbusdt@ticker", "bbbusdt@trade"]
+        assert len(stream.price_book) == 2
+
+    run_with_stream(scenario, max_symbols=2)
+
+
+def test_consumer_resubscribes_after_reconnect():
+    async def scenario(exchange, stream):
+        stream.track(["BTCUSDT"])
+        await wait_for(lambda: len(exchange.subscriptions) == 1)
+
+        # El exchange corta la conexión: el consumidor reconecta y vuelve a suscribir
+        await exchange.sockets[0].close()
+        await wait_for(lambda: len(exchange.subscriptions) == 2)
+        assert len(exchange.sockets) == 2
+        assert stream.reconnects == 1
+        assert exchange.subscriptions[1] == ["btcusdt@ticker", "btcusdt@trade"]
+
+    run_with_stream(scenario)
+
+
+def test_get_market_data_only_tracks_listed_symbols():
+    service = ProductionZaffexService()
+    tracked = []
+    service.market_stream.track = lambda symbols: tracked.extend(symbols)
+
+    async def fetch_tickers():
+        return {"BTCUSDT": {"symbol": "BTCUSDT", "lastPrice": "43000", "priceChangePercent": "1.0", "volume": "10"}}
+
+    service.ticker_cache._fetcher = fetch_tickers
+    data = asyncio.run(service.get_market_data(["BTC/USDT", "NOT/REAL", "FOO/USDT"]))
+
+    assert [item["symbol"] for item in data] == ["BTC/USDT"]
+    assert tracked == ["BTCUSDT"]
+
+
+def test_symbol_registry_stops_caching_at_limit():
+    registry = SymbolRegistry(max_entries=2)
+    for symbol in ["A/USDT", "B/USDT", "C/USDT", "D/USDT"]:
+        assert registry.to_exchange(symbol) == symbol.replace("/", "")
+
+    assert len(registry._to_exchange) == 2
+    assert registry.to_display("ZZZUSDT") == "ZZZ/USDT"
+    assert len(registry._to_display) == 2
@@ -0,0 +1,62 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from models.bot import Strategy
+from services.backtest import run_backtest
+from services import optimizer
+from services.optimizer import best_config, parameter_grid, random_samples, search_space
+
+
+def candles(n=800, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return {"open": close, "high": close * 1.01, "low": close * 0.99, "close": close}
+
+
+def test_search_space_covers_strategy_and_risk_parameters():
+    space = search_space(Strategy.MOMENTUM_TRADING)
+    assert set(space) == {"fast_period", "slow_period", "stop_loss_percentage", "take_profit_percentage"}
+    assert len(list(parameter_grid(space))) == 4 ** 4
+    assert len(list(random_samples(space, 5, seed=1))) == 5
+
+    with pytest.raises(ValueError):
+        search_space(Strategy.HIGH_FREQUENCY)
+
+
+def test_best_config_matches_sequential_backtests():
+    data = candles()
+    configs = list(parameter_grid({"fast_period": [5, 12], "slow_period": [26, 50]}))
+    base = {"stop_loss_percentage": 3.0, "take_profit_percentage": 6.0}
+
+    winner = asyncio.run(best_config(data, Strategy.MOMENTUM_TRADING, configs, base=base,
+                                     max_workers=1, chunk_size=2))
+
+    results = [(run_backtest(data, Strategy.MOMENTUM_TRADING, params=config, **base), config) for config in configs]
+    expected = max(results, key=lambda pair: pair[0]["profit"])
+    assert winner["config"] == expected[1]
+    assert winner["result"]["profit"] == pytest.approx(expected[0]["profit"])
+
+
+def test_sweep_releases_shared_memory_when_pool_fails(monkeypatch):
+    closed = []
+
+    class TrackedCandles(optimizer.SharedCandles):
+        def close(self):
+            closed.append(self.handle)
+            super().close()
+
+    def broken_pool(**kwargs):
+        raise OSError("no se pueden crear procesos")
+
+    monkeypatch.setattr(optimizer, "SharedCandles", TrackedCandles)
+    monkeypatch.setattr(optimizer, "ProcessPoolExecutor", broken_pool)
+
+    async def main():
+        async for _ in optimizer.sweep(candles(), Strategy.DCA_RSI, [{"rsi_period": 14}]):
+            pass
+
+    with pytest.raises(OSError):
+        asyncio.run(main())
+    assert len(closed) == 1
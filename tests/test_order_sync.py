@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime
+
+from services.order_sync import SYNC_SOURCE, sync_order_history
+
+from .fakes import FakeDatabase
+
+
+def order(order_id, status="FILLED", symbol="BTC/USDT"):
+    return {
+        "order_id": order_id,
+        "symbol": symbol,
+        "type": "BUY",
+        "amount": 0.5,
+        "price": 100.0,
+        "total": 50.0,
+        "status": status,
+        "executed_at": datetime(2024, 1, 1),
+        "mode": "real"
+    }
+
+
+class FakeZaffex:
+    """Historial de órdenes en memoria con el contrato de iter_order_history/get_order"""
+
+    def __init__(self, orders, page_size=2):
+        self.orders = {o["order_id"]: o for o in orders}
+        self.page_size = page_size
+        self.history_from = []
+        self.order_lookups = []
+
+    async def iter_order_history(self, user_id, from_order_id=None):
+        self.history_from.append(from_order_id)
+        ids = sorted(i for i in self.orders if from_order_id is None or i >= from_order_id)
+        for start in range(0, len(ids), self.page_size):
+            yield [dict(self.orders[i]) for i in ids[start:start + self.page_size]]
+
+    async def get_order(self, user_id, symbol, order_id):
+        self.order_lookups.append((symbol, order_id))
+        return dict(self.orders[order_id])
+
+
+def test_open_order_does_not_pin_watermark():
+    db = FakeDatabase()
+    zaffex = FakeZaffex([order(1), order(2, "NEW", "ETH/USDT"), order(3), order(4)])
+
+    async def main():
+        first = await sync_order_history(db, zaffex, "user_1")
+        state = await db.sync_state.find_one({"user_id": "user_1", "source": SYNC_SOURCE})
+        assert first["last_order_id"] == 4
+        assert first["orders_imported"] == 3
+        assert state["open_orders"] == [{"order_id": 2, "symbol": "ETH/USDT"}]
+
+        # Sin cambios: solo se consulta la orden abierta y el historial desde la marca
+        second = await sync_order_history(db, zaffex, "user_1")
+        assert second["orders_seen"] == 0
+        assert second["open_orders"] == 1
+        assert zaffex.history_from == [None, 5]
+        assert zaffex.order_lookups == [("ETH/USDT", 2)]
+
+        zaffex.orders[2]["status"] = "FILLED"
+        zaffex.orders[5] = order(5)
+        third = await sync_order_history(db, zaffex, "user_1")
+        state = await db.sync_state.find_one({"user_id": "user_1", "source": SYNC_SOURCE})
+        return third, state
+
+    third, state = asyncio.run(main())
+    assert third["orders_imported"] == 2
+    assert third["last_order_id"] == 5
+    assert state["open_orders"] == []
+    assert sorted(t["zaffex_order_id"] for t in db.trades.documents) == ["1", "2", "3", "4", "5"]
+
+
+def test_closed_open_orders_reach_listeners_once():
+    db = FakeDatabase()
+    zaffex = FakeZaffex([order(1, "PARTIALLY_FILLED"), order(2, "NEW")])
+    imported = []
+
+    async def listener(database, trades):
+        imported.extend(t["zaffex_order_id"] for t in trades)
+
+    async def main():
+        await sync_order_history(db, zaffex, "user_1", listeners=[listener])
+        zaffex.orders[1]["status"] = "FILLED"
+        zaffex.orders[2]["status"] = "CANCELED"
+        await sync_order_history(db, zaffex, "user_1", listeners=[listener])
+        await sync_order_history(db, zaffex, "user_1", listeners=[listener])
+
+    asyncio.run(main())
+    assert imported == ["1"]
+    assert zaffex.order_lookups == [("BTC/USDT", 1), ("BTC/USDT", 2)]
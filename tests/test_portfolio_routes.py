@@ -0,0 +1,90 @@
+import asyncio
+
+from models.portfolio import Portfolio
+from routes import portfolio
+
+from .fakes import FakeDatabase
+
+
+def test_get_portfolio_creates_initial_portfolio_once():
+    db = FakeDatabase()
+
+    async def main():
+        return await asyncio.gather(*(portfolio.get_portfolio("user_1", db) for _ in range(3)))
+
+    responses = asyncio.run(main())
+    assert len(db.portfolios.documents) == 1
+    assert "insert_one" not in db.portfolios.calls
+    assert {response.id for response in responses} == {db.portfolios.documents[0]["id"]}
+    assert responses[0].total_balance == 40000.0
+
+
+def test_get_portfolio_keeps_existing_document():
+    existing = Portfolio(id="p1", user_id="user_1", total_balance=10.0, initial_investment=10.0)
+    db = FakeDatabase(portfolios=[existing.dict()])
+
+    response = asyncio.run(portfolio.get_portfolio("user_1", db))
+    assert response.id == "p1"
+    assert response.total_balance == 10.0
+    assert db.portfolios.calls == ["find_one"]
+
+
+def test_get_portfolio_does_not_reuse_balance_across_reconnects(monkeypatch):
+    service = portfolio.zaffex_service
+    monkeypatch.setattr(service, "connected_users", {})
+
+    async def fetch_balance(credentials):
+        total = 1000.0 if credentials["api_key"] == "demo_old" else 2000.0
+        return {"total_balance": total, "available_balance": total, "in_orders": 0.0}
+
+    monkeypatch.setattr(service, "_fetch_account_balance", fetch_balance)
+    db = FakeDatabase()
+
+    async def main():
+        service.connect_user("user_1", "demo_old", "demo_secret")
+        first = await portfolio.get_portfolio("user_1", db)
+        service.disconnect_user("user_1")
+        service.connect_user("user_1", "demo_new", "demo_secret")
+        second = await portfolio.get_portfolio("user_1", db)
+        service.disconnect_user("user_1")
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first.total_balance == 1000.0
+    assert second.total_balance == 2000.0
+
+
+def test_get_portfolio_reuses_balance_until_sync(monkeypatch):
+    service = portfolio.zaffex_service
+    monkeypatch.setattr(service, "connected_users", {})
+    calls = []
+
+    async def fetch_balance(credentials):
+        calls.append(credentials["api_key"])
+        return {"total_balance": 1000.0, "available_balance": 1000.0, "in_orders": 0.0}
+
+    async def no_orders(db, zaffex_service, user_id, listeners=()):
+        return {"orders_seen": 0, "orders_imported": 0, "last_order_id": None}
+
+    monkeypatch.setattr(service, "_fetch_account_balance", fetch_balance)
+    monkeypatch.setattr(portfolio, "sync_order_history", no_orders)
+    db = FakeDatabase()
+
+    async def main():
+        service.connect_user("user_1", "demo_key", "demo_secret")
+        await portfolio.get_portfolio("user_1", db)
+        # Más allá de ZAFFEX_BALANCE_REUSE pero dentro de PORTFOLIO_BALANCE_TTL
+        service.balance_flight._results[("user_1", "demo_key")] = (
+            service.balance_flight._results[("user_1", "demo_key")][0] - 5,
+            {"total_balance": 1000.0, "available_balance": 1000.0, "in_orders": 0.0}
+        )
+        await portfolio.get_portfolio("user_1", db)
+        assert calls == ["demo_key"]
+
+        # /sync siempre lee un balance nuevo
+        await portfolio.sync_portfolio_with_zaffex("user_1", db)
+        await portfolio.get_portfolio("user_1", db)
+        service.disconnect_user("user_1")
+
+    asyncio.run(main())
+    assert calls == ["demo_key", "demo_key"]
@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+from services.rate_limiter import RateLimiter, TokenBucket
+
+
+def test_bucket_waits_for_refill_instead_of_rejecting():
+    bucket = TokenBucket(capacity=10, period=0.1)
+
+    async def main():
+        await bucket.acquire(10)
+        started = time.monotonic()
+        await bucket.acquire(5)
+        return time.monotonic() - started
+
+    waited = asyncio.run(main())
+    assert 0.03 < waited < 0.2
+
+
+def test_bucket_serves_waiters_in_arrival_order():
+    bucket = TokenBucket(capacity=2, period=0.1)
+    order = []
+
+    async def take(name, weight):
+        await bucket.acquire(weight)
+        order.append(name)
+
+    async def main():
+        await bucket.acquire(2)
+        await asyncio.gather(take("big", 2), take("small", 1))
+
+    asyncio.run(main())
+    assert order == ["big", "small"]
+
+
+def test_observe_syncs_used_weight_and_blocks_on_429():
+    limiter = RateLimiter(ip_weight_per_minute=1000, key_weight_per_minute=100, headroom=0.5)
+    assert limiter.ip_limit == 500 and limiter.key_limit == 50
+    assert limiter.weight("/api/v3/ticker/24hr") == 80
+    assert limiter.weight("/api/v3/unknown") == 1
+
+    limiter.observe(200, {"X-ZAFFEX-USED-WEIGHT-1M": "450"})
+    assert limiter.ip_bucket.tokens <= 50
+
+    limiter.observe(429, {"Retry-After": "30"}, api_key="key_1")
+    stats = limiter.stats()
+    assert stats["ip_tokens"] < 1
+    assert 29 < stats["blocked_for"] <= 30
+    assert stats["keys"] == 1
+
+    limiter.forget("key_1")
+    assert limiter.stats()["keys"] == 0
+
+
+def test_signed_requests_use_per_key_buckets():
+    limiter = RateLimiter(ip_weight_per_minute=6000, key_weight_per_minute=40, headroom=1.0)
+
+    async def main():
+        await limiter.acquire("/api/v3/account", api_key="key_1")
+        await limiter.acquire("/api/v3/account", api_key="key_2")
+        # key_1 solo tiene margen para otra petición de peso 20
+        await limiter.acquire("/api/v3/account", api_key="key_1")
+        blocked = asyncio.create_task(limiter.acquire("/api/v3/account", api_key="key_1"))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        blocked.cancel()
+
+    asyncio.run(main())
+    assert limiter.ip_bucket.tokens < 6000 - 60 + 1
@@ -0,0 +1,86 @@
+import asyncio
+
+from services.single_flight import SingleFlight
+
+
+class CountingFetcher:
+    def __init__(self, delay=0.02, fail=False):
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("exchange down")
+        return {"call": self.calls}
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    fetch = CountingFetcher()
+
+    async def main():
+        return await asyncio.gather(*(flight.do("user_1", fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert fetch.calls == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_keys_are_independent_and_ttl_reuses_result():
+    flight = SingleFlight(ttl=60)
+    fetch = CountingFetcher(delay=0)
+
+    async def main():
+        await flight.do("a", fetch)
+        await flight.do("b", fetch)
+        await flight.do("a", fetch)
+        flight.forget("a")
+        await flight.do("a", fetch)
+
+    asyncio.run(main())
+    assert fetch.calls == 3
+
+
+def test_errors_are_shared_but_not_cached():
+    flight = SingleFlight(ttl=60)
+    fetch = CountingFetcher(fail=True)
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        fetch.fail = False
+        return await flight.do("k", fetch)
+
+    assert asyncio.run(main()) == {"call": 2}
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    flight = SingleFlight()
+    fetch = CountingFetcher(delay=0.05)
+
+    async def main():
+        first = asyncio.create_task(flight.do("k", fetch))
+        second = asyncio.create_task(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == {"call": 1}
+
+
+def test_max_age_overrides_ttl_per_call():
+    flight = SingleFlight(ttl=0.01)
+    fetch = CountingFetcher(delay=0)
+
+    async def main():
+        await flight.do("k", fetch, max_age=60)
+        await asyncio.sleep(0.02)
+        await flight.do("k", fetch, max_age=60)
+        assert fetch.calls == 1
+        await flight.do("k", fetch)
+        assert fetch.calls == 2
+
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+import asyncio
+
+from services.ticker_cache import TickerCache
+
+
+class CountingFetcher:
+    def __init__(self, delay=0.02, fail=False):
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("exchange down")
+        return {"call": self.calls}
+
+
+def test_ticker_cache_fresh_stale_and_expired():
+    fetch = CountingFetcher(delay=0.01)
+    cache = TickerCache(fetch, ttl=0.05, max_stale=0.2)
+
+    async def main():
+        first = await asyncio.gather(*(cache.get() for _ in range(5)))
+        assert fetch.calls == 1 and all(r is first[0] for r in first)
+
+        # Dentro del TTL: sin descarga
+        assert await cache.get() is first[0]
+        assert fetch.calls == 1
+
+        # Entre TTL y max_stale: snapshot viejo y refresco en background
+        await asyncio.sleep(0.06)
+        assert await cache.get() == {"call": 1}
+        await asyncio.sleep(0.03)
+        assert fetch.calls == 2
+        assert await cache.get() == {"call": 2}
+
+        # Pasado max_stale: se espera a la descarga
+        await asyncio.sleep(0.25)
+        assert await cache.get() == {"call": 3}
+
+    asyncio.run(main())
+
+
+def test_ticker_cache_keeps_snapshot_when_refresh_fails():
+    fetch = CountingFetcher(delay=0)
+    cache = TickerCache(fetch, ttl=0.01, max_stale=10)
+
+    async def main():
+        snapshot = await cache.get()
+        fetch.fail = True
+        await asyncio.sleep(0.02)
+        assert await cache.get() is snapshot
+        await asyncio.sleep(0.01)
+        assert await cache.get() is snapshot
+
+    asyncio.run(main())
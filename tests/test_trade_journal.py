@@ -0,0 +1,139 @@
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+from services.trade_journal import TradeJournal
+
+from .fakes import FakeDatabase
+
+
+class SlowTrades:
+    """Colección de trades cuyo insert_many espera a que el test lo libere"""
+
+    def __init__(self):
+        self.batches = []
+        self.release = asyncio.Event()
+
+    async def insert_many(self, documents, ordered=True):
+        await self.release.wait()
+        self.batches.append(list(documents))
+
+
+def trade(n):
+    return {"id": f"trade_{n}", "bot_id": "bot_1", "profit_loss": 1.0}
+
+
+def test_flushes_full_batches_and_drains_on_stop():
+    db = FakeDatabase()
+    journal = TradeJournal(max_batch=3, flush_interval=60)
+    seen = []
+
+    async def listener(database, trades):
+        seen.append([t["id"] for t in trades])
+
+    journal.add_listener(listener)
+
+    async def main():
+        journal.start(db)
+        for n in range(7):
+            await journal.record(trade(n))
+        await journal.stop()
+
+    asyncio.run(main())
+    assert db.trades.calls == ["insert_many"] * 3
+    assert [len(batch) for batch in seen] == [3, 3, 1]
+    assert journal.flushed_trades == 7
+    assert journal.pending == 0
+
+
+def test_flushes_partial_batch_after_interval():
+    db = FakeDatabase()
+    journal = TradeJournal(max_batch=100, flush_interval=0.05)
+
+    async def main():
+        journal.start(db)
+        await journal.record(trade(1))
+        await asyncio.sleep(0.2)
+        flushed = journal.flushed_trades
+        await journal.stop()
+        return flushed
+
+    assert asyncio.run(main()) == 1
+    assert len(db.trades.documents) == 1
+
+
+def test_record_waits_when_buffer_is_full():
+    db = FakeDatabase()
+    db.trades = SlowTrades()
+    journal = TradeJournal(max_batch=1, flush_interval=60, max_pending=2)
+
+    async def main():
+        journal.start(db)
+        # Uno queda bloqueado en insert_many y dos llenan la cola
+        for n in range(3):
+            await journal.record(trade(n))
+        await asyncio.sleep(0)
+
+        blocked = asyncio.create_task(journal.record(trade(3)))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        assert journal.pending == 2
+
+        db.trades.release.set()
+        await asyncio.wait_for(blocked, timeout=1)
+        await journal.stop()
+
+    asyncio.run(main())
+    assert sum(len(batch) for batch in db.trades.batches) == 4
+
+
+def test_record_after_stop_is_rejected():
+    journal = TradeJournal()
+
+    async def main():
+        journal.start(FakeDatabase())
+        await journal.stop()
+        try:
+            await journal.record(trade(1))
+        except RuntimeError:
+            return True
+        return False
+
+    assert asyncio.run(main())
+
+
+class UniqueOrderTrades:
+    """insert_many con un segundo índice único que rechaza un trade y un reintento con _id ya insertado"""
+
+    def __init__(self, write_errors):
+        self.write_errors = write_errors
+
+    async def insert_many(self, documents, ordered=True):
+        raise BulkWriteError({"writeErrors": self.write_errors, "nInserted": 1})
+
+
+def test_only_own_duplicates_count_as_inserted():
+    db = FakeDatabase()
+    db.trades = UniqueOrderTrades([
+        {"index": 0, "code": 11000, "keyPattern": {"_id": 1}, "keyValue": {"_id": "x"}},
+        {"index": 2, "code": 11000, "keyPattern": {"user_id": 1, "zaffex_order_id": 1},
+         "keyValue": {"user_id": "user_1", "zaffex_order_id": "42"}}
+    ])
+    journal = TradeJournal(max_batch=3, flush_interval=60)
+    seen = []
+
+    async def listener(database, trades):
+        seen.extend(t["id"] for t in trades)
+
+    journal.add_listener(listener)
+
+    async def main():
+        journal.start(db)
+        for n in range(3):
+            await journal.record(trade(n))
+        await journal.stop()
+
+    asyncio.run(main())
+    assert seen == ["trade_0", "trade_1"]
+    assert journal.flushed_trades == 2
+    assert journal.dropped_trades == 1